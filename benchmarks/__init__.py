@@ -0,0 +1 @@
+"""Benchmarks offline do chatbot (``python -m benchmarks.run``)."""
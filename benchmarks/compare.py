@@ -0,0 +1,74 @@
+"""Comparação dos resultados de benchmark com uma baseline armazenada."""
+
+import json
+from dataclasses import dataclass
+
+# Piora relativa tolerada antes de acusar regressão (0.25 = 25%); os CLIs
+# aceitam --threshold ou BENCH_REGRESSION_THRESHOLD
+DEFAULT_THRESHOLD = 0.25
+# Opções que não descrevem a medição e não entram nos resultados gravados
+UNRECORDED_OPTIONS = ("python", "update_baseline")
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: float
+    current: float
+    better: str  # "lower" ou "higher"
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        """Variação relativa (positiva = mais lento/pior para métricas "lower")."""
+        if self.baseline == 0:
+            return 0.0
+        return (self.current - self.baseline) / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        if self.better == "lower":
+            return self.change > self.threshold
+        return self.change < -self.threshold
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def recorded_config(args) -> dict:
+    """Opções da linha de comando gravadas em ``meta.config``."""
+    return {k: v for k, v in vars(args).items() if k not in UNRECORDED_OPTIONS}
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[Comparison]:
+    """
+    Compara as métricas presentes nos dois resultados.
+
+    ``threshold`` é a piora relativa tolerada (0.25 = 25%). Métricas que só
+    existem em um dos lados são ignoradas, então a baseline pode cobrir um
+    subconjunto dos tamanhos de corpus executados.
+    """
+    baseline_metrics = baseline.get("metrics", {})
+    comparisons = []
+    for name, metric in current.get("metrics", {}).items():
+        reference = baseline_metrics.get(name)
+        if reference is None:
+            continue
+        comparisons.append(Comparison(name, reference["value"], metric["value"], metric["better"], threshold))
+    return comparisons
+
+
+def format_report(comparisons: list[Comparison]) -> str:
+    lines = [f"{'métrica':<40} {'baseline':>12} {'atual':>12} {'variação':>9}"]
+    for c in comparisons:
+        flag = "  REGRESSÃO" if c.regressed else ""
+        lines.append(f"{c.name:<40} {c.baseline:>12.4g} {c.current:>12.4g} {c.change:>+8.1%}{flag}")
+    return "\n".join(lines)
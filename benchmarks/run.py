@@ -0,0 +1,286 @@
+"""
+Suíte de benchmarks offline do chatbot.
+
+Mede a vazão de ``split_documents``, o tempo de ``create_vector_store``, a
+latência de recuperação (p50/p95/p99) em vários tamanhos de corpus, o tempo
+para abrir um snapshot do índice e a latência ponta a ponta do grafo RAG. Usa :class:`FakeEmbeddings`
+(determinístico) e um chat model fictício com latência configurável, então
+nada acessa a rede. Cada medição é repetida ``--repeat`` vezes e vale a
+melhor rodada, o que reduz o ruído da máquina.
+
+Os resultados são gravados em JSON. Com ``--baseline``, cada métrica é
+comparada com a execução de referência e o processo termina com código 1 se
+alguma piorar mais que ``--threshold`` (padrão 0.25, ou BENCH_REGRESSION_THRESHOLD).
+
+    python -m benchmarks.run --output bench.json --baseline benchmarks/baseline.json
+    python -m benchmarks.run --update-baseline
+"""
+import os
+import sys
+import time
+import zlib
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+# Consultas sequenciais: a janela de micro-batching só somaria espera à latência
+os.environ.setdefault("EMBEDDINGS_MICRO_BATCH_MS", "0")
+# Os logs INFO por nó do grafo poluiriam a saída
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from rag_chatbot.src.fakes import FakeEmbeddings
+from rag_chatbot.src.rag_engine import RagEngine
+from rag_chatbot.src.rag_pipeline import create_rag_graph
+from rag_chatbot.src.section_router import SECTIONS
+from rag_chatbot.src.snapshot import load_snapshot, save_snapshot
+from rag_chatbot.src.text_splitter import split_documents
+from rag_chatbot.src.vector_store import create_vector_store
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_report, load_results, recorded_config, save_results
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+RAG_TEMPLATE = """Use o seguinte contexto recuperado para responder à pergunta.
+
+Contexto: {context}
+Pergunta: {question}
+"""
+
+
+class FakeChatModel(FakeListChatModel):
+    """Chat model fictício que responde após ``latency`` segundos.
+
+    A saída estruturada é um ``Search`` com a própria pergunta e uma seção
+    escolhida de forma determinística, com a mesma latência.
+    """
+
+    latency: float = 0.0
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return super()._call(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def with_structured_output(self, schema, **kwargs):
+        def analyze(prompt_value):
+            time.sleep(self.latency)
+            # Mensagem humana da cadeia de análise: "Pergunta: {question}\n\n..."
+            question = prompt_value.to_messages()[-1].content.split("\n", 1)[0].removeprefix("Pergunta: ")
+            return {"query": question, "section": SECTIONS[zlib.crc32(question.encode()) % len(SECTIONS)]}
+
+        return RunnableLambda(analyze)
+
+
+# --- Corpus sintético determinístico ---
+def make_vocabulary(rng, size: int = 5000) -> np.ndarray:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 11, size)
+    return np.array(["".join(rng.choice(letters, n)) for n in lengths])
+
+
+def make_text(rng, vocabulary, n_words: int) -> str:
+    # Frequências de Zipf, como em texto natural
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    words = rng.choice(vocabulary, n_words, p=weights / weights.sum())
+    sentences = [" ".join(words[i:i + 15]) + "." for i in range(0, n_words, 15)]
+    return "\n\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+def make_documents(n_docs: int, words_per_doc: int, seed: int = 0) -> list[Document]:
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(rng)
+    return [
+        Document(page_content=make_text(rng, vocabulary, words_per_doc), metadata={"source": f"doc-{i}"})
+        for i in range(n_docs)
+    ]
+
+
+def make_chunks(n_chunks: int, words_per_chunk: int = 150, seed: int = 1) -> list[Document]:
+    """Chunks prontos (com seção e ``start_index``), sem passar pelo splitter."""
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(rng)
+    chunks = []
+    for i in range(n_chunks):
+        text = make_text(rng, vocabulary, words_per_chunk)
+        metadata = {"source": f"doc-{i // 30}", "start_index": (i % 30) * 800, "section": SECTIONS[(i % 30) * 3 // 30]}
+        chunks.append(Document(page_content=text, metadata=metadata))
+    return chunks
+
+
+def make_queries(chunks: list[Document], n: int, seed: int = 2) -> list[tuple[str, str]]:
+    """Consultas distintas (trechos de chunks) e a seção usada no filtro."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i, idx in enumerate(rng.integers(0, len(chunks), n)):
+        chunk = chunks[idx]
+        words = chunk.page_content.split()
+        queries.append((f"{' '.join(words[:8])} {i}", chunk.metadata["section"]))
+    return queries
+
+
+# --- Medição ---
+class Recorder:
+    def __init__(self):
+        self.metrics: dict[str, dict] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower") -> None:
+        self.metrics[name] = {"value": round(float(value), 6), "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>12.4f} {unit}")
+
+    def latencies(self, prefix: str, rounds: list[list[float]]) -> None:
+        """Percentis por rodada; registra o menor de cada um (melhor de N, como o timeit)."""
+        for p in (50, 95, 99):
+            self.add(f"{prefix}.p{p}_ms", min(np.percentile(np.asarray(r) * 1000, p) for r in rounds), "ms")
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def build_store(chunks, backend: str, dim: int, embed_latency: float):
+    embeddings = FakeEmbeddings(dim=dim, latency=embed_latency)
+    return create_vector_store(
+        chunks, cache_path="", persist_directory="", backend=backend, embeddings_model=embeddings, snapshot_path=""
+    )
+
+
+def bench_split(recorder: Recorder, n_docs: int, words_per_doc: int, repeat: int) -> None:
+    print("split_documents")
+    documents = make_documents(n_docs, words_per_doc)
+    n_chars = sum(len(d.page_content) for d in documents)
+    elapsed, chunks = min((timed(split_documents, documents) for _ in range(repeat)), key=lambda r: r[0])
+    recorder.add("split.chunks_per_s", len(chunks) / elapsed, "chunks/s", better="higher")
+    recorder.add("split.mb_per_s", n_chars / elapsed / 1e6, "MB/s", better="higher")
+
+
+def bench_retrieval(recorder: Recorder, sizes, backends, n_queries: int, repeat: int, dim: int, embed_latency: float) -> None:
+    for size in sizes:
+        chunks = make_chunks(size)
+        for backend in backends:
+            print(f"create_vector_store + recuperação ({backend}, {size} chunks)")
+            builds, rounds = [], []
+            for round_ in range(repeat):
+                # Índice e cache de embeddings novos a cada rodada; consultas inéditas
+                elapsed, store = timed(build_store, chunks, backend, dim, embed_latency)
+                builds.append(elapsed)
+
+                def search(query, section):
+                    retriever = store.as_retriever(search_kwargs={"filter": {"section": section}})
+                    return retriever.invoke(query)
+
+                queries = make_queries(chunks, n_queries + 10, seed=10 + round_)
+                for query, section in queries[:10]:  # aquecimento
+                    search(query, section)
+                rounds.append([timed(search, query, section)[0] for query, section in queries[10:]])
+            recorder.add(f"build.{backend}.{size}.seconds", min(builds), "s")
+            recorder.latencies(f"retrieval.{backend}.{size}", rounds)
+
+
+def bench_snapshot(recorder: Recorder, size: int, repeat: int, dim: int) -> None:
+    """Abrir o snapshot mapeado em memória e responder a primeira consulta, contra reconstruir o índice."""
+    print(f"snapshot do índice (flat, {size} chunks)")
+    chunks = make_chunks(size)
+    store = build_store(chunks, "flat", dim, 0.0)
+    embeddings = FakeEmbeddings(dim=dim)
+    queries = make_queries(chunks, repeat, seed=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot")
+        save_snapshot(store, path)
+        loads, first_queries = [], []
+        for query, section in queries:
+            elapsed, loaded = timed(load_snapshot, path, embeddings)
+            loads.append(elapsed)
+            retriever = loaded.as_retriever(search_kwargs={"filter": {"section": section}})
+            first_queries.append(timed(retriever.invoke, query)[0])
+    recorder.add(f"snapshot.{size}.load_ms", min(loads) * 1000, "ms")
+    recorder.add(f"snapshot.{size}.first_query_ms", min(first_queries) * 1000, "ms")
+
+
+def bench_end_to_end(recorder: Recorder, size: int, backend: str, n_requests: int, repeat: int, dim: int, embed_latency: float, llm_latency: float) -> None:
+    print(f"grafo RAG ponta a ponta ({backend}, {size} chunks, LLM {llm_latency * 1000:.0f} ms)")
+    chunks = make_chunks(size)
+    store = build_store(chunks, backend, dim, embed_latency)
+    llm = FakeChatModel(responses=["resposta fictícia com algumas palavras"], latency=llm_latency)
+    rag_prompt = ChatPromptTemplate.from_template(RAG_TEMPLATE)
+    engine = RagEngine(store, llm, rag_prompt)
+    graph = create_rag_graph(store, llm, rag_prompt, engine.structured_llm, engine=engine)
+
+    def ask(question):
+        return graph.invoke({"messages": [HumanMessage(content=question)]})
+
+    rounds = []
+    for round_ in range(repeat):
+        questions = [query for query, _ in make_queries(chunks, n_requests + 5, seed=100 + round_)]
+        for question in questions[:5]:  # aquecimento
+            ask(question)
+        rounds.append([timed(ask, question)[0] for question in questions[5:]])
+    recorder.latencies("e2e", rounds)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="tamanhos de corpus (chunks), separados por vírgula")
+    parser.add_argument("--backends", default="flat,ivf", help="backends de vector store (flat, ivf, chroma)")
+    parser.add_argument("--queries", type=int, default=200, help="consultas medidas por tamanho/backend")
+    parser.add_argument("--repeat", type=int, default=3, help="rodadas por medição (vale a melhor)")
+    parser.add_argument("--e2e-requests", type=int, default=100)
+    parser.add_argument("--e2e-size", type=int, default=5000)
+    parser.add_argument("--split-docs", type=int, default=50)
+    parser.add_argument("--split-words", type=int, default=4000)
+    parser.add_argument("--dim", type=int, default=768, help="dimensão dos embeddings fictícios")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="JSON de referência para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", DEFAULT_THRESHOLD)))
+    parser.add_argument("--update-baseline", action="store_true", help=f"grava os resultados em {DEFAULT_BASELINE}")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    backends = [b for b in args.backends.split(",") if b]
+    embed_latency = args.embed_latency_ms / 1000
+
+    recorder = Recorder()
+    bench_split(recorder, args.split_docs, args.split_words, args.repeat)
+    bench_retrieval(recorder, sizes, backends, args.queries, args.repeat, args.dim, embed_latency)
+    bench_snapshot(recorder, max(sizes), args.repeat, args.dim)
+    bench_end_to_end(recorder, args.e2e_size, backends[0], args.e2e_requests, args.repeat, args.dim, embed_latency, args.llm_latency_ms / 1000)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": recorded_config(args),
+        },
+        "metrics": recorder.metrics,
+    }
+    save_results(results, args.output)
+    print(f"Resultados gravados em {args.output}")
+    if args.update_baseline:
+        save_results(results, DEFAULT_BASELINE)
+        print(f"Baseline atualizada em {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        comparisons = compare(results, load_results(args.baseline), args.threshold)
+        print(format_report(comparisons))
+        regressions = [c for c in comparisons if c.regressed]
+        if regressions:
+            print(f"{len(regressions)} métricas pioraram mais que {args.threshold:.0%} em relação à baseline.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Tempo de inicialização (cold start) dos pontos de entrada do chatbot.
+
+Importa cada módulo em um interpretador novo com ``python -X importtime`` e
+mostra o tempo total de importação e os pacotes que mais pesam nele. Termina
+com código 1 se algum pacote de ``--forbid`` for carregado na importação (o
+SDK do Google, o LangGraph, o Chroma e o Streamlit só devem ser importados
+quando usados) ou, com ``--baseline``, se o tempo piorar mais que ``--threshold``.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --baseline benchmarks/startup_baseline.json
+    python -m benchmarks.startup --update-baseline
+"""
+import os
+import sys
+import argparse
+import platform
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_report, load_results, recorded_config, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+DEFAULT_MODULES = "rag_chatbot.src.api_server,rag_chatbot.src.rag_pipeline"
+DEFAULT_FORBIDDEN = "langgraph,langchain_google_genai,langchain_community,chromadb,streamlit"
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.name.split(".")[0]
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """Linhas ``import time: self | cumulative | nome`` (indentação = profundidade)."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabeçalho
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportRecord(stripped, int(fields[0]), int(fields[1]), depth))
+    return records
+
+
+def profile_import(module: str, python: str = sys.executable) -> list[ImportRecord]:
+    """Importa ``module`` em um processo novo e retorna o perfil do ``-X importtime``."""
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def import_ms(records: list[ImportRecord], module: str) -> float:
+    """Tempo acumulado da importação de ``module`` (sem a inicialização do interpretador)."""
+    return next(r.cumulative_us for r in records if r.name == module and r.depth == 0) / 1000
+
+
+def by_package(records: list[ImportRecord]) -> list[tuple[str, float]]:
+    """Tempo próprio somado por pacote de primeiro nível, do maior para o menor (ms)."""
+    totals: dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[record.package] += record.self_us
+    return sorted(((package, us / 1000) for package, us in totals.items()), key=lambda item: -item[1])
+
+
+def forbidden_imports(records: list[ImportRecord], forbidden) -> list[str]:
+    loaded = {record.package for record in records}
+    return sorted(loaded & set(forbidden))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="módulos medidos, separados por vírgula")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN, help="pacotes que não podem ser importados na inicialização")
+    parser.add_argument("--repeat", type=int, default=5, help="processos por módulo (vale o mais rápido)")
+    parser.add_argument("--top", type=int, default=10, help="pacotes mostrados no relatório")
+    parser.add_argument("--python", default=sys.executable, help="interpretador medido")
+    parser.add_argument("--output", default="startup-results.json")
+    parser.add_argument("--baseline", help="JSON de referência para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", DEFAULT_THRESHOLD)))
+    parser.add_argument("--update-baseline", action="store_true", help=f"grava os resultados em {DEFAULT_BASELINE}")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    modules = [m for m in args.modules.split(",") if m]
+    forbidden = [p for p in args.forbid.split(",") if p]
+
+    metrics: dict[str, dict] = {}
+    violations = {}
+    for module in modules:
+        profiles = [profile_import(module, args.python) for _ in range(args.repeat)]
+        best = min(profiles, key=lambda records: import_ms(records, module))
+        elapsed = import_ms(best, module)
+        metrics[f"startup.{module.rsplit('.', 1)[-1]}.import_ms"] = {"value": round(elapsed, 3), "unit": "ms", "better": "lower"}
+
+        print(f"{module}: {elapsed:.1f} ms ({len(best)} módulos)")
+        for package, ms in by_package(best)[: args.top]:
+            print(f"  {package:<40} {ms:>10.1f} ms")
+        loaded = forbidden_imports(best, forbidden)
+        if loaded:
+            violations[module] = loaded
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": recorded_config(args),
+        },
+        "metrics": metrics,
+    }
+    save_results(results, args.output)
+    print(f"Resultados gravados em {args.output}")
+    if args.update_baseline:
+        save_results(results, DEFAULT_BASELINE)
+        print(f"Baseline atualizada em {DEFAULT_BASELINE}")
+
+    status = 0
+    for module, loaded in violations.items():
+        print(f"{module} importa na inicialização: {', '.join(loaded)}")
+        status = 1
+    if args.baseline:
+        comparisons = compare(results, load_results(args.baseline), args.threshold)
+        print(format_report(comparisons))
+        regressions = [c for c in comparisons if c.regressed]
+        if regressions:
+            print(f"{len(regressions)} métricas pioraram mais que {args.threshold:.0%} em relação à baseline.")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
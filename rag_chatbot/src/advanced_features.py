@@ -1,27 +1,21 @@
 import os
-import time
+import asyncio
+import sqlite3
+import hashlib
 import logging
-import streamlit as st
-from typing import Iterator
-from langchain_core.messages import BaseMessage
-from langchain_core.runnables import Runnable, RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import Runnable
 from langchain_core.prompts import ChatPromptTemplate
-
-# Importar componentes do pipeline RAG (apenas o necessário, LLM e prompt serão passados)
-from typing import TypedDict, List
-
-
-class Search(TypedDict):
-    query: str
-    section: str
-
-
-class GraphState(TypedDict):
-    question: str
-    query: Search
-    context: List[BaseMessage] | List
-    answer: str
+from .semantic_cache import SemanticAnswerCache
+from .query_cache import QueryAnalysisCache
+from .section_router import SectionRouter
+from .speculative_retrieval import SpeculativeRetriever
+from .rag_engine import RagEngine, validate_question
+from .metrics import instrument, timed_stage
 
 logger = logging.getLogger(__name__)
 
@@ -33,29 +27,231 @@ def configure_langsmith_logging() -> None:
         logger.info("LangSmith tracing habilitado")
 
 
-class CachedEmbeddings:
-    """Wrapper de embeddings com cache simples."""
+class EmbeddingDiskCache:
+    """Cache persistente de embeddings em SQLite, endereçado por conteúdo.
+
+    A chave é o SHA-256 de (nome do modelo, texto), então o mesmo arquivo pode
+    ser compartilhado por vários processos e modelos sem colisões. O modo WAL
+    permite leituras concorrentes enquanto um processo grava.
+    """
+
+    # Limite conservador de parâmetros por consulta do SQLite
+    _MAX_PARAMS = 500
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys) -> dict:
+        """Busca vários vetores de uma vez, retornando apenas as chaves encontradas."""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._MAX_PARAMS):
+                chunk = keys[start:start + self._MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items) -> None:
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def put(self, key: str, vector) -> None:
+        self.put_many([(key, vector)])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
-    def __init__(self, base_model):
+
+class CachedEmbeddings:
+    """Wrapper de embeddings com cache em memória e, opcionalmente, em disco.
+
+    Quando ``cache_path`` é informado, os vetores também são gravados em um
+    :class:`EmbeddingDiskCache`, sobrevivendo a reinícios do processo.
+    ``hits`` e ``misses`` contam as consultas atendidas pelo cache e as que
+    precisaram chamar o modelo base.
+
+    ``embed_documents`` deduplica os textos ausentes do cache, agrupa-os em
+    lotes de ``batch_size`` para o ``embed_documents`` do modelo base e mantém
+    até ``max_concurrency`` lotes em voo ao mesmo tempo.
+    """
+
+    def __init__(
+        self,
+        base_model,
+        cache_path: str | None = None,
+        model_name: str | None = None,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size deve ser maior que zero.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency deve ser maior que zero.")
         self.base = base_model
         self.cache = {}
+        self.model_name = model_name or getattr(base_model, "model", None) or type(base_model).__name__
+        self.disk_cache = EmbeddingDiskCache(cache_path) if cache_path else None
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return EmbeddingDiskCache.make_key(self.model_name, text)
+
+    @instrument("embed_query")
+    def _compute(self, text: str):
+        embed_fn = getattr(self.base, "embed_query", None)
+        if callable(embed_fn):
+            return embed_fn(text)
+        # Fallback para um embedding fictício baseado no hash
+        return [hash(text) % 1000]
+
+    @instrument("embed_documents")
+    def _compute_batch(self, texts: list[str]):
+        embed_fn = getattr(self.base, "embed_documents", None)
+        if callable(embed_fn):
+            vectors = embed_fn(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"O modelo de embeddings retornou {len(vectors)} vetores para {len(texts)} textos."
+                )
+            return vectors
+        return [self._compute(t) for t in texts]
+
+    def _store(self, texts, vectors) -> None:
+        for text, vector in zip(texts, vectors):
+            self.cache[text] = vector
+        if self.disk_cache is not None:
+            self.disk_cache.put_many((self._key(t), v) for t, v in zip(texts, vectors))
+
+    def _lookup(self, texts) -> list[str]:
+        """Preenche o cache em memória a partir do disco e retorna os textos ausentes."""
+        missing = [t for t in texts if t not in self.cache]
+        if missing and self.disk_cache is not None:
+            keys = {self._key(t): t for t in missing}
+            found = self.disk_cache.get_many(keys)
+            for key, vector in found.items():
+                self.cache[keys[key]] = vector
+            missing = [t for t in missing if t not in self.cache]
+        return missing
 
     def _embed(self, text: str):
-        if text not in self.cache:
-            embed_fn = getattr(self.base, "embed_query", None)
-            if callable(embed_fn):
-                self.cache[text] = embed_fn(text)
-            else:
-                # Fallback para um embedding fictício baseado no hash
-                self.cache[text] = [hash(text) % 1000]
+        if self._lookup([text]):
+            self.misses += 1
+            self._store([text], [self._compute(text)])
+        else:
+            self.hits += 1
         return self.cache[text]
 
     def embed_documents(self, texts):
-        return [self._embed(t) for t in texts]
+        texts = list(texts)
+        missing = self._lookup(dict.fromkeys(texts))
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        if len(batches) > 1 and self.max_concurrency > 1:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map preserva a ordem dos lotes
+                for batch, vectors in zip(batches, executor.map(self._compute_batch, batches)):
+                    self._store(batch, vectors)
+        else:
+            for batch in batches:
+                self._store(batch, self._compute_batch(batch))
+
+        return [self.cache[t] for t in texts]
 
     def embed_query(self, text):
         return self._embed(text)
 
+    async def _acompute_batch(self, texts: list[str]):
+        aembed_fn = getattr(self.base, "aembed_documents", None)
+        if callable(aembed_fn):
+            with timed_stage("embed_documents"):
+                vectors = await aembed_fn(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"O modelo de embeddings retornou {len(vectors)} vetores para {len(texts)} textos."
+                )
+            return vectors
+        return await asyncio.to_thread(self._compute_batch, texts)
+
+    async def aembed_documents(self, texts):
+        """Versão assíncrona de :meth:`embed_documents` (mesmo cache e lotes)."""
+        texts = list(texts)
+        missing = self._lookup(dict.fromkeys(texts))
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch):
+            async with semaphore:
+                return await self._acompute_batch(batch)
+
+        for batch, vectors in zip(batches, await asyncio.gather(*(run(b) for b in batches))):
+            self._store(batch, vectors)
+        return [self.cache[t] for t in texts]
+
+    async def aembed_query(self, text):
+        if self._lookup([text]):
+            self.misses += 1
+            aembed_fn = getattr(self.base, "aembed_query", None)
+            if callable(aembed_fn):
+                with timed_stage("embed_query"):
+                    vector = await aembed_fn(text)
+            else:
+                vector = await asyncio.to_thread(self._compute, text)
+            self._store([text], [vector])
+        else:
+            self.hits += 1
+        return self.cache[text]
+
+    def stats(self) -> dict:
+        """Retorna contadores de acertos e falhas do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
 
 _VECTOR_STORE = None
 
@@ -68,71 +264,62 @@ def get_lazy_vector_store(loader_func):
     return _VECTOR_STORE
 
 
-def validate_question(question: str) -> bool:
-    """Verifica se a pergunta é válida."""
-    return bool(question and question.strip())
-
 # --- Streaming de Respostas ---
-def stream_rag_response(question: str, rag_app: Runnable, llm_model: any, rag_prompt_template: ChatPromptTemplate, vector_store: any) -> Iterator[str]:
-    """Gera resposta em modo streaming com tratamento de erros e métricas."""
-
-    if not validate_question(question):
-        yield "Pergunta vazia."
-        return
-
-    start_time = time.time()
-
-    # Para streaming, precisamos do contexto. Executa as etapas de análise e recuperação
-    # de forma síncrona para obter o contexto.
-    
-    # Obter o LLM estruturado para análise de consulta
-    structured_llm = llm_model.with_structured_output(GraphState.__annotations__['query']) # Reutiliza o schema Search do GraphState
-
-    # Prompt para análise da consulta (duplicado de rag_pipeline para evitar dependência circular)
-    analysis_prompt = ChatPromptTemplate.from_messages([
-        ("system", "Analise a pergunta do usuário e determine a consulta principal e a seção relevante do documento (beginning, middle, end)."),
-        ("human", "Pergunta: {question}\n\nRetorne a consulta e a seção no formato JSON com os campos 'query' e 'section'.")
-    ])
-    analysis_chain = analysis_prompt | structured_llm
-    
-    # Analisar a consulta
-    parsed_query = analysis_chain.invoke({"question": question})
-
-    # Recuperar contexto com filtro
-    retriever_with_filter = vector_store.as_retriever(
-        search_kwargs={"filter": {"section": parsed_query["section"]}}
-    )
-    context = retriever_with_filter.invoke(parsed_query["query"])
-    formatted_context = "\n\n".join([doc.page_content for doc in context])
-
-    # Criar a cadeia de RAG para streaming
-    # Formatar o prompt antes de passar para o LLM
-    formatted_prompt = rag_prompt_template.format_messages(context=formatted_context, question=question)
-    
-    # Invocar o LLM com streaming
-    try:
-        for chunk in llm_model.stream(formatted_prompt):
-            yield StrOutputParser().invoke(chunk)
-    except Exception as exc:
-        logger.error("Falha no streaming: %s", exc)
-        yield "Desculpe, ocorreu um erro ao gerar a resposta."
-
-    logger.info("Tempo de resposta: %.2fs", time.time() - start_time)
+def stream_rag_response(question: str, rag_app: Runnable, llm_model: any, rag_prompt_template: ChatPromptTemplate, vector_store: any, answer_cache: SemanticAnswerCache | None = None, analysis_cache: QueryAnalysisCache | None = None, section_router: SectionRouter | None = None, speculative_retriever: SpeculativeRetriever | None = None, engine: RagEngine | None = None) -> Iterator[str]:
+    """Gera resposta em modo streaming com tratamento de erros e métricas.
+
+    Com ``answer_cache``, perguntas equivalentes a uma já respondida (mesma
+    versão do índice) são atendidas imediatamente pelo cache semântico.
+    ``analysis_cache`` memoiza a análise de consulta (pergunta → Search) e
+    ``section_router`` decide a seção localmente quando está confiante. Com
+    ``speculative_retriever``, a busca vetorial roda em paralelo à análise.
+
+    Passe ``engine`` (criado uma vez em ``initialize_rag_components``) para
+    reutilizar as cadeias já compiladas; sem ele, um :class:`RagEngine` é
+    montado a partir dos demais argumentos.
+    """
+    if engine is None:
+        engine = RagEngine(
+            vector_store, llm_model, rag_prompt_template,
+            answer_cache=answer_cache,
+            analysis_cache=analysis_cache,
+            section_router=section_router,
+            speculative_retriever=speculative_retriever,
+        )
+    yield from engine.stream(question)
+
+
+async def astream_rag_response(question: str, llm_model: any, rag_prompt_template: ChatPromptTemplate, vector_store: any, answer_cache: SemanticAnswerCache | None = None, analysis_cache: QueryAnalysisCache | None = None, section_router: SectionRouter | None = None, engine: RagEngine | None = None) -> AsyncIterator[str]:
+    """Versão assíncrona de :func:`stream_rag_response`.
+
+    Análise, recuperação e geração usam ``ainvoke``/``astream``, então muitas
+    respostas podem ser transmitidas ao mesmo tempo em um único loop de eventos.
+    """
+    if engine is None:
+        engine = RagEngine(
+            vector_store, llm_model, rag_prompt_template,
+            answer_cache=answer_cache,
+            analysis_cache=analysis_cache,
+            section_router=section_router,
+        )
+    async for token in engine.astream(question):
+        yield token
 
 # --- Suporte para Múltiplos Modos de Invocação (Sync, Async) ---
 # O LangChain e LangGraph já suportam isso nativamente com .invoke() e .ainvoke()
 # e .stream() e .astream().
-# A função `stream_rag_response` acima já demonstra um modo de invocação (streaming).
-# O `rag_app.invoke` no streamlit_app.py já é síncrono.
-# Para async, precisaríamos de um ambiente async (ex: FastAPI, ou `asyncio.run` no main).
+# A função `stream_rag_response` acima já demonstra um modo de invocação (streaming)
+# e `astream_rag_response` é o equivalente assíncrono.
+# O `rag_app.invoke` no streamlit_app.py já é síncrono; para async, o grafo vem de
+# `rag_pipeline.create_async_rag_graph` e roda em um loop de eventos (ex.: servidor ASGI).
 
 # Exemplo de uso síncrono (já feito no main.py e streamlit_app.py)
-def invoke_rag_sync(question: str, rag_app: Runnable) -> GraphState:
-    return rag_app.invoke({"question": question})
+def invoke_rag_sync(question: str, rag_app: Runnable) -> dict:
+    return rag_app.invoke({"messages": [HumanMessage(content=question)]})
 
-# Exemplo de uso assíncrono (requer um loop de eventos)
-async def invoke_rag_async(question: str, rag_app: Runnable) -> GraphState:
-    return await rag_app.ainvoke({"question": question})
+# Exemplo de uso assíncrono (requer um loop de eventos; use create_async_rag_graph)
+async def invoke_rag_async(question: str, rag_app: Runnable) -> dict:
+    return await rag_app.ainvoke({"messages": [HumanMessage(content=question)]})
 
 # --- Configurar Logging com LangSmith para Rastreamento ---
 # Isso já está configurado via variáveis de ambiente no .env (LANGSMITH_API_KEY, LANGSMITH_TRACING=true)
@@ -177,6 +364,8 @@ async def invoke_rag_async(question: str, rag_app: Runnable) -> GraphState:
 #         self.assertGreater(len(docs), 0)
 
 if __name__ == "__main__":
+    import streamlit as st
+
     # Exemplo de uso da função de streaming
     st.write("Demonstração de Streaming (apenas se executado diretamente no Streamlit)")
     # Este bloco não será executado diretamente via `python advanced_features.py`
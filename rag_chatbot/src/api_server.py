@@ -0,0 +1,234 @@
+"""
+Serviço HTTP (ASGI) do chatbot com streaming de tokens via Server-Sent Events.
+
+Rotas:
+- ``POST /chat``: corpo JSON ``{"question": "...", "session_id": "..."}``; responde
+  ``text/event-stream`` com um evento ``session``, os tokens como ``data`` e um
+  evento ``done`` ao final. O ``session_id`` (gerado se ausente) só é devolvido
+  ao cliente e registrado nos logs para correlacionar as requisições: o
+  serviço não guarda histórico, e cada pergunta é respondida de forma
+  independente por qualquer worker.
+- ``GET /healthz``: o processo está vivo.
+- ``GET /readyz``: os componentes RAG já foram carregados.
+- ``GET /metrics``: latências por etapa, tempo até o primeiro token, tokens por
+  segundo e taxas de acerto dos caches, no formato texto do Prometheus.
+
+Os componentes são carregados uma única vez por worker, no startup (lifespan),
+e compartilhados por todas as requisições. Execute com:
+
+    uvicorn rag_chatbot.src.api_server:app --workers 4
+"""
+
+import os
+import re
+import json
+import uuid
+import asyncio
+import logging
+from .rag_engine import RagEngine
+from .metrics import REGISTRY
+from .logging_config import new_request_id, request_context, setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+_SESSION_ID = re.compile(r"[\w-]{1,128}", re.ASCII)
+
+
+def format_sse(data: str, event: str | None = None) -> bytes:
+    """Formata um evento SSE; quebras de linha viram várias linhas ``data``."""
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _load_components():
+    from .rag_pipeline import initialize_rag_components
+
+    return initialize_rag_components()
+
+
+class RagApiServer:
+    """Aplicação ASGI mínima, sem framework, sobre :meth:`RagEngine.astream`."""
+
+    def __init__(self, components_factory=_load_components):
+        self.components_factory = components_factory
+        self.components: dict | None = None
+        self.engine: RagEngine | None = None
+        self.startup_error: Exception | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.components is not None
+
+    async def startup(self) -> None:
+        # initialize_rag_components é síncrono (carga e indexação): roda fora do loop
+        try:
+            components = await asyncio.to_thread(self.components_factory)
+            self.engine = components.get("engine") or RagEngine.from_components(components)
+            self.components = components
+            logger.info("Componentes RAG carregados; serviço pronto.")
+        except Exception as exc:
+            self.startup_error = exc
+            logger.error("Falha ao carregar os componentes RAG: %s", exc)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            # Todos os logs da requisição (inclusive das tasks de streaming) levam o mesmo ID
+            request_id = self._request_id(scope)
+            with request_context(request_id):
+                await self._http(scope, receive, self._with_request_id(send, request_id))
+
+    @staticmethod
+    def _request_id(scope) -> str:
+        """Usa o ``x-request-id`` do cliente (ou do proxy) se for válido; senão gera um."""
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _SESSION_ID.fullmatch(candidate):
+                    return candidate
+        return new_request_id()
+
+    @staticmethod
+    def _with_request_id(send, request_id: str):
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())])
+            await send(message)
+        return send_with_header
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope["method"], scope["path"]
+        if path == "/healthz" and method == "GET":
+            await self._json(send, 200, {"status": "ok"})
+        elif path == "/readyz" and method == "GET":
+            if self.ready:
+                await self._json(send, 200, {"status": "ready"})
+            else:
+                detail = str(self.startup_error) if self.startup_error else "carregando"
+                await self._json(send, 503, {"status": "not ready", "detail": detail})
+        elif path == "/metrics" and method == "GET":
+            body = REGISTRY.render().encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+        elif path == "/chat":
+            if method != "POST":
+                await self._json(send, 405, {"error": "use POST"})
+            else:
+                await self._chat(receive, send)
+        else:
+            await self._json(send, 404, {"error": "not found"})
+
+    @staticmethod
+    async def _json(send, status: int, payload: dict, headers: list | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + (headers or []),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _read_body(receive) -> bytes | None:
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise ValueError("corpo da requisição muito grande")
+            if not message.get("more_body"):
+                return body
+
+    async def _chat(self, receive, send):
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                return
+            payload = json.loads(body or b"{}")
+            question = str(payload.get("question", "")).strip()
+        except (ValueError, AttributeError) as exc:
+            await self._json(send, 400, {"error": f"requisição inválida: {exc}"})
+            return
+        if not question:
+            await self._json(send, 400, {"error": "campo 'question' é obrigatório"})
+            return
+        if not self.ready:
+            await self._json(send, 503, {"error": "serviço ainda não está pronto"})
+            return
+
+        session_id = str(payload.get("session_id") or uuid.uuid4().hex)
+        if not _SESSION_ID.fullmatch(session_id):
+            await self._json(send, 400, {"error": "session_id inválido"})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-session-id", session_id.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": format_sse(session_id, "session"), "more_body": True})
+
+        # Cancela a geração se o cliente desconectar no meio do streaming
+        stream_task = asyncio.create_task(self._stream(question, session_id, send))
+        disconnect_task = asyncio.create_task(self._wait_disconnect(receive))
+        done, _ = await asyncio.wait({stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        if stream_task not in done:
+            logger.info("Cliente da sessão %s desconectou; streaming cancelado.", session_id)
+            stream_task.cancel()
+        disconnect_task.cancel()
+        await asyncio.gather(stream_task, disconnect_task, return_exceptions=True)
+
+    @staticmethod
+    async def _wait_disconnect(receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _stream(self, question: str, session_id: str, send) -> None:
+        try:
+            async for token in self.engine.astream(question):
+                await send({"type": "http.response.body", "body": format_sse(token), "more_body": True})
+        except Exception as exc:
+            logger.error("Erro no /chat (sessão %s): %s", session_id, exc)
+            await send({"type": "http.response.body", "body": format_sse("erro ao gerar a resposta", "error"), "more_body": True})
+        await send({"type": "http.response.body", "body": format_sse("", "done")})
+
+
+def create_app(components_factory=_load_components, **kwargs) -> RagApiServer:
+    """Cria a aplicação ASGI; ``components_factory`` permite injetar componentes."""
+    return RagApiServer(components_factory, **kwargs)
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "rag_chatbot.src.api_server:app",
+        host=os.getenv("API_HOST", "0.0.0.0"),
+        port=int(os.getenv("API_PORT", "8000")),
+        workers=int(os.getenv("API_WORKERS", "1")),
+    )
@@ -12,48 +12,72 @@ except Exception:  # pragma: no cover - fallback for test stubs
             self.additional_kwargs = kwargs
 
     class HumanMessage(BaseMessage):
-        pass
+        type = "human"
 
     class AIMessage(BaseMessage):
-        pass
+        type = "ai"
 
     class ToolMessage(BaseMessage):
+        type = "tool"
+
         def __init__(self, content: str = "", tool_call_id=None, **kwargs):
             super().__init__(content, **kwargs)
             self.tool_call_id = tool_call_id
 
     class SystemMessage(BaseMessage):
-        pass
+        type = "system"
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import MessagesState
 
 from .vector_store import retrieve
+from .metrics import instrument
+
 
+@instrument("chat_query_or_respond")
+def query_or_respond(state: MessagesState, llm, memory=None):
+    """Call the LLM which may return a tool call.
 
-def query_or_respond(state: MessagesState, llm):
-    """Call the LLM which may return a tool call."""
+    With ``memory``, only the conversation summary and the turns not yet
+    summarized are sent instead of the whole history. Older turns are folded
+    here too, not only in :func:`generate`: when no tool is called the graph
+    ends after this node, and the summary would otherwise never advance.
+    """
     model = llm.bind_tools([retrieve])
-    response = model.invoke(state["messages"])
-    return {"messages": [response]}
+    messages = state["messages"]
+    update = {}
+    if memory is not None:
+        window = memory.prepare(messages, state.get("summary", ""), state.get("summarized_turns", 0))
+        messages = window.messages
+        update = {"summary": window.summary, "summarized_turns": window.summarized_turns}
+    response = model.invoke(messages)
+    return {"messages": [response], **update}
 
 
 # Node responsible for executing tool calls
 _tool_node = ToolNode([retrieve])
 
 
+@instrument("chat_tools")
 def tools(state: MessagesState):
     """Execute any requested tools and return updated state."""
     return _tool_node.invoke(state)
 
 
-def generate(state: MessagesState, llm, prompt=None):
-    """Generate the assistant answer using retrieved context."""
+@instrument("chat_generate")
+def generate(state: MessagesState, llm, prompt=None, memory=None):
+    """Generate the assistant answer using retrieved context.
+
+    With ``memory`` (a :class:`~.memory.ConversationMemory`), older turns are
+    folded into a rolling summary and the prompt keeps a bounded size; the
+    updated ``summary`` and ``summarized_turns`` are returned with the answer.
+    """
     messages = state["messages"]
 
     docs = []
     for msg in reversed(messages):
         if isinstance(msg, ToolMessage):
-            docs.extend(msg.additional_kwargs.get("docs", []))
+            # retrieve returns its Documents as the artifact (content_and_artifact)
+            docs.extend(getattr(msg, "artifact", None) or msg.additional_kwargs.get("docs", []))
             break
 
     context = "\n\n".join(d.page_content for d in docs)
@@ -66,16 +90,22 @@ def generate(state: MessagesState, llm, prompt=None):
     )
     system_msg = SystemMessage(content=f"{system_instruction}\n\n{context}")
 
-    convo_msgs = [
-        m
-        for m in messages
-        if isinstance(m, (HumanMessage, SystemMessage))
-        or (
-            isinstance(m, AIMessage)
-            and not m.additional_kwargs.get("tool_calls")
-        )
-    ]
+    update = {}
+    if memory is not None:
+        window = memory.prepare(messages, state.get("summary", ""), state.get("summarized_turns", 0))
+        convo_msgs = window.messages
+        update = {"summary": window.summary, "summarized_turns": window.summarized_turns}
+    else:
+        convo_msgs = [
+            m
+            for m in messages
+            if isinstance(m, (HumanMessage, SystemMessage))
+            or (
+                isinstance(m, AIMessage)
+                and not m.additional_kwargs.get("tool_calls")
+            )
+        ]
     prompt_messages = convo_msgs + [system_msg]
 
     answer = llm.invoke(prompt_messages)
-    return {"messages": [AIMessage(content=answer)]}
+    return {"messages": [AIMessage(content=answer)], **update}
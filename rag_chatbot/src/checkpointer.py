@@ -0,0 +1,359 @@
+"""Checkpoints persistentes (SQLite) do estado das conversas, por thread."""
+
+import os
+import copy
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Chaves de additional_kwargs que carregam Documents recuperados
+_DOCUMENT_KEYS = ("documents", "docs")
+
+
+def document_ref(document) -> dict:
+    """Referência compacta a um chunk: só os metadados (fonte, start_index, seção), sem o texto."""
+    return dict(getattr(document, "metadata", None) or {})
+
+
+def _replace(message, **fields):
+    if hasattr(message, "model_copy"):
+        return message.model_copy(update=fields)
+    message = copy.copy(message)
+    for name, value in fields.items():
+        setattr(message, name, value)
+    return message
+
+
+def compact_message(message):
+    """
+    Cópia da mensagem com os Documents recuperados trocados por referências.
+
+    O tool ``retrieve`` (``response_format="content_and_artifact"``) devolve os
+    Documents em ``ToolMessage.artifact`` e o texto deles em ``content``: o
+    artifact é descartado e o ``content`` passa a ser a lista de referências
+    em JSON. Documents em ``additional_kwargs`` viram ``document_refs``.
+    """
+    fields = {}
+    artifact = getattr(message, "artifact", None)
+    if message.type == "tool" and isinstance(artifact, (list, tuple)) and artifact:
+        refs = [document_ref(d) for d in artifact]
+        fields["content"] = json.dumps(refs, ensure_ascii=False, separators=(",", ":"))
+        fields["artifact"] = None
+    kwargs = getattr(message, "additional_kwargs", None) or {}
+    if any(key in kwargs for key in _DOCUMENT_KEYS):
+        kwargs = dict(kwargs)
+        for key in _DOCUMENT_KEYS:
+            if key in kwargs:
+                kwargs.setdefault("document_refs", []).extend(document_ref(d) for d in kwargs.pop(key))
+        fields["additional_kwargs"] = kwargs
+    return _replace(message, **fields) if fields else message
+
+
+def compact_messages(messages) -> list:
+    """
+    Compacta as mensagens de tool já respondidas.
+
+    As que estão no fim da lista ainda serão lidas pelo nó ``generate`` se a
+    execução for retomada deste checkpoint, então ficam inteiras.
+    """
+    end = len(messages)
+    while end and getattr(messages[end - 1], "type", None) == "tool":
+        end -= 1
+    return [compact_message(m) for m in messages[:end]] + list(messages[end:])
+
+
+def compact_checkpoint(checkpoint: dict) -> dict:
+    values = checkpoint.get("channel_values") or {}
+    if not isinstance(values.get("messages"), list):
+        return checkpoint
+    return {**checkpoint, "channel_values": {**values, "messages": compact_messages(values["messages"])}}
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    """
+    Checkpointer do LangGraph que guarda o estado de cada conversa (thread) em SQLite.
+
+    Passado a ``StateGraph.compile(checkpointer=...)``, vale para ``invoke``,
+    ``stream``, ``ainvoke`` e ``astream``: com
+    ``config={"configurable": {"thread_id": ...}}`` o grafo retoma o último
+    checkpoint da thread e o cliente envia só a mensagem nova.
+
+    Os checkpoints são serializados pelo ``serde`` do LangGraph e comprimidos
+    com zlib, com os Documents recuperados reduzidos a referências
+    (:func:`compact_checkpoint`). Cada ``put`` mantém apenas os ``keep_last``
+    checkpoints mais recentes da thread (e suas escritas pendentes). Threads
+    sem atualização há mais de ``ttl_seconds`` são removidas por uma thread em
+    segundo plano a cada ``prune_interval`` segundos. O modo WAL permite que
+    vários processos (workers) compartilhem o arquivo; as escritas usam
+    ``BEGIN IMMEDIATE`` e são serializadas pelo SQLite.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        keep_last: int = 2,
+        ttl_seconds: float | None = None,
+        prune_interval: float = 600.0,
+        timeout: float = 30.0,
+        *,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        if keep_last < 1:
+            raise ValueError("keep_last deve ser maior que zero.")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # isolation_level=None: as transações são abertas explicitamente por _write()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL, metadata TEXT NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, task_path TEXT NOT NULL DEFAULT '', idx INTEGER NOT NULL, "
+            "channel TEXT NOT NULL, type TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+        )
+        self._stop = threading.Event()
+        self._pruner: threading.Thread | None = None
+        if ttl_seconds is not None and prune_interval > 0:
+            self._pruner = threading.Thread(target=self._prune_loop, args=(prune_interval,), name="checkpoint-pruner", daemon=True)
+            self._pruner.start()
+
+    @classmethod
+    def from_env(cls) -> "SQLiteCheckpointer | None":
+        """Usa CHECKPOINT_DB_PATH (sem ele, retorna None) e CHECKPOINT_TTL_HOURS (padrão 168; 0 desativa)."""
+        path = os.getenv("CHECKPOINT_DB_PATH")
+        if not path:
+            return None
+        ttl_hours = float(os.getenv("CHECKPOINT_TTL_HOURS", "168"))
+        return cls(path, ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None)
+
+    @contextmanager
+    def _write(self):
+        """Transação de escrita que reserva o banco desde o início (entre processos)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _dumps(self, value) -> tuple[str, bytes]:
+        kind, data = self.serde.dumps_typed(value)
+        return kind, zlib.compress(data)
+
+    def _loads(self, kind: str, blob: bytes):
+        return self.serde.loads_typed((kind, zlib.decompress(blob)))
+
+    def _tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, kind, blob, metadata = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+
+        def config(cid):
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint=self._loads(kind, blob),
+            metadata=json.loads(metadata),
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, self._loads(t, value)) for task_id, channel, t, value in writes],
+        )
+
+    def get_tuple(self, config) -> CheckpointTuple | None:
+        """O checkpoint ``checkpoint_id`` da config ou, sem ele, o último da thread."""
+        configurable = config["configurable"]
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", params).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """Checkpoints do mais recente para o mais antigo (os ids do LangGraph são ordenáveis)."""
+        clauses, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before is not None:
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+            "FROM checkpoints"
+        )
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall()
+        count = 0
+        for row in rows:
+            if limit is not None and count >= limit:
+                return
+            item = self._tuple(row)
+            if filter and any(item.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            count += 1
+            yield item
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Grava o checkpoint compactado e descarta os anteriores aos ``keep_last`` mais recentes."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        kind, blob = self._dumps(compact_checkpoint(checkpoint))
+        meta = json.dumps(get_checkpoint_metadata(config, metadata), ensure_ascii=False, default=str)
+        stale = (
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?"
+        )
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"), kind, blob, meta),
+            )
+            conn.execute(
+                "INSERT INTO threads (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time()),
+            )
+            params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+            conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({stale})", params
+            )
+            conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({stale})",
+                params,
+            )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path="") -> None:
+        """Escritas pendentes de uma tarefa, usadas para retomar um passo interrompido."""
+        configurable = config["configurable"]
+        # Escritas especiais (erro, interrupção...) substituem a anterior; as demais não se repetem
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"],
+                task_id, task_path, WRITES_IDX_MAP.get(channel, idx), channel, *self._dumps(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._write() as conn:
+            conn.executemany(
+                f"{verb} INTO writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._write() as conn:
+            for table in ("writes", "checkpoints", "threads"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path="") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def prune(self, max_age_seconds: float | None = None) -> int:
+        """Remove threads sem atualização há mais de ``max_age_seconds`` (padrão ``ttl_seconds``)."""
+        max_age_seconds = self.ttl_seconds if max_age_seconds is None else max_age_seconds
+        if max_age_seconds is None:
+            return 0
+        cutoff = time.time() - max_age_seconds
+        with self._write() as conn:
+            for table in ("writes", "checkpoints"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id IN (SELECT thread_id FROM threads WHERE updated_at < ?)",
+                    (cutoff,),
+                )
+            removed = conn.execute("DELETE FROM threads WHERE updated_at < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info("Checkpoints: %d threads antigas removidas", removed)
+        return removed
+
+    def _prune_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.prune()
+            except sqlite3.Error as exc:
+                logger.warning("Falha ao podar checkpoints: %s", exc)
+
+    def thread_count(self) -> int:
+        # Não é __len__: o LangGraph testa ``if checkpointer`` e um banco vazio seria falso
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._pruner is not None:
+            self._pruner.join()
+            self._pruner = None
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,31 @@
+"""Carregamento da configuração (arquivo ``.env``) uma única vez por processo."""
+
+import os
+import threading
+
+# rag_chatbot/.env, independente do diretório de trabalho
+ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_config(path: str | None = None) -> bool:
+    """
+    Carrega as variáveis do ``.env`` (``path`` ou ``rag_chatbot/.env``) no ambiente.
+
+    Chamada pelos pontos de entrada e pelas funções que leem a chave da API,
+    nunca na importação dos módulos. Só a primeira chamada lê o arquivo; as
+    seguintes retornam False. Variáveis já definidas no ambiente prevalecem.
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return False
+        from dotenv import load_dotenv
+
+        # Marcado só depois de carregar: chamadas concorrentes esperam o lock
+        # em vez de seguir com o ambiente ainda sem as variáveis do arquivo
+        load_dotenv(dotenv_path=path or ENV_PATH)
+        _loaded = True
+    return True
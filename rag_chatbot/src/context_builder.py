@@ -0,0 +1,139 @@
+"""Montagem do contexto do prompt: mescla de chunks sobrepostos, deduplicação e orçamento de tokens."""
+
+import re
+import logging
+from dataclasses import dataclass
+from langchain_core.documents import Document
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# Aproximação usual para modelos de linguagem: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata do número de tokens de ``text`` (sem tokenizer)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class _Span:
+    rank: int
+    source: object
+    start: int | None
+    text: str
+    metadata: dict
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+
+def merge_overlapping(documents: list[Document], max_gap: int = 0) -> list[Document]:
+    """
+    Une chunks da mesma fonte cujos intervalos (``start_index`` + tamanho) se
+    sobrepõem ou são adjacentes (até ``max_gap`` caracteres de distância).
+
+    O texto repetido pela sobreposição do splitter aparece uma única vez. O
+    resultado segue a ordem de relevância de entrada, usando a melhor posição
+    entre os chunks mesclados; chunks sem ``start_index`` são mantidos como estão.
+    """
+    spans = [
+        _Span(rank, doc.metadata.get("source"), doc.metadata.get("start_index"), doc.page_content, dict(doc.metadata))
+        for rank, doc in enumerate(documents)
+    ]
+    merged: list[_Span] = [s for s in spans if s.start is None]
+    by_source: dict = {}
+    for span in spans:
+        if span.start is not None:
+            by_source.setdefault(span.source, []).append(span)
+
+    for group in by_source.values():
+        group.sort(key=lambda s: s.start)
+        current = group[0]
+        for span in group[1:]:
+            if span.start <= current.end + max_gap:
+                if span.end > current.end:
+                    overlap = current.end - span.start
+                    joiner = "" if overlap >= 0 else " "
+                    current.text += joiner + span.text[max(overlap, 0):]
+                current.rank = min(current.rank, span.rank)
+            else:
+                merged.append(current)
+                current = span
+        merged.append(current)
+
+    merged.sort(key=lambda s: s.rank)
+    return [Document(page_content=s.text, metadata=s.metadata) for s in merged]
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.casefold())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(documents: list[Document], threshold: float = 0.85) -> list[Document]:
+    """Remove documentos cuja similaridade de Jaccard (3-gramas de palavras) com um anterior é >= ``threshold``."""
+    kept: list[Document] = []
+    kept_shingles: list[set] = []
+    for doc in documents:
+        shingles = _shingles(doc.page_content)
+        duplicate = False
+        for other in kept_shingles:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(doc)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def pack_documents(
+    documents: list[Document],
+    token_budget: int | None = None,
+    dedup_threshold: float = 0.85,
+    token_counter=estimate_tokens,
+    separator: str = "\n\n",
+) -> list[Document]:
+    """
+    Mescla, deduplica e seleciona os documentos por relevância até ``token_budget``.
+
+    Os documentos devem chegar do mais para o menos relevante (ordem do
+    retriever). Documentos que não cabem são pulados, mas os seguintes, menores,
+    ainda podem entrar. Se nem o primeiro couber, ele é truncado no orçamento
+    para que o contexto nunca fique vazio.
+    """
+    candidates = drop_near_duplicates(merge_overlapping(documents), dedup_threshold)
+    if token_budget is None:
+        return candidates
+
+    packed: list[Document] = []
+    used = 0
+    separator_tokens = token_counter(separator)
+    for doc in candidates:
+        cost = token_counter(doc.page_content) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(doc)
+            used += cost
+    if not packed and candidates:
+        best = candidates[0]
+        text = best.page_content[: token_budget * CHARS_PER_TOKEN]
+        packed.append(Document(page_content=text, metadata=best.metadata))
+    return packed
+
+
+def build_context(documents: list[Document], token_budget: int | None = None, **kwargs) -> str:
+    """Texto do contexto para o prompt, já mesclado, deduplicado e dentro do orçamento."""
+    separator = kwargs.get("separator", "\n\n")
+    packed = pack_documents(documents, token_budget, **kwargs)
+    if len(packed) != len(documents):
+        logger.debug("Contexto: %d chunks recuperados -> %d após mescla/dedup/orçamento", len(documents), len(packed))
+    return separator.join(doc.page_content for doc in packed)
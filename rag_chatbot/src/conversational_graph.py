@@ -4,15 +4,34 @@ from langgraph.graph import MessagesState, StateGraph, END
 from langgraph.prebuilt import ToolNode, tools_condition
 
 from .chat_nodes import query_or_respond, tools, generate
+from .memory import ConversationMemory
+from .checkpointer import SQLiteCheckpointer
 
 
-def create_conversational_graph(llm):
-    """Return a LangGraph app wiring the conversational nodes."""
-    graph_builder = StateGraph(MessagesState)
+class ConversationState(MessagesState):
+    """Messages plus the rolling summary kept by :class:`ConversationMemory`."""
 
-    graph_builder.add_node("query_or_respond", lambda state: query_or_respond(state, llm))
+    summary: str
+    summarized_turns: int
+
+
+def create_conversational_graph(llm, memory: ConversationMemory | None = None, checkpointer: SQLiteCheckpointer | None = None):
+    """Return a LangGraph app wiring the conversational nodes.
+
+    ``memory`` bounds the prompt sent to the LLM on long conversations
+    (defaults to :meth:`ConversationMemory.from_env`). ``checkpointer``
+    (defaults to :meth:`SQLiteCheckpointer.from_env`) is handed to
+    ``compile``, so ``invoke``, ``stream`` and their async variants resume the
+    thread given in ``config["configurable"]["thread_id"]`` and callers only
+    send the new message.
+    """
+    memory = memory if memory is not None else ConversationMemory.from_env(llm)
+    checkpointer = checkpointer if checkpointer is not None else SQLiteCheckpointer.from_env()
+    graph_builder = StateGraph(ConversationState)
+
+    graph_builder.add_node("query_or_respond", lambda state: query_or_respond(state, llm, memory))
     graph_builder.add_node("tools", tools)
-    graph_builder.add_node("generate", lambda state: generate(state, llm))
+    graph_builder.add_node("generate", lambda state: generate(state, llm, memory=memory))
 
     graph_builder.set_entry_point("query_or_respond")
 
@@ -32,5 +51,4 @@ def create_conversational_graph(llm):
     graph_builder.add_edge("tools", "generate")
     graph_builder.add_edge("generate", END)
 
-    graph = graph_builder.compile()
-    return graph
+    return graph_builder.compile(checkpointer=checkpointer)
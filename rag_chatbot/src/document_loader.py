@@ -1,24 +1,236 @@
-from langchain_community.document_loaders import WebBaseLoader
+from langchain_core.documents import Document
 from bs4 import BeautifulSoup, SoupStrainer
+import os
+import json
+import hashlib
 import logging
+import threading
+import xml.etree.ElementTree as ET
+from collections import defaultdict, deque
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
 from .logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-def load_documents(url: str = "https://lilianweng.github.io/posts/2023-06-23-agent/"):
+DEFAULT_URL = "https://lilianweng.github.io/posts/2023-06-23-agent/"
+POST_CLASSES = ("post-content", "post-title", "post-header")
+
+
+def parse_html(html: str, url: str) -> Document:
+    """Extrai o conteúdo do post com BeautifulSoup, como o WebBaseLoader."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(class_=POST_CLASSES))
+    return Document(page_content=soup.get_text(), metadata={"source": url})
+
+
+class HttpCache:
+    """Cache em disco de ETag/Last-Modified e do conteúdo já extraído de cada URL."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> dict | None:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: dict) -> None:
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class ConcurrentWebLoader:
+    """
+    Carrega várias URLs em paralelo sobre uma sessão HTTP com pool de conexões.
+
+    ``max_per_host`` limita as requisições simultâneas a um mesmo host. Com
+    ``cache_dir``, as respostas guardam ETag/Last-Modified e o texto extraído;
+    nas execuções seguintes é feito um GET condicional e páginas inalteradas
+    (HTTP 304) são devolvidas do cache sem novo parsing.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        cache_dir: str | None = None,
+        max_workers: int = 16,
+        max_per_host: int = 4,
+        timeout: float = 30.0,
+        parser=None,
+    ):
+        self.urls = list(dict.fromkeys(urls))
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.parser = parser or parse_html
+        self.stats = {"fetched": 0, "not_modified": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(self.max_per_host))
+        self._host_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        with self._host_lock:
+            return self._host_limits[urlparse(url).netloc]
+
+    def _fetch(self, url: str) -> Document | None:
+        entry = self.cache.get(url) if self.cache else None
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            with self._host_limit(url):
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                self._count("not_modified")
+                return Document(page_content=entry["page_content"], metadata=entry["metadata"])
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            logger.warning("Falha ao carregar %s: %s", url, exc)
+            self._count("failed")
+            return None
+
+        doc = self.parser(response.text, url)
+        self._count("fetched")
+        if self.cache:
+            self.cache.put(url, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "page_content": doc.page_content,
+                "metadata": doc.metadata,
+            })
+        return doc
+
+    def iter_load(self) -> Iterator[Document]:
+        """
+        Gera os documentos na ordem das URLs, omitindo as que falharam.
+
+        No máximo ``2 * max_workers`` páginas ficam em memória ao mesmo tempo.
+        """
+        if not self.urls:
+            return
+        workers = min(self.max_workers, len(self.urls))
+        window = 2 * workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for url in self.urls:
+                pending.append(executor.submit(self._fetch, url))
+                if len(pending) >= window:
+                    doc = pending.popleft().result()
+                    if doc is not None:
+                        yield doc
+            while pending:
+                doc = pending.popleft().result()
+                if doc is not None:
+                    yield doc
+        logger.info(
+            "URLs carregadas: %d baixadas, %d inalteradas (304), %d falhas",
+            self.stats["fetched"], self.stats["not_modified"], self.stats["failed"],
+        )
+
+    def load(self) -> list[Document]:
+        """Retorna os documentos na ordem das URLs, omitindo as que falharam."""
+        return list(self.iter_load())
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def fetch_sitemap_urls(sitemap_url: str, session: requests.Session | None = None, timeout: float = 30.0) -> list[str]:
+    """Lê um sitemap (ou índice de sitemaps) e retorna as URLs das páginas."""
+    session = session or requests.Session()
+    response = session.get(sitemap_url, timeout=timeout)
+    response.raise_for_status()
+    root = ET.fromstring(response.content)
+    namespace = root.tag.split("}")[0] + "}" if root.tag.startswith("{") else ""
+    locs = [loc.text.strip() for loc in root.iter(f"{namespace}loc") if loc.text]
+    if root.tag == f"{namespace}sitemapindex":
+        urls = []
+        for child in locs:
+            urls.extend(fetch_sitemap_urls(child, session, timeout))
+        return urls
+    return locs
+
+
+def load_documents(
+    url: str | list[str] | None = None,
+    sitemap_url: str | None = None,
+    cache_dir: str | None = None,
+    max_workers: int = 16,
+    max_per_host: int = 4,
+):
     """
     Carrega documentos de uma URL usando WebBaseLoader e BeautifulSoup.
+
+    Para uma lista de URLs ou um ``sitemap_url``, as páginas são buscadas em
+    paralelo por :class:`ConcurrentWebLoader`, com GET condicional quando
+    ``cache_dir`` (ou HTTP_CACHE_DIR) está definido.
     """
-    loader = WebBaseLoader(
-        web_path=url,
-        bs_kwargs=dict(
-            parse_only=SoupStrainer(
-                class_=("post-content", "post-title", "post-header")
-            )
-        ),
-    )
-    return loader.load()
+    if url is None and sitemap_url is None:
+        url = DEFAULT_URL
+    if isinstance(url, str) and sitemap_url is None:
+        # langchain_community é pesado: importado só no caminho que o usa
+        from langchain_community.document_loaders import WebBaseLoader
+
+        loader = WebBaseLoader(
+            web_path=url,
+            bs_kwargs=dict(
+                parse_only=SoupStrainer(
+                    class_=POST_CLASSES
+                )
+            ),
+        )
+        return loader.load()
+    return list(iter_documents(url, sitemap_url, cache_dir, max_workers, max_per_host))
+
+
+def iter_documents(
+    url: str | list[str] | None = None,
+    sitemap_url: str | None = None,
+    cache_dir: str | None = None,
+    max_workers: int = 16,
+    max_per_host: int = 4,
+) -> Iterator[Document]:
+    """Versão em streaming de :func:`load_documents`: gera os documentos à medida que chegam."""
+    if (url is None or isinstance(url, str)) and sitemap_url is None:
+        yield from load_documents(url)
+        return
+
+    urls = [url] if isinstance(url, str) else list(url or [])
+    if cache_dir is None:
+        cache_dir = os.getenv("HTTP_CACHE_DIR")
+    loader = ConcurrentWebLoader(urls, cache_dir=cache_dir, max_workers=max_workers, max_per_host=max_per_host)
+    try:
+        if sitemap_url:
+            loader.urls = list(dict.fromkeys(loader.urls + fetch_sitemap_urls(sitemap_url, loader.session)))
+        yield from loader.iter_load()
+    finally:
+        loader.close()
 
 if __name__ == "__main__":
     docs = load_documents()
@@ -0,0 +1,55 @@
+"""Modelos fictícios, sem rede, para benchmarks e testes de carga."""
+
+import time
+import asyncio
+import hashlib
+import threading
+import numpy as np
+
+
+class FakeEmbeddings:
+    """
+    Embeddings determinísticos (hash do texto) com latência configurável.
+
+    Cada chamada ao "modelo" custa ``latency`` segundos mais ``per_item_latency``
+    por texto, imitando o round trip de uma API remota. ``max_concurrency``
+    limita as chamadas síncronas simultâneas, como o limite de conexões de uma API.
+    ``calls`` e ``texts`` contam as chamadas e os textos embedados.
+    """
+
+    def __init__(self, dim: int = 64, latency: float = 0.0, per_item_latency: float = 0.0, max_concurrency: int | None = None):
+        self.dim = dim
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32).tolist()
+
+    def _cost(self, n: int) -> float:
+        with self._lock:
+            self.calls += 1
+            self.texts += n
+        return self.latency + self.per_item_latency * n
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self._slots is None:
+            time.sleep(self._cost(len(texts)))
+        else:
+            with self._slots:
+                time.sleep(self._cost(len(texts)))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self._cost(len(texts)))
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
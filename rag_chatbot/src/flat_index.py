@@ -0,0 +1,369 @@
+"""Índice vetorial exato em memória baseado em NumPy."""
+
+import json
+import uuid
+import asyncio
+import logging
+import numpy as np
+from langchain_core.documents import Document
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Converte para float32 contíguo e normaliza cada linha pela norma L2."""
+    matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+async def aembed_query(embedding, text: str):
+    """Usa ``aembed_query`` do modelo, se existir; senão ``embed_query`` em uma thread."""
+    aembed = getattr(embedding, "aembed_query", None)
+    if callable(aembed):
+        return await aembed(text)
+    return await asyncio.to_thread(embedding.embed_query, text)
+
+
+def metadata_key(value):
+    """Chave de dicionário para um valor de metadados (listas e dicts viram JSON)."""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("json", json.dumps(value, sort_keys=True, default=str))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices das ``k`` maiores pontuações de cada linha, em ordem decrescente."""
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class FlatIndexRetriever:
+    """Retriever mínimo com a mesma interface ``invoke`` usada pelos grafos."""
+
+    def __init__(self, index, search_kwargs: dict | None = None):
+        self.index = index
+        self.search_kwargs = dict(search_kwargs or {})
+
+    def invoke(self, query: str, config=None, **kwargs) -> list[Document]:
+        return self.index.similarity_search(query, **self.search_kwargs)
+
+    async def ainvoke(self, query: str, config=None, **kwargs) -> list[Document]:
+        return await self.index.asimilarity_search(query, **self.search_kwargs)
+
+    def batch(self, queries: list[str], config=None, **kwargs) -> list[list[Document]]:
+        return self.index.batch_similarity_search(queries, **self.search_kwargs)
+
+
+class VectorSearchMixin:
+    """Métodos de busca comuns, implementados sobre ``search_by_vectors``."""
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict | None = None, **kwargs) -> list[Document]:
+        return [doc for doc, _ in self.search_by_vectors([embedding], k=k, filter=filter)[0]]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None, **kwargs):
+        vector = self.embedding.embed_query(query)
+        return self.search_by_vectors([vector], k=k, filter=filter)[0]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None, **kwargs):
+        # Só o embedding é assíncrono; a busca em memória é rápida o bastante para o loop
+        vector = await aembed_query(self.embedding, query)
+        return self.search_by_vectors([vector], k=k, filter=filter)[0]
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs) -> list[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k=k, filter=filter)]
+
+    def batch_similarity_search(self, queries: list[str], k: int = 4, filter: dict | None = None, **kwargs) -> list[list[Document]]:
+        """Executa várias consultas com uma única multiplicação de matrizes."""
+        if not queries:
+            return []
+        vectors = [self.embedding.embed_query(q) for q in queries]
+        return [[doc for doc, _ in hits] for hits in self.search_by_vectors(vectors, k=k, filter=filter)]
+
+    def as_retriever(self, search_kwargs: dict | None = None, **kwargs) -> FlatIndexRetriever:
+        return FlatIndexRetriever(self, search_kwargs)
+
+
+class FlatVectorIndex(VectorSearchMixin):
+    """
+    Busca exata por similaridade de cosseno sobre uma matriz float32 contígua.
+
+    Os embeddings são normalizados na inserção, então a busca é um único
+    produto de matrizes seguido de ``argpartition``. Expõe a mesma superfície
+    (``similarity_search``, ``as_retriever``, ``add_documents``, ``delete``)
+    usada com o Chroma no restante do projeto.
+    """
+
+    def __init__(self, embedding, dim: int | None = None):
+        self.embedding = embedding
+        self.ids: list[str] = []
+        self.documents: list[Document] = []
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        # Colunas de códigos dos metadados filtrados: chave -> (valor -> código, códigos por linha)
+        self._columns: dict[str, tuple[dict, np.ndarray]] = {}
+        # Incrementado a cada alteração; usado para invalidar caches de respostas
+        self.index_version = 0
+
+    @classmethod
+    def from_documents(cls, documents: list[Document], embedding, ids: list[str] | None = None, **kwargs):
+        index = cls(embedding, **kwargs)
+        index.add_documents(documents, ids=ids)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Visão das linhas ocupadas da matriz de embeddings."""
+        return self._matrix[:self._size]
+
+    def _reserve(self, extra: int, dim: int) -> None:
+        if self._size and self._matrix.shape[1] != dim:
+            raise ValueError(f"Dimensão {dim} incompatível com o índice ({self._matrix.shape[1]}).")
+        needed = self._size + extra
+        if needed <= self._matrix.shape[0] and self._matrix.shape[1] == dim:
+            return
+        # Crescimento geométrico para amortizar inserções incrementais
+        capacity = max(needed, 2 * self._matrix.shape[0], 16)
+        grown = np.empty((capacity, dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def _materialize(self) -> None:
+        """Copia para listas as colunas de um snapshot (somente leitura) antes de alterar o índice."""
+        if not isinstance(self.documents, list):
+            self.documents = list(self.documents)
+            self.ids = list(self.ids)
+
+    def add_embeddings(self, documents: list[Document], embeddings, ids: list[str] | None = None) -> list[str]:
+        """Insere documentos com embeddings já calculados."""
+        documents = list(documents)
+        if not documents:
+            return []
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+        if len(ids) != len(documents):
+            raise ValueError("O número de ids deve ser igual ao número de documentos.")
+        self._materialize()
+        vectors = normalize_rows(embeddings)
+        self._reserve(len(documents), vectors.shape[1])
+        self._matrix[self._size:self._size + len(documents)] = vectors
+        self._size += len(documents)
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        for key, (lookup, codes) in self._columns.items():
+            self._columns[key] = (lookup, np.concatenate([codes, _encode_column(lookup, key, documents)]))
+        self.index_version += 1
+        return list(ids)
+
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None, **kwargs) -> list[str]:
+        documents = list(documents)
+        if not documents:
+            return []
+        embeddings = self.embedding.embed_documents([d.page_content for d in documents])
+        return self.add_embeddings(documents, embeddings, ids=ids)
+
+    def delete(self, ids: list[str] | None = None, **kwargs) -> None:
+        if not ids:
+            return
+        to_remove = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in to_remove]
+        if len(keep) == self._size:
+            return
+        self._materialize()
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+        self._columns = {key: (lookup, codes[keep]) for key, (lookup, codes) in self._columns.items()}
+        self._size = len(keep)
+        self.index_version += 1
+
+    def _column(self, key: str) -> tuple[dict, np.ndarray]:
+        """Códigos de ``key`` por linha, montados na primeira busca filtrada e mantidos nas alterações."""
+        column = self._columns.get(key)
+        if column is None:
+            lookup: dict = {}
+            column = self._columns[key] = (lookup, _encode_column(lookup, key, self.documents))
+        return column
+
+    def _filter_mask(self, filter: dict | None) -> np.ndarray | None:
+        """Máscara das linhas cujos metadados têm todos os pares de ``filter`` (chave ausente = None)."""
+        if not filter:
+            return None
+        select = getattr(self.documents, "select", None)
+        if select is not None:
+            # Snapshot: filtra pelos códigos das colunas de metadados, sem criar Documents
+            mask = np.zeros(self._size, dtype=bool)
+            mask[select(filter)] = True
+            return mask
+        mask = np.ones(self._size, dtype=bool)
+        for key, value in filter.items():
+            lookup, codes = self._column(key)
+            code = lookup.get(metadata_key(value))
+            if code is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= codes == code
+        return mask
+
+    def _filter_rows(self, filter: dict | None) -> np.ndarray | None:
+        mask = self._filter_mask(filter)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def search_by_vectors(self, vectors, k: int = 4, filter: dict | None = None) -> list[list[tuple[Document, float]]]:
+        """Busca em lote: pontua todas as consultas com um único produto de matrizes."""
+        queries = normalize_rows(vectors)
+        if self._size == 0:
+            return [[] for _ in range(queries.shape[0])]
+        rows = self._filter_rows(filter)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        scores = queries @ matrix.T
+        results = []
+        for query_scores, positions in zip(scores, top_k(scores, k)):
+            hits = []
+            for pos in positions:
+                row = pos if rows is None else rows[pos]
+                hits.append((self.documents[row], float(query_scores[pos])))
+            results.append(hits)
+        return results
+
+
+def _encode_column(lookup: dict, key: str, documents) -> np.ndarray:
+    """Códigos de ``doc.metadata.get(key)``, acrescentando valores novos a ``lookup``."""
+    codes = np.empty(len(documents), dtype=np.int32)
+    for i, doc in enumerate(documents):
+        codes[i] = lookup.setdefault(metadata_key(doc.metadata.get(key)), len(lookup))
+    return codes
+
+
+class PartitionedVectorIndex(VectorSearchMixin):
+    """
+    Índice particionado fisicamente por um campo de metadados (por padrão ``section``).
+
+    Cada valor do campo tem o seu próprio índice, então uma consulta filtrada
+    pontua apenas a sua partição em vez de aplicar um predicado de metadados
+    sobre o corpus inteiro. Se a partição retornar menos de ``min_hits``
+    resultados (padrão: ``k``), as demais partições completam a resposta.
+    """
+
+    def __init__(self, embedding, partition_key: str = "section", index_factory=None, min_hits: int | None = None):
+        self.embedding = embedding
+        self.partition_key = partition_key
+        self.index_factory = index_factory or FlatVectorIndex
+        self.min_hits = min_hits
+        self.partitions: dict = {}
+        self._partition_of: dict[str, object] | None = {}
+        self.index_version = 0
+
+    @classmethod
+    def from_documents(cls, documents: list[Document], embedding, ids: list[str] | None = None, **kwargs):
+        index = cls(embedding, **kwargs)
+        index.add_documents(documents, ids=ids)
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self.partitions.values())
+
+    def _materialize(self) -> None:
+        """Reconstrói o mapa id -> partição de um índice carregado de um snapshot."""
+        if self._partition_of is None:
+            self._partition_of = {
+                doc_id: value for value, partition in self.partitions.items() for doc_id in partition.ids
+            }
+
+    def _get_partition(self, value):
+        partition = self.partitions.get(value)
+        if partition is None:
+            partition = self.partitions[value] = self.index_factory(self.embedding)
+        return partition
+
+    def add_embeddings(self, documents: list[Document], embeddings, ids: list[str] | None = None) -> list[str]:
+        documents = list(documents)
+        if not documents:
+            return []
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+        if len(ids) != len(documents):
+            raise ValueError("O número de ids deve ser igual ao número de documentos.")
+        groups: dict = {}
+        for doc, vector, doc_id in zip(documents, embeddings, ids):
+            value = doc.metadata.get(self.partition_key)
+            group = groups.setdefault(value, ([], [], []))
+            group[0].append(doc)
+            group[1].append(vector)
+            group[2].append(doc_id)
+        self._materialize()
+        for value, (docs, vectors, group_ids) in groups.items():
+            self._get_partition(value).add_embeddings(docs, vectors, ids=group_ids)
+            for doc_id in group_ids:
+                self._partition_of[doc_id] = value
+        self.index_version += 1
+        return list(ids)
+
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None, **kwargs) -> list[str]:
+        documents = list(documents)
+        if not documents:
+            return []
+        # Um único lote de embeddings para todas as partições
+        embeddings = self.embedding.embed_documents([d.page_content for d in documents])
+        return self.add_embeddings(documents, embeddings, ids=ids)
+
+    def delete(self, ids: list[str] | None = None, **kwargs) -> None:
+        self._materialize()
+        groups: dict = {}
+        for doc_id in ids or []:
+            if doc_id in self._partition_of:
+                groups.setdefault(self._partition_of.pop(doc_id), []).append(doc_id)
+        for value, group_ids in groups.items():
+            self.partitions[value].delete(ids=group_ids)
+        if groups:
+            self.index_version += 1
+
+    def _search_partitions(self, values, vectors, k: int, filter: dict | None):
+        merged = [[] for _ in range(len(vectors))]
+        for value in values:
+            for hits, partition_hits in zip(merged, self.partitions[value].search_by_vectors(vectors, k=k, filter=filter)):
+                hits.extend(partition_hits)
+        return [sorted(hits, key=lambda hit: hit[1], reverse=True)[:k] for hits in merged]
+
+    def search_by_vectors(self, vectors, k: int = 4, filter: dict | None = None) -> list[list[tuple[Document, float]]]:
+        vectors = list(vectors)
+        filter = dict(filter or {})
+        if self.partition_key not in filter:
+            return self._search_partitions(list(self.partitions), vectors, k, filter or None)
+
+        value = filter.pop(self.partition_key)
+        residual = filter or None
+        if value in self.partitions:
+            results = self.partitions[value].search_by_vectors(vectors, k=k, filter=residual)
+        else:
+            results = [[] for _ in vectors]
+
+        min_hits = min(k, self.min_hits if self.min_hits is not None else k)
+        short = [i for i, hits in enumerate(results) if len(hits) < min_hits]
+        if short:
+            others = [v for v in self.partitions if v != value]
+            fallback = self._search_partitions(others, [vectors[i] for i in short], k, residual)
+            for i, extra in zip(short, fallback):
+                results[i] = results[i] + extra[:k - len(results[i])]
+        return results
@@ -0,0 +1,155 @@
+"""Reindexação incremental baseada em fingerprints de chunks."""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass
+from langchain_core.documents import Document
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "index_manifest.json"
+
+_version_lock = threading.Lock()
+
+
+@dataclass
+class IndexSyncResult:
+    """Resumo de uma sincronização incremental do índice."""
+
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Identificador estável do chunk, derivado de (source, start_index).
+
+    Sem ``start_index`` (splitters que não o registram), o hash do texto
+    ocupa o lugar da posição: caso contrário todos os chunks da mesma fonte
+    teriam o mesmo id e só o último seria indexado.
+    """
+    source = doc.metadata.get("source", "")
+    start_index = doc.metadata.get("start_index")
+    if start_index is None:
+        start_index = "text:" + hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{source}\x00{start_index}".encode("utf-8")).hexdigest()
+
+
+def content_hash(doc: Document) -> str:
+    """Hash do conteúdo e dos metadados do chunk."""
+    metadata = json.dumps(doc.metadata, sort_keys=True, default=str)
+    return hashlib.sha256(f"{doc.page_content}\x00{metadata}".encode("utf-8")).hexdigest()
+
+
+def manifest_entry(doc: Document) -> dict:
+    """Fingerprint do chunk gravada no manifesto."""
+    return {
+        "source": doc.metadata.get("source", ""),
+        "start_index": doc.metadata.get("start_index"),
+        "hash": content_hash(doc),
+    }
+
+
+def load_manifest(path: str) -> dict:
+    """Carrega o manifesto de fingerprints, ou um dicionário vazio se não existir."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    """Grava o manifesto de forma atômica, em um arquivo temporário único por gravação."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def bump_index_version(vector_store) -> int:
+    """
+    Incrementa ``vector_store.index_version`` após uma escrita, em qualquer backend.
+
+    Os índices NumPy já incrementam o contador nas próprias alterações; no
+    Chroma ele só existe por causa desta função. O cache semântico compara a
+    versão para descartar respostas calculadas sobre o índice antigo.
+    """
+    with _version_lock:
+        version = getattr(vector_store, "index_version", 0) + 1
+        vector_store.index_version = version
+    return version
+
+
+def sync_vector_store(vector_store, documents: list[Document], manifest_path: str, persist=None) -> IndexSyncResult:
+    """
+    Sincroniza o vector store com ``documents`` usando o manifesto em ``manifest_path``.
+
+    Apenas chunks novos ou alterados são embedados e inseridos; chunks que
+    desapareceram são removidos. O custo é proporcional à mudança, não ao
+    tamanho do corpus.
+
+    ``persist``, se houver, grava o índice quando algo mudou e roda antes do
+    manifesto: se falhar, o manifesto antigo continua valendo e a próxima
+    sincronização reaplica as mudanças em vez de pular chunks nunca salvos.
+    """
+    previous = load_manifest(manifest_path)
+
+    current = {}
+    docs_by_id = {}
+    for doc in documents:
+        doc_id = chunk_id(doc)
+        docs_by_id[doc_id] = doc
+        current[doc_id] = manifest_entry(doc)
+
+    result = IndexSyncResult()
+    upsert_ids = []
+    for doc_id, entry in current.items():
+        old = previous.get(doc_id)
+        if old is None:
+            result.added += 1
+            upsert_ids.append(doc_id)
+        elif old["hash"] != entry["hash"]:
+            result.updated += 1
+            upsert_ids.append(doc_id)
+        else:
+            result.unchanged += 1
+
+    stale_ids = [doc_id for doc_id in previous if doc_id not in current]
+    result.deleted = len(stale_ids)
+
+    # Remove as versões antigas dos chunks alterados antes de reinseri-los
+    delete_ids = stale_ids + [doc_id for doc_id in upsert_ids if doc_id in previous]
+    if delete_ids:
+        vector_store.delete(ids=delete_ids)
+    if upsert_ids:
+        vector_store.add_documents([docs_by_id[i] for i in upsert_ids], ids=upsert_ids)
+
+    if delete_ids or upsert_ids:
+        bump_index_version(vector_store)
+        if persist is not None:
+            persist()
+    save_manifest(manifest_path, current)
+    logger.info(
+        "Índice sincronizado: %d novos, %d alterados, %d removidos, %d inalterados",
+        result.added, result.updated, result.deleted, result.unchanged,
+    )
+    return result
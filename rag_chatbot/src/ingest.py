@@ -0,0 +1,256 @@
+"""Pipeline de ingestão em streaming: load → split → embed → upsert com memória limitada."""
+
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+from langchain_core.documents import Document
+from .text_splitter import split_documents
+from .indexing import IndexSyncResult, bump_index_version, chunk_id, load_manifest, manifest_entry, save_manifest
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Contadores de um estágio do pipeline."""
+
+    items: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class IngestStats:
+    """Vazão por estágio de uma execução de :func:`ingest_documents`."""
+
+    load: StageStats = field(default_factory=StageStats)
+    split: StageStats = field(default_factory=StageStats)
+    embed: StageStats = field(default_factory=StageStats)
+    upsert: StageStats = field(default_factory=StageStats)
+    elapsed: float = 0.0
+    # Diferença em relação ao manifesto, quando a ingestão usa um (``manifest_path``)
+    sync: IndexSyncResult | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            name: {"items": stage.items, "seconds": stage.seconds, "per_second": stage.throughput}
+            for name, stage in (("load", self.load), ("split", self.split), ("embed", self.embed), ("upsert", self.upsert))
+        }
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class _Stage(threading.Thread):
+    """Thread que consome uma fila de entrada e produz em uma fila limitada."""
+
+    def __init__(self, name: str, work, output: queue.Queue, stop: threading.Event):
+        super().__init__(name=f"ingest-{name}", daemon=True)
+        self.work = work
+        self.output = output
+        self.stop = stop
+
+    def put(self, item) -> bool:
+        # put com timeout para não travar se o consumidor desistiu
+        while not self.stop.is_set():
+            try:
+                self.output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        try:
+            for item in self.work():
+                if not self.put(item):
+                    return
+            self.put(_DONE)
+        except BaseException as exc:  # propagado para a thread principal
+            self.put(_Failure(exc))
+
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterator:
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.exc
+        yield item
+
+
+def _timed(iterable: Iterable, stats: StageStats, count=lambda item: 1) -> Iterator:
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.seconds += time.perf_counter() - start
+            return
+        stats.seconds += time.perf_counter() - start
+        stats.items += count(item)
+        yield item
+
+
+def ingest_documents(
+    documents: Iterable[Document],
+    vector_store,
+    embeddings=None,
+    batch_size: int = 64,
+    queue_size: int = 4,
+    splitter=split_documents,
+    manifest_path: str | None = None,
+    persist=None,
+) -> IngestStats:
+    """
+    Indexa ``documents`` em ``vector_store`` em lotes, sem materializar o corpus.
+
+    Cada estágio roda em sua própria thread e se comunica pelo próximo por
+    filas de tamanho ``queue_size``; um estágio lento bloqueia os anteriores
+    (back-pressure), então no máximo alguns lotes de ``batch_size`` chunks
+    estão em memória ao mesmo tempo. Os documentos são divididos um a um.
+
+    Se o store expõe ``add_embeddings`` (índices NumPy), os vetores são
+    calculados no estágio de embedding com ``embeddings`` (por padrão
+    ``vector_store.embedding``); caso contrário (Chroma) o próprio store
+    calcula os embeddings em ``add_documents``.
+
+    Com ``manifest_path``, a ingestão é incremental como
+    :func:`~rag_chatbot.src.indexing.sync_vector_store`: chunks com o mesmo
+    fingerprint do manifesto são descartados já no split (nem são embedados),
+    as versões antigas dos alterados são removidas antes do upsert e, no fim,
+    os chunks que sumiram da fonte são apagados. Só o manifesto (um hash por
+    chunk) fica inteiro em memória. ``persist`` grava o índice quando algo
+    mudou, antes do manifesto, pelo mesmo motivo que em ``sync_vector_store``.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size deve ser maior que zero.")
+    stats = IngestStats()
+    previous = load_manifest(manifest_path) if manifest_path else None
+    current: dict[str, dict] = {}
+    if previous is not None:
+        stats.sync = IndexSyncResult()
+    stop = threading.Event()
+    started = time.perf_counter()
+    add_embeddings = getattr(vector_store, "add_embeddings", None)
+    if embeddings is None:
+        embeddings = getattr(vector_store, "embedding", None)
+    precompute = callable(add_embeddings) and embeddings is not None
+
+    docs_queue = queue.Queue(maxsize=queue_size)
+    batches_queue = queue.Queue(maxsize=queue_size)
+    embedded_queue = queue.Queue(maxsize=queue_size)
+
+    def load_stage():
+        yield from _timed(documents, stats.load)
+
+    def changed(chunk: Document) -> bool:
+        # Registra o chunk no manifesto novo e diz se precisa ser (re)indexado
+        doc_id = chunk_id(chunk)
+        entry = current[doc_id] = manifest_entry(chunk)
+        old = previous.get(doc_id)
+        if old is None:
+            stats.sync.added += 1
+        elif old["hash"] != entry["hash"]:
+            stats.sync.updated += 1
+        else:
+            stats.sync.unchanged += 1
+            return False
+        return True
+
+    def split_stage():
+        batch = []
+        for doc in _drain(docs_queue, stop):
+            start = time.perf_counter()
+            chunks = splitter([doc])
+            stats.split.seconds += time.perf_counter() - start
+            stats.split.items += len(chunks)
+            for chunk in chunks:
+                if previous is not None and not changed(chunk):
+                    continue
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def embed_stage():
+        for batch in _drain(batches_queue, stop):
+            vectors = None
+            if precompute:
+                start = time.perf_counter()
+                vectors = embeddings.embed_documents([c.page_content for c in batch])
+                stats.embed.seconds += time.perf_counter() - start
+                stats.embed.items += len(batch)
+            yield batch, vectors
+
+    stages = [
+        _Stage("load", load_stage, docs_queue, stop),
+        _Stage("split", split_stage, batches_queue, stop),
+        _Stage("embed", embed_stage, embedded_queue, stop),
+    ]
+    for stage in stages:
+        stage.start()
+
+    try:
+        for batch, vectors in _drain(embedded_queue, stop):
+            start = time.perf_counter()
+            ids = [chunk_id(c) for c in batch]
+            if previous is not None:
+                # Remove as versões antigas dos chunks alterados antes de reinseri-los
+                replaced = [doc_id for doc_id in ids if doc_id in previous]
+                if replaced:
+                    vector_store.delete(ids=replaced)
+            if vectors is not None:
+                add_embeddings(batch, vectors, ids=ids)
+            else:
+                vector_store.add_documents(batch, ids=ids)
+            bump_index_version(vector_store)
+            stats.upsert.seconds += time.perf_counter() - start
+            stats.upsert.items += len(batch)
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join()
+
+    deleted = 0
+    if previous is not None:
+        stale_ids = [doc_id for doc_id in previous if doc_id not in current]
+        stats.sync.deleted = deleted = len(stale_ids)
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+            bump_index_version(vector_store)
+    if persist is not None and (stats.upsert.items or deleted):
+        persist()
+    if previous is not None:
+        save_manifest(manifest_path, current)
+        logger.info(
+            "Índice sincronizado: %d novos, %d alterados, %d removidos, %d inalterados",
+            stats.sync.added, stats.sync.updated, stats.sync.deleted, stats.sync.unchanged,
+        )
+
+    stats.elapsed = time.perf_counter() - started
+    if not precompute:
+        # O store calculou os embeddings dentro do upsert
+        stats.embed = StageStats(stats.upsert.items, stats.upsert.seconds)
+    for name, values in stats.as_dict().items():
+        logger.info("Ingestão [%s]: %d itens, %.1f/s", name, values["items"], values["per_second"])
+    return stats
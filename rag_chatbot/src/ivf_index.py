@@ -0,0 +1,244 @@
+"""Índice aproximado IVF (inverted file) em NumPy, apenas CPU."""
+
+import os
+import json
+import time
+import logging
+import numpy as np
+from langchain_core.documents import Document
+from .flat_index import FlatVectorIndex, normalize_rows, top_k
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def train_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """K-means esférico: retorna ``n_clusters`` centróides normalizados."""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # Reinicia clusters vazios em pontos aleatórios
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFVectorIndex(FlatVectorIndex):
+    """
+    Índice IVF: os vetores são agrupados em ``n_lists`` listas por k-means e a
+    busca pontua apenas as ``nprobe`` listas mais próximas da consulta.
+
+    ``nprobe`` controla o compromisso entre recall e latência e pode ser
+    alterado a qualquer momento. Enquanto o índice tem menos de
+    ``min_train_size`` vetores a busca é exata; ao atingir esse tamanho os
+    centróides são treinados automaticamente. Inserções posteriores são
+    atribuídas à lista mais próxima, e o índice é retreinado quando passa de
+    ``retrain_factor`` vezes o tamanho do último treino (sem ``n_lists``, o
+    número de listas acompanha a raiz do tamanho). Veja :meth:`train`.
+
+    Filtros de metadados são aplicados às listas sondadas por máscaras NumPy;
+    se sobrarem menos de ``k`` linhas, a busca é exata sobre todas as linhas
+    que passam no filtro.
+    """
+
+    def __init__(
+        self,
+        embedding,
+        dim: int | None = None,
+        n_lists: int | None = None,
+        nprobe: int = 8,
+        min_train_size: int = 1000,
+        n_iter: int = 10,
+        seed: int = 0,
+        retrain_factor: float = 4.0,
+    ):
+        super().__init__(embedding, dim=dim)
+        # Sem n_lists, cada treino usa ~sqrt(n) listas
+        self.auto_lists = n_lists is None
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.n_iter = n_iter
+        self.seed = seed
+        self.retrain_factor = retrain_factor
+        self.trained_size = 0
+        self.centroids: np.ndarray | None = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists: list[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, n_lists: int | None = None) -> None:
+        """(Re)treina os centróides com todos os vetores atuais e reconstrói as listas."""
+        if self._size == 0:
+            raise ValueError("Não é possível treinar um índice vazio.")
+        if n_lists:
+            self.auto_lists = False
+        elif not self.auto_lists:
+            n_lists = self.n_lists
+        n_lists = n_lists or max(1, int(np.sqrt(self._size)))
+        start = time.time()
+        self.centroids = train_kmeans(self.matrix, n_lists, n_iter=self.n_iter, seed=self.seed)
+        self.n_lists = len(self.centroids)
+        self.trained_size = self._size
+        self._assignments = self._assign(self.matrix)
+        self._rebuild_lists()
+        logger.info("Índice IVF treinado com %d listas em %.2fs", self.n_lists, time.time() - start)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _rebuild_lists(self) -> None:
+        order = np.argsort(self._assignments, kind="stable")
+        bounds = np.searchsorted(self._assignments[order], np.arange(self.n_lists + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+
+    def add_embeddings(self, documents: list[Document], embeddings, ids: list[str] | None = None) -> list[str]:
+        start = self._size
+        ids = super().add_embeddings(documents, embeddings, ids=ids)
+        if not ids:
+            return ids
+        if not self.is_trained:
+            if self._size >= self.min_train_size:
+                self.train()
+            return ids
+        if self.retrain_factor and self._size >= self.retrain_factor * self.trained_size:
+            # Ingestão em lotes: as listas treinadas no início não representam mais o corpus
+            self.train()
+            return ids
+        new_assignments = self._assign(self.matrix[start:])
+        self._assignments = np.concatenate([self._assignments, new_assignments])
+        rows = np.arange(start, self._size)
+        for list_id in np.unique(new_assignments):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], rows[new_assignments == list_id]])
+        return ids
+
+    def delete(self, ids: list[str] | None = None, **kwargs) -> None:
+        if not ids:
+            return
+        to_remove = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in to_remove]
+        super().delete(ids=ids)
+        if self.is_trained and len(keep) != len(self._assignments):
+            self._assignments = self._assignments[keep]
+            self._rebuild_lists()
+
+    def search_by_vectors(self, vectors, k: int = 4, filter: dict | None = None) -> list[list[tuple[Document, float]]]:
+        if not self.is_trained:
+            return super().search_by_vectors(vectors, k=k, filter=filter)
+
+        queries = normalize_rows(vectors)
+        nprobe = max(1, min(self.nprobe, self.n_lists))
+        probes = top_k(queries @ self.centroids.T, nprobe)
+        matrix = self.matrix
+        mask = self._filter_mask(filter)
+        available = self._size if mask is None else int(mask.sum())
+        results = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([self._lists[i] for i in lists])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if len(rows) < min(k, available):
+                # Listas sondadas sem linhas suficientes: busca exata no conjunto filtrado
+                rows = np.arange(self._size) if mask is None else np.flatnonzero(mask)
+            scores = matrix[rows] @ query
+            positions = top_k(scores, k)[0]
+            results.append([(self.documents[rows[p]], float(scores[p])) for p in positions])
+        return results
+
+    def save(self, path: str) -> None:
+        """Persiste vetores, centróides e documentos no diretório ``path``."""
+        os.makedirs(path, exist_ok=True)
+        arrays = {"matrix": self.matrix, "assignments": self._assignments}
+        if self.is_trained:
+            arrays["centroids"] = self.centroids
+        np.savez(os.path.join(path, "vectors.npz"), **arrays)
+        payload = {
+            "n_lists": self.n_lists,
+            "nprobe": self.nprobe,
+            "min_train_size": self.min_train_size,
+            "auto_lists": self.auto_lists,
+            "retrain_factor": self.retrain_factor,
+            "trained_size": self.trained_size,
+            "documents": [
+                {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}
+                for doc_id, doc in zip(self.ids, self.documents)
+            ],
+        }
+        with open(os.path.join(path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path: str, embedding, **kwargs) -> "IVFVectorIndex":
+        """Carrega um índice salvo com :meth:`save`."""
+        with open(os.path.join(path, "documents.json"), encoding="utf-8") as f:
+            payload = json.load(f)
+        with np.load(os.path.join(path, "vectors.npz")) as data:
+            matrix = data["matrix"]
+            assignments = data["assignments"]
+            centroids = data["centroids"] if "centroids" in data.files else None
+
+        params = {
+            "n_lists": None if payload.get("auto_lists") else payload["n_lists"],
+            "nprobe": payload["nprobe"],
+            "min_train_size": payload["min_train_size"],
+            "retrain_factor": payload.get("retrain_factor", 4.0),
+        }
+        params.update(kwargs)
+        index = cls(embedding, **params)
+        records = payload["documents"]
+        # Usa a inserção da classe base para não reatribuir listas nem disparar treino
+        FlatVectorIndex.add_embeddings(
+            index,
+            [Document(page_content=r["page_content"], metadata=r["metadata"]) for r in records],
+            matrix,
+            ids=[r["id"] for r in records],
+        )
+        if centroids is not None:
+            index.centroids = centroids
+            index.n_lists = len(centroids)
+            index.trained_size = payload.get("trained_size", len(records))
+            index._assignments = assignments.astype(np.int32)
+            index._rebuild_lists()
+        return index
+
+
+def recall_at_k(index: IVFVectorIndex, query_vectors, k: int = 10) -> float:
+    """Fração dos ``k`` vizinhos exatos que o índice aproximado recupera."""
+    approx = index.search_by_vectors(query_vectors, k=k)
+    exact = FlatVectorIndex.search_by_vectors(index, query_vectors, k=k)
+    found = total = 0
+    for approx_hits, exact_hits in zip(approx, exact):
+        expected = {id(doc) for doc, _ in exact_hits}
+        found += len(expected & {id(doc) for doc, _ in approx_hits})
+        total += len(expected)
+    return found / total if total else 1.0
+
+
+if __name__ == "__main__":
+    # Mede recall@k e latência para diferentes valores de nprobe com dados sintéticos
+    rng = np.random.default_rng(0)
+    n, dim, k = 20000, 128, 10
+    centers = rng.normal(size=(64, dim))
+    data = centers[rng.integers(0, 64, n)] + 0.5 * rng.normal(size=(n, dim))
+    queries = centers[rng.integers(0, 64, 200)] + 0.5 * rng.normal(size=(200, dim))
+
+    ivf = IVFVectorIndex(embedding=None, n_lists=128)
+    ivf.add_embeddings([Document(page_content=str(i)) for i in range(n)], data)
+    for nprobe in (1, 2, 4, 8, 16, 32):
+        ivf.nprobe = nprobe
+        start = time.perf_counter()
+        ivf.search_by_vectors(queries, k=k)
+        elapsed = (time.perf_counter() - start) / len(queries)
+        recall = recall_at_k(ivf, queries, k=k)
+        logger.info("nprobe=%d recall@%d=%.3f (%.3f ms/consulta)", nprobe, k, recall, elapsed * 1000)
@@ -1,17 +1,17 @@
 import os
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 import logging
+from .config import load_config
 from .logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv(dotenv_path='rag_chatbot/.env')
-
 def get_chat_model(model_name: str = "gemini-1.5-pro", temperature: float = 0.7, api_key: str = None, timeout: int | None = None):
     """Configura e retorna o modelo de chat do Google Gemini."""
+    # SDK do Google importado só aqui: é a dependência mais pesada da inicialização
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_config()
     if api_key is None:
         api_key = os.getenv("GOOGLE_API_KEY")
     
@@ -1,13 +1,120 @@
-import logging
 import os
+import sys
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Request ID of the current request/task (contextvars follow asyncio tasks)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes present on every LogRecord; anything else came from ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: QueueListener | None = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def request_context(request_id: str | None = None):
+    """Tag every record logged inside the block (and tasks it spawns) with ``request_id``."""
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Copy the request ID into the record in the caller's context, before queueing."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a ``rate`` fraction of DEBUG records (INFO and above always pass)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Enqueue the record without formatting it.
+
+    ``QueueHandler.prepare`` renders the message in the calling thread; here
+    ``msg % args`` and exception formatting happen in the listener thread.
+    Records never leave the process, so nothing needs to be pickled.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request ID and any ``extra=`` fields."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
 
 
 def setup_logging():
-    """Configure basic logging using LOG_LEVEL env var."""
+    """Configure logging from LOG_LEVEL, LOG_FORMAT (text/json) and LOG_DEBUG_SAMPLE_RATE.
+
+    Records are put on an in-memory queue and written to stderr by a
+    ``QueueListener`` thread, so request threads never block on I/O.
+    Idempotent, like ``basicConfig``: does nothing if the root logger
+    already has handlers.
+    """
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return
     level_name = os.getenv("LOG_LEVEL", "INFO").upper()
-    level = getattr(logging, level_name, logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    )
+    root.setLevel(getattr(logging, level_name, logging.INFO))
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(DebugSamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))))
+    root.addHandler(queue_handler)
 
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on normal interpreter exit
+    atexit.register(_listener.stop)
@@ -0,0 +1,173 @@
+"""Memória de conversa limitada: turnos recentes literais + resumo incremental dos antigos."""
+
+import os
+import logging
+from dataclasses import dataclass
+from langchain_core.messages import HumanMessage, SystemMessage
+from .context_builder import CHARS_PER_TOKEN, estimate_tokens
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Sobrecarga aproximada de cada mensagem no prompt (papel, separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTION = (
+    "Você mantém o resumo de uma conversa entre um usuário e um assistente. "
+    "Atualize o resumo atual incorporando as novas mensagens. Preserve fatos, "
+    "preferências e perguntas em aberto do usuário; omita cumprimentos e repetições. "
+    "Responda apenas com o resumo, em no máximo {max_words} palavras."
+)
+
+_ROLES = {"human": "Usuário", "ai": "Assistente", "system": "Sistema"}
+
+
+def is_conversation_message(message) -> bool:
+    """Mensagens do diálogo: do usuário, de sistema e respostas finais do assistente (sem tool calls)."""
+    kind = getattr(message, "type", None)
+    if kind == "ai":
+        return not (getattr(message, "tool_calls", None) or message.additional_kwargs.get("tool_calls"))
+    return kind in ("human", "system")
+
+
+def split_turns(messages) -> list[list]:
+    """Agrupa as mensagens do diálogo em turnos, cada um iniciado por uma mensagem do usuário."""
+    turns: list[list] = []
+    for message in messages:
+        if not is_conversation_message(message):
+            continue
+        if message.type == "human" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+@dataclass
+class MemoryWindow:
+    """Resultado de :meth:`ConversationMemory.prepare`."""
+    messages: list
+    summary: str
+    summarized_turns: int
+    folded_turns: int = 0
+
+
+class ConversationMemory:
+    """
+    Mantém o prompt de uma conversa com tamanho aproximadamente constante.
+
+    Os turnos ainda não resumidos entram literalmente no prompt. Quando passam
+    de ``max_turns`` ou de ``token_budget`` tokens, os mais antigos são
+    incorporados ao resumo (uma chamada ao ``llm``) e ficam apenas os
+    ``keep_turns`` mais recentes, dentro de metade do orçamento. A folga entre
+    os dois limites faz o resumo ser atualizado a cada poucos turnos, e não a
+    cada pergunta. Sem ``llm``, os turnos antigos são apenas descartados.
+
+    O estado da memória (``summary`` e ``summarized_turns``, o número de turnos
+    já resumidos) vive no estado do grafo; as mensagens continuam completas
+    no histórico e só o prompt enviado ao LLM é limitado.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        max_turns: int = 8,
+        token_budget: int = 2000,
+        keep_turns: int | None = None,
+        summary_token_budget: int = 400,
+        token_counter=estimate_tokens,
+    ):
+        if max_turns < 1:
+            raise ValueError("max_turns deve ser maior que zero.")
+        self.llm = llm
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns if keep_turns is not None else max(1, max_turns // 2)
+        self.summary_token_budget = summary_token_budget
+        self.token_counter = token_counter
+        self.summaries = 0
+
+    @classmethod
+    def from_env(cls, llm=None) -> "ConversationMemory":
+        """Limites de MEMORY_MAX_TURNS (padrão 8) e MEMORY_TOKEN_BUDGET (padrão 2000)."""
+        return cls(
+            llm,
+            max_turns=int(os.getenv("MEMORY_MAX_TURNS", "8")),
+            token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "2000")),
+        )
+
+    def _tokens(self, turns) -> int:
+        return sum(
+            self.token_counter(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+            for turn in turns
+            for message in turn
+        )
+
+    def _over_limit(self, turns) -> bool:
+        return len(turns) > self.max_turns or self._tokens(turns) > self.token_budget
+
+    def _recent_count(self, turns) -> int:
+        """Quantos turnos finais cabem em ``keep_turns`` e em metade do orçamento (no mínimo um)."""
+        budget = self.token_budget // 2
+        used = 0
+        count = 0
+        for turn in reversed(turns[-self.keep_turns:]):
+            used += self._tokens([turn])
+            if count and used > budget:
+                break
+            count += 1
+        return count
+
+    def _plan(self, messages, summarized_turns: int):
+        turns = split_turns(messages)
+        summarized_turns = min(max(summarized_turns, 0), len(turns))
+        pending = turns[summarized_turns:]
+        fold: list[list] = []
+        if self._over_limit(pending):
+            keep = self._recent_count(pending)
+            fold, pending = pending[:-keep], pending[-keep:]
+        return fold, pending, summarized_turns + len(fold)
+
+    def _summary_prompt(self, summary: str, turns) -> list:
+        transcript = "\n".join(
+            f"{_ROLES.get(message.type, message.type)}: {message.content}"
+            for turn in turns
+            for message in turn
+        )
+        max_words = max(1, self.summary_token_budget * 3 // 4)
+        return [
+            SystemMessage(content=SUMMARY_INSTRUCTION.format(max_words=max_words)),
+            HumanMessage(content=f"Resumo atual:\n{summary or '(vazio)'}\n\nNovas mensagens:\n{transcript}"),
+        ]
+
+    def _clip_summary(self, result) -> str:
+        text = str(getattr(result, "content", result)).strip()
+        return text[: self.summary_token_budget * CHARS_PER_TOKEN]
+
+    def prompt_messages(self, summary: str, turns) -> list:
+        """Resumo (como mensagem de sistema) seguido dos turnos literais."""
+        messages = [SystemMessage(content=f"Resumo da conversa até aqui:\n{summary}")] if summary else []
+        for turn in turns:
+            messages.extend(turn)
+        return messages
+
+    def window(self, messages, summary: str = "", summarized_turns: int = 0) -> list:
+        """Mensagens para o prompt sem atualizar o resumo (nenhuma chamada ao LLM)."""
+        turns = split_turns(messages)
+        return self.prompt_messages(summary, turns[min(max(summarized_turns, 0), len(turns)):])
+
+    def prepare(self, messages, summary: str = "", summarized_turns: int = 0) -> MemoryWindow:
+        """Incorpora ao resumo os turnos que excedem os limites e monta o prompt."""
+        fold, pending, summarized_turns = self._plan(messages, summarized_turns)
+        if fold:
+            summary = self._fold(summary, fold)
+        return MemoryWindow(self.prompt_messages(summary, pending), summary, summarized_turns, len(fold))
+
+    def _fold(self, summary: str, turns) -> str:
+        if self.llm is None:
+            return summary
+        self.summaries += 1
+        logger.debug("Resumindo %d turnos antigos da conversa", len(turns))
+        return self._clip_summary(self.llm.invoke(self._summary_prompt(summary, turns)))
+
@@ -0,0 +1,291 @@
+"""Métricas em processo (histogramas e contadores) expostas no formato texto do Prometheus."""
+
+import os
+import time
+import atexit
+import bisect
+import logging
+import weakref
+import functools
+import threading
+import inspect
+from contextlib import contextmanager
+from .context_builder import CHARS_PER_TOKEN
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def metrics_enabled() -> bool:
+    """METRICS_ENABLED (padrão true), lido a cada uso: o ``.env`` só é carregado depois da importação."""
+    return os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Counter:
+    """Contador monotônico, com uma série por combinação de rótulos."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labelvalues) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Histograma de buckets fixos (acumulados só na exportação).
+
+    ``observe`` faz uma busca binária e incrementa um contador sob um lock,
+    custo de ~1 µs: barato o bastante para ficar ligado em produção.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por bucket..., contagem acima do último, soma]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labelvalues, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas do processo.
+
+    Caches registrados com :meth:`register_cache` são lidos só na exportação
+    (atributos ``hits`` e ``misses``), sem custo no caminho das requisições.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._caches: dict[str, weakref.ref] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_cache(self, name: str, cache) -> None:
+        """Exporta ``hits``/``misses`` de ``cache`` (referência fraca; o último registro do nome vale)."""
+        with self._lock:
+            self._caches[name] = weakref.ref(cache)
+
+    def _cache_lines(self) -> list[str]:
+        with self._lock:
+            caches = {name: ref() for name, ref in self._caches.items()}
+        stats = {name: (cache.hits, cache.misses) for name, cache in sorted(caches.items()) if cache is not None}
+        if not stats:
+            return []
+        lines = []
+        for suffix, kind, doc, pick in (
+            ("hits_total", "counter", "Consultas atendidas pelo cache.", lambda h, m: h),
+            ("misses_total", "counter", "Consultas que não estavam no cache.", lambda h, m: m),
+            ("hit_ratio", "gauge", "Fração de acertos do cache desde o início do processo.", lambda h, m: h / (h + m) if h + m else 0.0),
+        ):
+            name = f"rag_cache_{suffix}"
+            lines += [f"# HELP {name} {doc}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{cache}"}} {_number(pick(h, m))}' for cache, (h, m) in stats.items()]
+        return lines
+
+    def render(self) -> str:
+        """Todas as métricas no formato de exposição em texto do Prometheus (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.type}"]
+            lines.extend(metric.samples())
+        lines += self._cache_lines()
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Grava :meth:`render` em ``path`` de forma atômica (para o textfile collector)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Latência de cada etapa do pipeline (análise, recuperação, geração, embeddings).", ("stage",)
+)
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "rag_time_to_first_token_seconds", "Tempo entre a pergunta e o primeiro token da resposta em streaming."
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "rag_generation_tokens_per_second", "Tokens (estimados) por segundo gerados após o primeiro token.", buckets=RATE_BUCKETS
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if metrics_enabled():
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Mede o bloco como a etapa ``stage`` (inclusive quando ele levanta exceção)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def instrument(stage: str):
+    """Decorador que mede a função (síncrona ou ``async``) como a etapa ``stage``."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe_stage(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class StreamMetrics:
+    """Tempo até o primeiro token e tokens por segundo de uma resposta em streaming."""
+
+    def __init__(self, start: float | None = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.first_token_at: float | None = None
+        self.chars = 0
+
+    def token(self, text: str) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            if metrics_enabled():
+                TIME_TO_FIRST_TOKEN.observe(self.first_token_at - self.start)
+        self.chars += len(text)
+
+    def finish(self) -> None:
+        if self.first_token_at is None or not metrics_enabled():
+            return
+        elapsed = time.perf_counter() - self.first_token_at
+        tokens = self.chars / CHARS_PER_TOKEN
+        if elapsed > 0 and tokens >= 1:
+            TOKENS_PER_SECOND.observe(tokens / elapsed)
+
+
+_dump_thread: threading.Thread | None = None
+_dump_lock = threading.Lock()
+
+
+def start_file_dump(path: str | None = None, interval: float | None = None) -> bool:
+    """
+    Grava as métricas em ``path`` (ou METRICS_DUMP_PATH) a cada ``interval``
+    segundos (METRICS_DUMP_INTERVAL, padrão 60) e na saída do processo.
+
+    Para processos sem servidor HTTP (Streamlit, scripts). Idempotente:
+    retorna False se não há caminho configurado ou o dump já está ativo.
+    """
+    global _dump_thread
+    path = path or os.getenv("METRICS_DUMP_PATH")
+    if not path or not metrics_enabled():
+        return False
+    interval = interval if interval is not None else float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+    with _dump_lock:
+        if _dump_thread is not None:
+            return False
+
+        def dump():
+            try:
+                REGISTRY.dump(path)
+            except OSError as exc:
+                logger.warning("Falha ao gravar métricas em %s: %s", path, exc)
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                dump()
+
+        _dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        _dump_thread.start()
+        atexit.register(dump)
+    logger.info("Métricas gravadas em %s a cada %.0fs", path, interval)
+    return True
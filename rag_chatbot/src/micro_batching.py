@@ -0,0 +1,155 @@
+"""Micro-batching de embeddings de consulta entre requisições concorrentes."""
+
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatchingEmbeddings:
+    """
+    Agrupa chamadas concorrentes de ``embed_query`` em uma única chamada em lote.
+
+    Cada consulta entra em uma fila; uma thread coletora espera até
+    ``max_wait_ms`` (ou até ``max_batch_size`` textos) após a primeira consulta
+    e entrega o lote a um pool de ``max_in_flight`` threads, que chama
+    ``batch_fn`` uma vez e devolve cada vetor ao seu chamador. A coletora
+    continua montando o próximo lote enquanto o anterior está no modelo; com
+    ``max_in_flight`` lotes em andamento ela espera um terminar, e as consultas
+    que chegam nesse intervalo formam um lote maior. Textos repetidos no mesmo
+    lote são embedados uma só vez. ``aembed_query`` usa a mesma fila, então
+    threads e corrotinas compartilham os lotes.
+
+    ``batch_fn`` recebe uma lista de textos e retorna seus vetores; por padrão
+    é ``base.embed_documents``. Os demais atributos (inclusive
+    ``embed_documents``, que já é uma chamada em lote) são os do modelo base.
+    """
+
+    def __init__(self, base, max_batch_size: int = 32, max_wait_ms: float = 5.0, batch_fn=None, max_in_flight: int = 4):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser maior que zero.")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight deve ser maior que zero.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms não pode ser negativo.")
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_fn = batch_fn
+        self._queue: queue.Queue = queue.Queue()
+        self.max_in_flight = max_in_flight
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def __getattr__(self, name):
+        return getattr(self.base, name)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._executor = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="embedding-batch")
+                    self._thread = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            self._in_flight.acquire()
+            self._executor.submit(self._embed_batch, batch)
+
+    def _embed_batch(self, batch: list) -> None:
+        try:
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = (self.batch_fn or self.base.embed_documents)(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"O modelo retornou {len(vectors)} vetores para {len(texts)} textos.")
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                return
+            by_text = dict(zip(texts, vectors))
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+            for text, future in batch:
+                future.set_result(by_text[text])
+        finally:
+            self._in_flight.release()
+
+    def embed_query(self, text: str):
+        return self._submit(text).result()
+
+    async def aembed_query(self, text: str):
+        return await asyncio.wrap_future(self._submit(text))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+if __name__ == "__main__":
+    # Vazão de N consultas concorrentes com e sem micro-batching, contra um modelo
+    # fictício com 20 ms de latência e no máximo 8 chamadas simultâneas
+    from .fakes import FakeEmbeddings
+
+    n_requests, concurrency = 512, 64
+    for label, make in (
+        ("direto", lambda base: base),
+        ("micro-batching", lambda base: MicroBatchingEmbeddings(base, max_batch_size=64, max_wait_ms=5)),
+    ):
+        base = FakeEmbeddings(latency=0.02, per_item_latency=0.0002, max_concurrency=8)
+        model = make(base)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(model.embed_query, [f"pergunta {i}" for i in range(n_requests)]))
+        elapsed = time.perf_counter() - start
+        logger.info("%s: %.1f consultas/s, %d chamadas ao modelo", label, n_requests / elapsed, base.calls)
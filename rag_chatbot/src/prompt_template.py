@@ -1,4 +1,3 @@
-from langchain import hub
 from langchain_core.prompts import ChatPromptTemplate
 import logging
 from .logging_config import setup_logging
@@ -6,42 +5,31 @@ from .logging_config import setup_logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
-def get_rag_prompt_template():
-    """
-    Carrega o prompt RAG do hub e cria uma versão customizada.
-    """
-    # Carrega o prompt RAG do hub
-    base_rag_prompt = hub.pull("rlm/rag-prompt")
-
-    # Cria uma versão customizada do prompt
-    # Instruções adicionais:
-    # - Instrua o assistente a usar o contexto recuperado
-    # - Limite respostas a 3 frases máximo
-    # - Instrua para dizer "não sei" quando não souber
-    # - Mantenha respostas concisas
-    custom_template = """Você é um assistente útil e informativo. Use o seguinte contexto recuperado para responder à pergunta.
+# Prompt RAG versionado junto com o código (antes baixado de "rlm/rag-prompt" no hub a cada inicialização):
+# - Instrui o assistente a usar o contexto recuperado
+# - Limita as respostas a 3 frases
+# - Instrui a dizer "não sei" quando não souber
+RAG_PROMPT_TEMPLATE = """Você é um assistente útil e informativo. Use o seguinte contexto recuperado para responder à pergunta.
 Sua resposta deve ser concisa, com no máximo 3 frases. Se você não souber a resposta, diga "Não sei".
 
 Contexto: {context}
 Pergunta: {question}
 """
-    
-    # Combina o template base com as instruções customizadas
-    # Uma forma de fazer isso é criar um novo ChatPromptTemplate
-    # que incorpore as instruções.
-    # Para simplificar e garantir que as instruções sejam seguidas,
-    # vamos criar um novo template com as instruções explícitas.
-    custom_rag_prompt = ChatPromptTemplate.from_template(custom_template)
-    
-    return custom_rag_prompt
+
+
+def get_rag_prompt_template():
+    """
+    Cria o prompt RAG customizado a partir do template local (sem acesso à rede).
+    """
+    return ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
 
 if __name__ == "__main__":
     prompt = get_rag_prompt_template()
-    
+
     # Teste o template de prompt com dados de exemplo
     example_context = "A inteligência artificial é um campo da ciência da computação que se dedica ao estudo e ao desenvolvimento de máquinas e programas capazes de simular o raciocínio humano."
     example_question = "O que é inteligência artificial?"
-    
+
     formatted_prompt = prompt.format(context=example_context, question=example_question)
     logger.info("--- Template de Prompt Customizado ---")
     logger.info(formatted_prompt)
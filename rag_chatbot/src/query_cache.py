@@ -0,0 +1,168 @@
+"""Memoização da análise de consulta (pergunta → Search)."""
+
+import os
+import re
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Forma canônica da pergunta: sem acentos, pontuação, caixa ou espaços extras."""
+    text = unicodedata.normalize("NFKD", question)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryAnalysisCache:
+    """
+    Cache LRU/TTL de ``Search`` por pergunta, opcionalmente persistido em JSON.
+
+    A chave é a pergunta normalizada, então repetições exatas e variações
+    triviais (caixa, acentos, pontuação) evitam a chamada ao LLM estruturado.
+    ``exact_hits`` e ``normalized_hits`` distinguem os dois casos.
+
+    ``put`` só marca o cache como alterado: uma thread em segundo plano grava
+    o arquivo a cada ``flush_interval`` segundos, e :meth:`close` (ou a saída
+    do processo) grava o que faltar. Nenhuma requisição espera pelo disco.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float | None = None,
+        path: str | None = None,
+        flush_interval: float = 5.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializa as gravações (arquivo temporário + os.replace)
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+        if path:
+            if flush_interval > 0:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, args=(flush_interval,), name="query-cache-flush", daemon=True
+                )
+                self._flusher.start()
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        return self.exact_hits + self.normalized_hits
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning("Cache de análise ignorado (%s): %s", self.path, exc)
+            return
+        for key, entry in entries.items():
+            self._entries[key] = entry
+        self._evict()
+
+    def save(self) -> None:
+        """Grava o cache de forma atômica, em um arquivo temporário único por gravação."""
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                payload = json.dumps(self._entries)
+                self._dirty = False
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                self._dirty = True
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def flush(self) -> None:
+        """Grava o cache se houve ``put`` desde a última gravação."""
+        if self._dirty:
+            self.save()
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except OSError as exc:
+                logger.warning("Falha ao gravar o cache de análise em %s: %s", self.path, exc)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, question: str) -> dict | None:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry["question"] == question:
+                self.exact_hits += 1
+            else:
+                self.normalized_hits += 1
+            return dict(entry["search"])
+
+    def put(self, question: str, search: dict) -> None:
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = {"question": question, "search": dict(search), "created_at": time.time()}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = self.path is not None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "normalized_hits": self.normalized_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
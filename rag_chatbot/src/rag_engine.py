@@ -0,0 +1,240 @@
+"""Motor RAG de longa duração com as cadeias montadas uma única vez."""
+
+import os
+import time
+import logging
+from typing import AsyncIterator, Iterator, Literal, TypedDict
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from .semantic_cache import SemanticAnswerCache, get_index_version
+from .query_cache import QueryAnalysisCache
+from .section_router import SectionRouter, aanalyze_question, analyze_question
+from .speculative_retrieval import SpeculativeRetriever
+from .context_builder import build_context
+from .metrics import StreamMetrics, instrument, observe_stage
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class Search(TypedDict):
+    """
+    Schema para a análise da consulta.
+    """
+    query: str
+    section: Literal["beginning", "middle", "end"]
+
+
+def build_analysis_chain(structured_llm):
+    """Cadeia prompt → LLM estruturado usada pela análise de consulta."""
+    analysis_prompt = ChatPromptTemplate.from_messages([
+        ("system", "Analise a pergunta do usuário e determine a consulta principal e a seção relevante do documento (beginning, middle, end)."),
+        ("human", "Pergunta: {question}\n\nRetorne a consulta e a seção no formato JSON com os campos 'query' e 'section'.")
+    ])
+    return analysis_prompt | structured_llm
+
+
+def build_rag_chain(llm, rag_prompt):
+    """Cadeia contexto + pergunta → resposta em texto."""
+    return (
+        {"context": RunnablePassthrough(), "question": RunnablePassthrough()}
+        | rag_prompt
+        | llm
+        | StrOutputParser()
+    )
+
+
+def get_context_token_budget() -> int | None:
+    """Orçamento de tokens do contexto (CONTEXT_TOKEN_BUDGET, padrão 2000; 0 desativa)."""
+    budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+    return budget if budget > 0 else None
+
+
+def format_context(documents: list[Document], token_budget: int | None = None) -> str:
+    """
+    Contexto do prompt: chunks sobrepostos da mesma fonte são mesclados,
+    quase-duplicatas descartadas e o resultado cabe em ``token_budget``.
+    """
+    if token_budget is None:
+        token_budget = get_context_token_budget()
+    return build_context(documents, token_budget)
+
+
+def validate_question(question: str) -> bool:
+    """Verifica se a pergunta é válida."""
+    return bool(question and question.strip())
+
+
+class RagEngine:
+    """
+    Reúne os componentes RAG e as cadeias já compiladas.
+
+    O LLM estruturado, a cadeia de análise e a cadeia de geração são criados
+    uma vez no construtor e reutilizados por todas as perguntas, tanto pelos
+    nós do grafo quanto pelos caminhos de streaming (sync e async).
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        llm,
+        rag_prompt,
+        structured_llm=None,
+        answer_cache: SemanticAnswerCache | None = None,
+        analysis_cache: QueryAnalysisCache | None = None,
+        section_router: SectionRouter | None = None,
+        speculative_retriever: SpeculativeRetriever | None = None,
+        context_token_budget: int | None = None,
+    ):
+        self.vector_store = vector_store
+        self.llm = llm
+        self.rag_prompt = rag_prompt
+        self.structured_llm = structured_llm if structured_llm is not None else llm.with_structured_output(Search)
+        self.answer_cache = answer_cache
+        self.analysis_cache = analysis_cache
+        self.section_router = section_router
+        self.speculative_retriever = speculative_retriever
+        self.context_token_budget = context_token_budget if context_token_budget is not None else get_context_token_budget()
+        self.analysis_chain = build_analysis_chain(self.structured_llm)
+        self.rag_chain = build_rag_chain(llm, rag_prompt)
+        self.parser = StrOutputParser()
+
+    @classmethod
+    def from_components(cls, components: dict) -> "RagEngine":
+        """Cria o motor a partir do dicionário de ``initialize_rag_components``."""
+        return cls(
+            components["vector_store"],
+            components["llm"],
+            components["rag_prompt"],
+            components.get("structured_llm"),
+            answer_cache=components.get("answer_cache"),
+            analysis_cache=components.get("analysis_cache"),
+            section_router=components.get("section_router"),
+            speculative_retriever=components.get("speculative_retriever"),
+        )
+
+    # --- Etapas ---
+    @instrument("analyze")
+    def analyze(self, question: str) -> dict:
+        return analyze_question(question, self.analysis_chain, self.analysis_cache, self.section_router)
+
+    @instrument("analyze")
+    async def aanalyze(self, question: str) -> dict:
+        return await aanalyze_question(question, self.analysis_chain, self.analysis_cache, self.section_router)
+
+    def _retriever(self, parsed_query: dict):
+        return self.vector_store.as_retriever(search_kwargs={"filter": {"section": parsed_query["section"]}})
+
+    @instrument("retrieve")
+    def retrieve(self, parsed_query: dict, question: str | None = None) -> list[Document]:
+        if self.speculative_retriever is not None and question is not None:
+            return self.speculative_retriever.resolve(question, parsed_query)
+        return self._retriever(parsed_query).invoke(parsed_query["query"])
+
+    @instrument("retrieve")
+    async def aretrieve(self, parsed_query: dict) -> list[Document]:
+        return await self._retriever(parsed_query).ainvoke(parsed_query["query"])
+
+    @instrument("generate")
+    def generate(self, question: str, documents: list[Document]) -> str:
+        return self.rag_chain.invoke({"context": format_context(documents, self.context_token_budget), "question": question})
+
+    @instrument("generate")
+    async def agenerate(self, question: str, documents: list[Document]) -> str:
+        return await self.rag_chain.ainvoke({"context": format_context(documents, self.context_token_budget), "question": question})
+
+    def _analyze_and_retrieve(self, question: str) -> list[Document]:
+        speculative = self.speculative_retriever
+        if speculative is not None:
+            speculative.start(question)
+        try:
+            parsed_query = self.analyze(question)
+        except Exception:
+            if speculative is not None:
+                speculative.cancel(question)
+            raise
+        return self.retrieve(parsed_query, question)
+
+    # --- Streaming ---
+    def stream(self, question: str) -> Iterator[str]:
+        """Gera a resposta em modo streaming, consultando o cache semântico antes."""
+        if not validate_question(question):
+            yield "Pergunta vazia."
+            return
+
+        start_time = time.time()
+        stream_metrics = StreamMetrics()
+        index_version = get_index_version(self.vector_store)
+        if self.answer_cache is not None:
+            cached = self.answer_cache.lookup(question, index_version)
+            if cached is not None:
+                stream_metrics.token(cached.answer)
+                yield cached.answer
+                logger.info("Tempo de resposta (cache semântico): %.2fs", time.time() - start_time)
+                return
+
+        context = self._analyze_and_retrieve(question)
+        formatted_prompt = self.rag_prompt.format_messages(context=format_context(context, self.context_token_budget), question=question)
+
+        answer_parts = []
+        generation_start = time.perf_counter()
+        try:
+            for chunk in self.llm.stream(formatted_prompt):
+                text = self.parser.invoke(chunk)
+                answer_parts.append(text)
+                stream_metrics.token(text)
+                yield text
+        except Exception as exc:
+            logger.error("Falha no streaming: %s", exc)
+            yield "Desculpe, ocorreu um erro ao gerar a resposta."
+        else:
+            observe_stage("generate", time.perf_counter() - generation_start)
+            stream_metrics.finish()
+            if self.answer_cache is not None:
+                self.answer_cache.store(question, "".join(answer_parts), context, index_version)
+
+        observe_stage("request", time.perf_counter() - stream_metrics.start)
+        logger.info("Tempo de resposta: %.2fs", time.time() - start_time)
+
+    async def astream(self, question: str) -> AsyncIterator[str]:
+        """Versão assíncrona de :meth:`stream` (``ainvoke``/``astream``)."""
+        if not validate_question(question):
+            yield "Pergunta vazia."
+            return
+
+        start_time = time.time()
+        stream_metrics = StreamMetrics()
+        index_version = get_index_version(self.vector_store)
+        if self.answer_cache is not None:
+            cached = await self.answer_cache.alookup(question, index_version)
+            if cached is not None:
+                stream_metrics.token(cached.answer)
+                yield cached.answer
+                logger.info("Tempo de resposta (cache semântico): %.2fs", time.time() - start_time)
+                return
+
+        context = await self.aretrieve(await self.aanalyze(question))
+        formatted_prompt = self.rag_prompt.format_messages(context=format_context(context, self.context_token_budget), question=question)
+
+        answer_parts = []
+        generation_start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(formatted_prompt):
+                text = self.parser.invoke(chunk)
+                answer_parts.append(text)
+                stream_metrics.token(text)
+                yield text
+        except Exception as exc:
+            logger.error("Falha no streaming: %s", exc)
+            yield "Desculpe, ocorreu um erro ao gerar a resposta."
+        else:
+            observe_stage("generate", time.perf_counter() - generation_start)
+            stream_metrics.finish()
+            if self.answer_cache is not None:
+                await self.answer_cache.astore(question, "".join(answer_parts), context, index_version)
+
+        observe_stage("request", time.perf_counter() - stream_metrics.start)
+        logger.info("Tempo de resposta: %.2fs", time.time() - start_time)
@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+from typing import TYPE_CHECKING
 
 # Adiciona o diretório raiz do projeto ao sys.path
 # Isso é necessário para que as importações relativas funcionem corretamente
@@ -9,32 +10,37 @@ project_root = os.path.abspath(os.path.join(script_dir, '..', '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from typing import TypedDict, Literal
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langchain_core.documents import Document
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate # Adicionar esta importação
-from langgraph.graph import MessagesState, StateGraph, END
 
 # Importar funções dos módulos criados
-from rag_chatbot.src.document_loader import load_documents
-from rag_chatbot.src.text_splitter import split_documents
-from rag_chatbot.src.vector_store import create_vector_store, get_embeddings_model
+from rag_chatbot.src.document_loader import iter_documents
+from rag_chatbot.src.ingest import IngestStats
+from rag_chatbot.src.vector_store import (
+    get_embeddings_model,
+    ingest_vector_store,
+    load_vector_store_snapshot,
+    save_vector_store_snapshot,
+)
 from rag_chatbot.src.llm_config import get_chat_model
 from rag_chatbot.src.prompt_template import get_rag_prompt_template
+from rag_chatbot.src.semantic_cache import SemanticAnswerCache, get_index_version, get_store_embeddings
+from rag_chatbot.src.query_cache import QueryAnalysisCache
+from rag_chatbot.src.section_router import SectionRouter, aanalyze_question, analyze_question
+from rag_chatbot.src.speculative_retrieval import SpeculativeRetriever
+from rag_chatbot.src.rag_engine import RagEngine, Search, build_analysis_chain, build_rag_chain, format_context
+from rag_chatbot.src.metrics import REGISTRY, instrument, start_file_dump
+from rag_chatbot.src.config import load_config
 from rag_chatbot.src.logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# 1. Definir o schema Search
-class Search(TypedDict):
-    """
-    Schema para a análise da consulta.
-    """
-    query: str
-    section: Literal["beginning", "middle", "end"]
+# O LangGraph só é importado ao montar o grafo (ver create_rag_graph)
+if TYPE_CHECKING:
+    from langgraph.graph import MessagesState
+
+# 1. O schema Search e as cadeias ficam em rag_engine (reexportados aqui)
 
 
 # Variáveis globais (serão inicializadas e retornadas por initialize_rag_components)
@@ -42,16 +48,33 @@ class Search(TypedDict):
 # Removendo a necessidade de importá-los diretamente de rag_pipeline em outros módulos.
 # Eles serão passados como argumentos ou obtidos do retorno de initialize_rag_components.
 
-def initialize_rag_components():
+def build_vector_store() -> tuple[object, IngestStats]:
+    """
+    Indexa os documentos em streaming (:func:`ingest_vector_store`) em um
+    vector store novo ou, de forma incremental, no índice persistido em
+    CHROMA_PERSIST_DIR, e grava o snapshot se INDEX_SNAPSHOT_PATH estiver
+    definido.
+    """
+    vector_store, stats = ingest_vector_store(iter_documents())
+    save_vector_store_snapshot(vector_store)
+    return vector_store, stats
+
+def initialize_rag_components(vector_store=None):
     """
     Inicializa e retorna os componentes RAG (LLM, Prompt, Vector Store, Retriever, Structured LLM).
+
+    ``vector_store`` reaproveita um índice já populado (por exemplo, pela
+    ingestão de ``main.py``); sem ele, o snapshot é aberto ou, na falta dele,
+    os documentos são indexados por :func:`build_vector_store`.
     """
+    load_config()
     logger.info("Inicializando componentes RAG...")
     
-    # Carregar e dividir documentos para o vector store
-    documents = load_documents()
-    chunks = split_documents(documents)
-    vector_store = create_vector_store(chunks)
+    # Com INDEX_SNAPSHOT_PATH, o índice salvo é mapeado do disco (sem baixar nem embedar documentos)
+    if vector_store is None:
+        vector_store = load_vector_store_snapshot()
+    if vector_store is None:
+        vector_store, _ = build_vector_store()
     
     # Configurar LLM e Prompt
     llm = get_chat_model()
@@ -59,90 +82,270 @@ def initialize_rag_components():
 
     # Configurar LLM estruturado para análise de consulta
     structured_llm = llm.with_structured_output(Search)
+
+    # Cache semântico de respostas, compartilhado pelo grafo e pelo streaming
+    answer_cache = SemanticAnswerCache(get_store_embeddings(vector_store))
+    # Memoização da análise de consulta (persistida se QUERY_CACHE_PATH estiver definido)
+    analysis_cache = QueryAnalysisCache(path=os.getenv("QUERY_CACHE_PATH"))
+    # Roteador local de seção (palavras-chave + centróides calculados na indexação)
+    section_router = SectionRouter.from_vector_store(vector_store)
+    # Busca sem filtro sobreposta à análise da consulta (opcional)
+    speculative_retriever = None
+    if os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() in ("1", "true", "yes"):
+        speculative_retriever = SpeculativeRetriever(vector_store)
     
-    logger.info("Componentes RAG inicializados.")
-    return {
+    components = {
         "vector_store": vector_store,
         "llm": llm,
         "rag_prompt": rag_prompt,
-        "structured_llm": structured_llm
+        "structured_llm": structured_llm,
+        "answer_cache": answer_cache,
+        "analysis_cache": analysis_cache,
+        "section_router": section_router,
+        "speculative_retriever": speculative_retriever,
     }
+    # Cadeias compiladas uma única vez e compartilhadas pelo grafo e pelo streaming
+    components["engine"] = RagEngine.from_components(components)
+    # Taxas de acerto dos caches exportadas com as demais métricas
+    REGISTRY.register_cache("answer", answer_cache)
+    REGISTRY.register_cache("analysis", analysis_cache)
+    store_embeddings = get_store_embeddings(vector_store)
+    if hasattr(store_embeddings, "hits"):
+        REGISTRY.register_cache("embeddings", store_embeddings)
+    # Sem servidor HTTP (Streamlit), as métricas vão para METRICS_DUMP_PATH, se definido
+    start_file_dump()
+    logger.info("Componentes RAG inicializados.")
+    return components
 
 # 2. Implementar as funções do pipeline
-def analyze_query(state: MessagesState, structured_llm):
-    """Analisa a mensagem do usuário e retorna uma chamada de ferramenta."""
-    logger.info("---ANALISANDO CONSULTA---")
+# Os nós retornam só as mensagens novas: o reducer add_messages do MessagesState
+# as acrescenta ao histórico, sem copiar a lista inteira a cada etapa.
+def last_question(messages) -> str:
+    """Conteúdo da última mensagem do usuário."""
+    return next(
+        (m.content for m in reversed(messages) if isinstance(m, HumanMessage)),
+        "",
+    )
+
+@instrument("analyze")
+def analyze_query(state: "MessagesState", structured_llm, analysis_cache=None, section_router=None, speculative_retriever=None, engine=None):
+    """Analisa a mensagem do usuário e retorna uma chamada de ferramenta.
+
+    Com ``analysis_cache``, perguntas repetidas (ou trivialmente reescritas)
+    reutilizam a análise anterior sem chamar o LLM estruturado. Com
+    ``section_router``, a seção é decidida localmente quando o roteador está
+    confiante, e o LLM só é chamado nos casos ambíguos. Com
+    ``speculative_retriever``, uma busca sem filtro pela pergunta começa antes
+    da análise e é aproveitada pelo nó ``retrieve``. Com ``engine``, usa a
+    cadeia de análise já compilada do :class:`RagEngine`.
+    """
+    logger.debug("---ANALISANDO CONSULTA---")
     messages = state["messages"]
     question = messages[-1].content
+    if speculative_retriever is not None:
+        speculative_retriever.start(question)
 
-    analysis_prompt = ChatPromptTemplate.from_messages([
-        ("system", "Analise a pergunta do usuário e determine a consulta principal e a seção relevante do documento (beginning, middle, end)."),
-        ("human", "Pergunta: {question}\n\nRetorne a consulta e a seção no formato JSON com os campos 'query' e 'section'.")
-    ])
-    analysis_chain = analysis_prompt | structured_llm
-    parsed_query = analysis_chain.invoke({"question": question})
+    analysis_chain = engine.analysis_chain if engine is not None else build_analysis_chain(structured_llm)
+    try:
+        parsed_query = analyze_question(question, analysis_chain, analysis_cache, section_router)
+    except Exception:
+        if speculative_retriever is not None:
+            speculative_retriever.cancel(question)
+        raise
 
-    logger.info(f"Consulta analisada: {parsed_query}")
+    logger.debug("Consulta analisada: %s", parsed_query)
     tool_call = {"id": "vs_query", "name": "vector_search", "args": parsed_query}
     ai_msg = AIMessage(content="", additional_kwargs={"tool_calls": [tool_call]})
-    return {"messages": messages + [ai_msg]}
+    return {"messages": [ai_msg]}
+
+@instrument("retrieve")
+def retrieve(state: "MessagesState", vector_store, speculative_retriever=None):
+    """Recupera documentos conforme a consulta analisada.
 
-def retrieve(state: MessagesState, vector_store):
-    """Recupera documentos conforme a consulta analisada."""
-    logger.info("---RECUPERANDO CONTEXTO---")
+    Com ``speculative_retriever``, reaproveita a busca iniciada em
+    ``analyze_query`` quando ela tem documentos suficientes da seção.
+    """
+    logger.debug("---RECUPERANDO CONTEXTO---")
     messages = state["messages"]
     ai_msg = messages[-1]
     parsed_query = ai_msg.additional_kwargs["tool_calls"][0]["args"]
 
-    retriever_with_filter = vector_store.as_retriever(
-        search_kwargs={"filter": {"section": parsed_query["section"]}}
-    )
-
-    documents = retriever_with_filter.invoke(parsed_query["query"])
+    if speculative_retriever is not None:
+        question = last_question(messages) or parsed_query["query"]
+        documents = speculative_retriever.resolve(question, parsed_query)
+    else:
+        retriever_with_filter = vector_store.as_retriever(
+            search_kwargs={"filter": {"section": parsed_query["section"]}}
+        )
+        documents = retriever_with_filter.invoke(parsed_query["query"])
     tool_call_id = ai_msg.additional_kwargs["tool_calls"][0].get("id", "vs_query")
     tool_msg = ToolMessage(
         content="",
         tool_call_id=tool_call_id,
         additional_kwargs={"documents": documents},
     )
-    return {"messages": messages + [tool_msg]}
+    return {"messages": [tool_msg]}
+
+@instrument("generate")
+def generate(state: "MessagesState", llm, rag_prompt, engine=None):
+    """Gera a resposta final utilizando o contexto recuperado.
 
-def generate(state: MessagesState, llm, rag_prompt):
-    """Gera a resposta final utilizando o contexto recuperado."""
-    logger.info("---GERANDO RESPOSTA---")
+    Com ``engine``, reutiliza a cadeia de geração já compilada.
+    """
+    logger.debug("---GERANDO RESPOSTA---")
     messages = state["messages"]
     tool_msg = messages[-1]
     documents = tool_msg.additional_kwargs.get("documents", [])
 
     # Encontrar a última pergunta do usuário
-    question = next(
-        (m.content for m in reversed(messages) if isinstance(m, HumanMessage)),
-        "",
+    question = last_question(messages)
+    rag_chain = engine.rag_chain if engine is not None else build_rag_chain(llm, rag_prompt)
+    answer = rag_chain.invoke({"context": format_context(documents), "question": question})
+    ai_msg = AIMessage(content=answer)
+    return {"messages": [ai_msg]}
+
+# 2b. Versões assíncronas dos nós (ainvoke/astream nos LLMs e embeddings)
+@instrument("analyze")
+async def aanalyze_query(state: "MessagesState", structured_llm, analysis_cache=None, section_router=None, engine=None):
+    """Versão assíncrona de :func:`analyze_query`."""
+    logger.debug("---ANALISANDO CONSULTA (async)---")
+    messages = state["messages"]
+    question = messages[-1].content
+    analysis_chain = engine.analysis_chain if engine is not None else build_analysis_chain(structured_llm)
+    parsed_query = await aanalyze_question(question, analysis_chain, analysis_cache, section_router)
+
+    logger.debug("Consulta analisada: %s", parsed_query)
+    tool_call = {"id": "vs_query", "name": "vector_search", "args": parsed_query}
+    ai_msg = AIMessage(content="", additional_kwargs={"tool_calls": [tool_call]})
+    return {"messages": [ai_msg]}
+
+@instrument("retrieve")
+async def aretrieve(state: "MessagesState", vector_store):
+    """Versão assíncrona de :func:`retrieve`."""
+    logger.debug("---RECUPERANDO CONTEXTO (async)---")
+    messages = state["messages"]
+    ai_msg = messages[-1]
+    parsed_query = ai_msg.additional_kwargs["tool_calls"][0]["args"]
+    documents = await aretrieve_documents(vector_store, parsed_query)
+    tool_call_id = ai_msg.additional_kwargs["tool_calls"][0].get("id", "vs_query")
+    tool_msg = ToolMessage(
+        content="",
+        tool_call_id=tool_call_id,
+        additional_kwargs={"documents": documents},
     )
+    return {"messages": [tool_msg]}
 
-    rag_chain = (
-        {"context": RunnablePassthrough(), "question": RunnablePassthrough()}
-        | rag_prompt
-        | llm
-        | StrOutputParser()
+async def aretrieve_documents(vector_store, parsed_query: dict) -> list[Document]:
+    """Busca filtrada pela seção usando ``ainvoke`` do retriever."""
+    retriever_with_filter = vector_store.as_retriever(
+        search_kwargs={"filter": {"section": parsed_query["section"]}}
     )
+    return await retriever_with_filter.ainvoke(parsed_query["query"])
+
+@instrument("generate")
+async def agenerate(state: "MessagesState", llm, rag_prompt, engine=None):
+    """Versão assíncrona de :func:`generate`."""
+    logger.debug("---GERANDO RESPOSTA (async)---")
+    messages = state["messages"]
+    documents = messages[-1].additional_kwargs.get("documents", [])
+    rag_chain = engine.rag_chain if engine is not None else build_rag_chain(llm, rag_prompt)
+    answer = await rag_chain.ainvoke({"context": format_context(documents), "question": last_question(messages)})
+    return {"messages": [AIMessage(content=answer)]}
+
+class CachedRagApp:
+    """
+    Envolve o grafo compilado com um :class:`SemanticAnswerCache`.
+
+    Em um acerto, devolve a resposta e as fontes armazenadas no mesmo formato
+    de mensagens do grafo (ToolMessage com documentos + AIMessage), sem chamar
+    o LLM. Os demais atributos são delegados ao grafo original.
+    """
+
+    def __init__(self, app, answer_cache, vector_store):
+        self.app = app
+        self.answer_cache = answer_cache
+        self.vector_store = vector_store
+
+    def __getattr__(self, name):
+        return getattr(self.app, name)
+
+    @staticmethod
+    def _cached_state(messages, cached):
+        logger.info("Resposta servida pelo cache semântico (similaridade %.3f)", cached.similarity)
+        tool_msg = ToolMessage(
+            content="",
+            tool_call_id="vs_query",
+            additional_kwargs={"documents": cached.sources},
+        )
+        return {"messages": messages + [tool_msg, AIMessage(content=cached.answer)]}
+
+    @staticmethod
+    def _answer_and_sources(final_state):
+        final_messages = final_state["messages"]
+        documents = final_messages[-2].additional_kwargs.get("documents", []) if len(final_messages) > 1 else []
+        return final_messages[-1].content, documents
+
+    def invoke(self, state, *args, **kwargs):
+        messages = state["messages"]
+        question = messages[-1].content
+        index_version = get_index_version(self.vector_store)
+        cached = self.answer_cache.lookup(question, index_version)
+        if cached is not None:
+            return self._cached_state(messages, cached)
+
+        final_state = self.app.invoke(state, *args, **kwargs)
+        answer, documents = self._answer_and_sources(final_state)
+        self.answer_cache.store(question, answer, documents, index_version)
+        return final_state
+
+    async def ainvoke(self, state, *args, **kwargs):
+        messages = state["messages"]
+        question = messages[-1].content
+        index_version = get_index_version(self.vector_store)
+        cached = await self.answer_cache.alookup(question, index_version)
+        if cached is not None:
+            return self._cached_state(messages, cached)
+
+        final_state = await self.app.ainvoke(state, *args, **kwargs)
+        answer, documents = self._answer_and_sources(final_state)
+        await self.answer_cache.astore(question, answer, documents, index_version)
+        return final_state
 
-    formatted_context = "\n\n".join([doc.page_content for doc in documents])
-    answer = rag_chain.invoke({"context": formatted_context, "question": question})
-    ai_msg = AIMessage(content=answer)
-    return {"messages": messages + [ai_msg]}
 
 # 3. Configurar o grafo LangGraph
-def create_rag_graph(vector_store, llm, rag_prompt, structured_llm):
+def create_rag_graph(vector_store, llm, rag_prompt, structured_llm, answer_cache=None, analysis_cache=None, section_router=None, speculative_retriever=None, engine=None):
     """
     Cria e compila o grafo LangGraph para o pipeline RAG.
+
+    Com ``answer_cache``, perguntas semanticamente equivalentes a uma já
+    respondida são atendidas pelo cache, sem passar pelo grafo. Com
+    ``analysis_cache``, o nó ``analyze_query`` memoiza a análise da consulta;
+    com ``section_router``, ele evita o LLM estruturado quando a seção é óbvia.
+    Com ``speculative_retriever``, a recuperação começa junto com a análise.
+    Com ``engine``, os nós reutilizam as cadeias já compiladas do
+    :class:`RagEngine` em vez de montá-las a cada pergunta.
     """
+    from langgraph.graph import MessagesState, StateGraph
+
     workflow = StateGraph(MessagesState)
 
     # Adicionar nós, passando os componentes necessários
-    workflow.add_node("analyze_query", lambda state: analyze_query(state, structured_llm))
-    workflow.add_node("retrieve", lambda state: retrieve(state, vector_store))
-    workflow.add_node("generate", lambda state: generate(state, llm, rag_prompt))
+    analyze_kwargs = {}
+    if analysis_cache is not None:
+        analyze_kwargs["analysis_cache"] = analysis_cache
+    if section_router is not None:
+        analyze_kwargs["section_router"] = section_router
+    retrieve_kwargs = {}
+    if speculative_retriever is not None:
+        analyze_kwargs["speculative_retriever"] = speculative_retriever
+        retrieve_kwargs["speculative_retriever"] = speculative_retriever
+    generate_kwargs = {}
+    if engine is not None:
+        analyze_kwargs["engine"] = engine
+        generate_kwargs["engine"] = engine
+    workflow.add_node("analyze_query", lambda state: analyze_query(state, structured_llm, **analyze_kwargs))
+    workflow.add_node("retrieve", lambda state: retrieve(state, vector_store, **retrieve_kwargs))
+    workflow.add_node("generate", lambda state: generate(state, llm, rag_prompt, **generate_kwargs))
 
     # Adicionar sequência
     workflow.add_edge("analyze_query", "retrieve")
@@ -153,6 +356,41 @@ def create_rag_graph(vector_store, llm, rag_prompt, structured_llm):
 
     # Compilar o grafo
     app = workflow.compile()
+    if answer_cache is not None:
+        return CachedRagApp(app, answer_cache, vector_store)
+    return app
+
+def create_async_rag_graph(vector_store, llm, rag_prompt, structured_llm, answer_cache=None, analysis_cache=None, section_router=None, engine=None):
+    """
+    Cria o mesmo grafo de :func:`create_rag_graph` com nós assíncronos.
+
+    Use ``await app.ainvoke(...)`` ou ``app.astream(...)``: as chamadas ao LLM
+    e aos embeddings são aguardadas no loop de eventos, então um único loop
+    atende muitas conversas simultâneas sem uma thread por requisição.
+    """
+    from langgraph.graph import MessagesState, StateGraph
+
+    workflow = StateGraph(MessagesState)
+
+    async def analyze_node(state):
+        return await aanalyze_query(state, structured_llm, analysis_cache, section_router, engine)
+
+    async def retrieve_node(state):
+        return await aretrieve(state, vector_store)
+
+    async def generate_node(state):
+        return await agenerate(state, llm, rag_prompt, engine)
+
+    workflow.add_node("analyze_query", analyze_node)
+    workflow.add_node("retrieve", retrieve_node)
+    workflow.add_node("generate", generate_node)
+    workflow.add_edge("analyze_query", "retrieve")
+    workflow.add_edge("retrieve", "generate")
+    workflow.set_entry_point("analyze_query")
+
+    app = workflow.compile()
+    if answer_cache is not None:
+        return CachedRagApp(app, answer_cache, vector_store)
     return app
 
 if __name__ == "__main__":
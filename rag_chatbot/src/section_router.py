@@ -0,0 +1,193 @@
+"""Roteador local de seção: substitui a chamada ao LLM de análise quando confiante."""
+
+import logging
+from dataclasses import dataclass
+import numpy as np
+from .flat_index import aembed_query, normalize_rows
+from .query_cache import QueryAnalysisCache, normalize_question
+from .semantic_cache import get_store_embeddings
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("beginning", "middle", "end")
+
+# Palavras-chave já normalizadas (sem acentos, minúsculas), em português e inglês
+KEYWORD_RULES = {
+    "beginning": (
+        "introducao", "introduz", "introduction", "overview", "visao geral",
+        "o que e", "what is", "definicao", "define", "inicio",
+    ),
+    "middle": (
+        "metodo", "metodos", "method", "methods", "como funciona", "how does",
+        "how do", "exemplo", "example", "detalhe", "details", "componente", "component",
+    ),
+    "end": (
+        "conclusao", "conclusoes", "conclusion", "conclusions", "resumo", "summary",
+        "desafio", "desafios", "challenge", "challenges", "limitacao", "limitacoes", "limitations",
+    ),
+}
+
+
+@dataclass
+class RouteDecision:
+    section: str | None
+    confidence: float
+    source: str
+
+
+def _contains(text: str, phrase: str) -> bool:
+    return f" {phrase} " in f" {text} "
+
+
+class SectionRouter:
+    """
+    Decide a seção de uma pergunta sem chamar o LLM.
+
+    Primeiro aplica regras de palavras-chave; se nenhuma (ou mais de uma)
+    seção casar, usa o centróide de seção mais próximo do embedding da
+    pergunta. Os centróides são calculados uma vez, na indexação, a partir das
+    partições do vector store. ``confidence`` abaixo de ``min_confidence``
+    indica que o analisador LLM deve ser usado.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        centroids: dict | None = None,
+        keyword_rules: dict | None = None,
+        min_confidence: float = 0.6,
+        temperature: float = 0.02,
+        keyword_confidence: float = 0.9,
+    ):
+        self.embeddings = embeddings
+        self.keyword_rules = keyword_rules or KEYWORD_RULES
+        self.min_confidence = min_confidence
+        self.temperature = temperature
+        self.keyword_confidence = keyword_confidence
+        self.sections: list[str] = []
+        self.centroids: np.ndarray | None = None
+        if centroids:
+            self.sections = list(centroids)
+            self.centroids = normalize_rows([centroids[s] for s in self.sections])
+
+    @classmethod
+    def from_vector_store(cls, vector_store, embeddings=None, partition_key: str = "section", **kwargs) -> "SectionRouter":
+        """Cria o roteador com centróides calculados a partir do vector store."""
+        embeddings = embeddings or get_store_embeddings(vector_store)
+        return cls(embeddings, compute_section_centroids(vector_store, partition_key), **kwargs)
+
+    def route_by_keywords(self, question: str) -> RouteDecision:
+        text = normalize_question(question)
+        matched = [
+            section for section, phrases in self.keyword_rules.items()
+            if any(_contains(text, phrase) for phrase in phrases)
+        ]
+        if len(matched) == 1:
+            return RouteDecision(matched[0], self.keyword_confidence, "keywords")
+        return RouteDecision(None, 0.0, "keywords")
+
+    def route_by_vector(self, vector) -> RouteDecision:
+        if self.centroids is None:
+            return RouteDecision(None, 0.0, "centroid")
+        scores = self.centroids @ normalize_rows([vector])[0]
+        logits = (scores - scores.max()) / self.temperature
+        probs = np.exp(logits) / np.exp(logits).sum()
+        best = int(np.argmax(probs))
+        return RouteDecision(self.sections[best], float(probs[best]), "centroid")
+
+    def route(self, question: str) -> RouteDecision:
+        decision = self.route_by_keywords(question)
+        if decision.section is not None or self.centroids is None or self.embeddings is None:
+            return decision
+        return self.route_by_vector(self.embeddings.embed_query(question))
+
+    async def aroute(self, question: str) -> RouteDecision:
+        decision = self.route_by_keywords(question)
+        if decision.section is not None or self.centroids is None or self.embeddings is None:
+            return decision
+        return self.route_by_vector(await aembed_query(self.embeddings, question))
+
+
+def compute_section_centroids(vector_store, partition_key: str = "section") -> dict:
+    """Média normalizada dos embeddings de cada seção do vector store."""
+    partitions = getattr(vector_store, "partitions", None)
+    if partitions is not None and getattr(vector_store, "partition_key", None) == partition_key:
+        return {
+            value: partition.matrix.mean(axis=0)
+            for value, partition in partitions.items()
+            if value in SECTIONS and len(partition)
+        }
+
+    if hasattr(vector_store, "matrix"):
+        vectors = vector_store.matrix
+        metadatas = [doc.metadata for doc in vector_store.documents]
+    else:
+        # Chroma: lê os embeddings já armazenados, sem novas chamadas ao modelo
+        try:
+            data = vector_store.get(include=["embeddings", "metadatas"])
+        except Exception as exc:
+            logger.warning("Não foi possível ler os embeddings para o roteador de seção: %s", exc)
+            return {}
+        vectors = np.asarray(data.get("embeddings") if data.get("embeddings") is not None else [], dtype=np.float32)
+        metadatas = data.get("metadatas") or []
+
+    groups: dict = {}
+    for row, metadata in enumerate(metadatas):
+        value = (metadata or {}).get(partition_key)
+        if value in SECTIONS:
+            groups.setdefault(value, []).append(row)
+    return {value: vectors[rows].mean(axis=0) for value, rows in groups.items()}
+
+
+def analyze_question(
+    question: str,
+    analysis_chain,
+    analysis_cache: QueryAnalysisCache | None = None,
+    section_router: SectionRouter | None = None,
+) -> dict:
+    """
+    Retorna o ``Search`` da pergunta pelo caminho mais barato disponível:
+    cache de análise, roteador local (se confiante) e, por fim, o LLM.
+    """
+    if analysis_cache is not None:
+        cached = analysis_cache.get(question)
+        if cached is not None:
+            return cached
+    if section_router is not None:
+        routed = _confident_search(question, section_router, section_router.route(question))
+        if routed is not None:
+            return routed
+    parsed_query = analysis_chain.invoke({"question": question})
+    if analysis_cache is not None:
+        analysis_cache.put(question, parsed_query)
+    return parsed_query
+
+
+async def aanalyze_question(
+    question: str,
+    analysis_chain,
+    analysis_cache: QueryAnalysisCache | None = None,
+    section_router: SectionRouter | None = None,
+) -> dict:
+    """Versão assíncrona de :func:`analyze_question` (``ainvoke`` no LLM)."""
+    if analysis_cache is not None:
+        cached = analysis_cache.get(question)
+        if cached is not None:
+            return cached
+    if section_router is not None:
+        routed = _confident_search(question, section_router, await section_router.aroute(question))
+        if routed is not None:
+            return routed
+    parsed_query = await analysis_chain.ainvoke({"question": question})
+    if analysis_cache is not None:
+        analysis_cache.put(question, parsed_query)
+    return parsed_query
+
+
+def _confident_search(question: str, section_router: SectionRouter, decision: RouteDecision) -> dict | None:
+    if decision.section is None or decision.confidence < section_router.min_confidence:
+        return None
+    logger.debug("Seção '%s' decidida localmente (%s, %.2f)", decision.section, decision.source, decision.confidence)
+    return {"query": question, "section": decision.section}
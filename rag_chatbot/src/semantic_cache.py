@@ -0,0 +1,162 @@
+"""Cache semântico de respostas, indexado pelo embedding da pergunta."""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+import numpy as np
+from .flat_index import aembed_query, normalize_rows
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def get_index_version(vector_store):
+    """Versão do índice, incrementada a cada escrita (ver :func:`~.indexing.bump_index_version`); 0 se nunca escrito."""
+    return getattr(vector_store, "index_version", 0)
+
+
+def get_store_embeddings(vector_store):
+    """Modelo de embeddings usado pelo vector store (Chroma ou índices NumPy)."""
+    return getattr(vector_store, "embedding", None) or getattr(vector_store, "embeddings", None)
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: list = field(default_factory=list)
+    index_version: object = 0
+    created_at: float = 0.0
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """
+    Cache LRU de respostas com TTL, consultado por similaridade de cosseno.
+
+    Uma pergunta cujo embedding está a pelo menos ``threshold`` de uma pergunta
+    já respondida, contra a mesma versão do índice, reaproveita a resposta e as
+    fontes armazenadas sem chamar o LLM.
+    """
+
+    def __init__(self, embeddings, threshold: float = 0.95, ttl_seconds: float | None = 3600, max_entries: int = 1000):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold deve estar em (0, 1].")
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+        self._vectors: dict[str, np.ndarray] = {}
+        self._matrix = None
+        self._keys: list[str] = []
+        self._lock = threading.Lock()
+        self._index_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _embed(self, question: str) -> np.ndarray:
+        return normalize_rows([self.embeddings.embed_query(question)])[0]
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+        self._matrix = None
+
+    def _observe_version(self, index_version) -> None:
+        # Uma nova versão do índice invalida as respostas das versões anteriores
+        if index_version != self._index_version:
+            for key in [k for k, e in self._entries.items() if e.index_version != index_version]:
+                self._remove(key)
+            self._index_version = index_version
+
+    def _search_matrix(self):
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._vectors[k] for k in self._keys]) if self._keys else None
+        return self._matrix
+
+    async def _aembed(self, question: str) -> np.ndarray:
+        return normalize_rows([await aembed_query(self.embeddings, question)])[0]
+
+    def lookup(self, question: str, index_version=0) -> CachedAnswer | None:
+        """Retorna a resposta de uma pergunta semelhante, ou ``None``."""
+        return self._lookup_vector(self._embed(question), index_version)
+
+    async def alookup(self, question: str, index_version=0) -> CachedAnswer | None:
+        """Versão assíncrona de :meth:`lookup` (só o embedding é aguardado)."""
+        return self._lookup_vector(await self._aembed(question), index_version)
+
+    def _lookup_vector(self, vector: np.ndarray, index_version) -> CachedAnswer | None:
+        now = time.time()
+        with self._lock:
+            self._observe_version(index_version)
+            entry = None
+            matrix = self._search_matrix()
+            if matrix is not None:
+                scores = matrix @ vector
+                for pos in np.argsort(-scores):
+                    if scores[pos] < self.threshold:
+                        break
+                    candidate = self._entries[self._keys[pos]]
+                    if candidate.index_version != index_version:
+                        continue
+                    if self._expired(candidate, now):
+                        self._remove(self._keys[pos])
+                        continue
+                    entry = replace(candidate, similarity=float(scores[pos]))
+                    self._entries.move_to_end(self._keys[pos])
+                    break
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def store(self, question: str, answer: str, sources=None, index_version=0) -> None:
+        """Armazena a resposta de ``question`` para a versão de índice informada."""
+        self._store_vector(question, self._embed(question), answer, sources, index_version)
+
+    async def astore(self, question: str, answer: str, sources=None, index_version=0) -> None:
+        self._store_vector(question, await self._aembed(question), answer, sources, index_version)
+
+    def _store_vector(self, question: str, vector: np.ndarray, answer: str, sources, index_version) -> None:
+        with self._lock:
+            self._observe_version(index_version)
+            self._remove(question)
+            self._entries[question] = CachedAnswer(question, answer, list(sources or []), index_version, time.time())
+            self._vectors[question] = vector
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, index_version=None) -> int:
+        """Remove as entradas de outras versões do índice (ou todas, sem versão)."""
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if index_version is None or entry.index_version != index_version
+            ]
+            for key in stale:
+                self._remove(key)
+        if stale:
+            logger.info("Cache semântico: %d entradas invalidadas", len(stale))
+        return len(stale)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
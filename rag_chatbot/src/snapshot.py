@@ -0,0 +1,361 @@
+"""
+Snapshot do índice vetorial em disco, carregado com ``mmap`` (sem cópias nem parsing).
+
+Um snapshot é um diretório com arquivos ``.npy`` abertos com
+``np.load(mmap_mode="r")``, então carregar só mapeia as páginas, e processos
+no mesmo host as compartilham pelo page cache do sistema operacional:
+
+- ``vectors.npy``: matriz float32 (n × dim) de embeddings já normalizados;
+- ``texts.npy`` + ``texts_offsets.npy``: textos dos chunks em UTF-8,
+  concatenados, e a tabela de offsets (int64, n + 1);
+- ``ids.npy`` + ``ids_offsets.npy``: ids dos chunks, no mesmo formato;
+- ``metadata.npy``: colunas de metadados (int32, n × chaves) com códigos para
+  os dicionários de valores de ``manifest.json`` (-1 = chave ausente);
+- ``centroids.npy`` + ``assignments.npy``: listas do índice IVF, se treinado;
+- ``manifest.json``: formato, versão, tipo de índice, modelo e dimensão dos
+  embeddings, parâmetros e partições.
+
+Os Documents são criados sob demanda, só para os chunks retornados pelas
+buscas. O índice carregado é somente leitura até a primeira alteração
+(``add_documents``/``delete``), que copia os dados para a memória.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import numpy as np
+from langchain_core.documents import Document
+from .flat_index import FlatVectorIndex, PartitionedVectorIndex
+from .ivf_index import IVFVectorIndex
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "rag-index-snapshot"
+SNAPSHOT_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+
+_IVF_PARAMS = ("n_lists", "nprobe", "min_train_size", "n_iter", "seed", "retrain_factor")
+
+
+class StringColumn:
+    """Sequência de strings decodificadas sob demanda de um blob UTF-8 e sua tabela de offsets."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class SnapshotDocuments:
+    """
+    Documents de um snapshot, montados sob demanda a partir das colunas.
+
+    Cada Document é memoizado, então a mesma linha devolve sempre o mesmo
+    objeto. :meth:`select` aplica filtros de metadados direto sobre os
+    códigos, sem criar Documents.
+    """
+
+    def __init__(self, texts: StringColumn, codes: np.ndarray, columns: list[dict]):
+        self.texts = texts
+        self.codes = codes
+        self.columns = columns
+        self._lookup = [
+            {_value_key(value): code for code, value in enumerate(column["values"])} for column in columns
+        ]
+        self._cache: dict[int, Document] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def metadata(self, i: int) -> dict:
+        return {
+            column["key"]: column["values"][code]
+            for column, code in zip(self.columns, self.codes[i].tolist())
+            if code >= 0
+        }
+
+    def __getitem__(self, i: int) -> Document:
+        if i < 0:
+            i += len(self)
+        document = self._cache.get(i)
+        if document is None:
+            document = self._cache[i] = Document(page_content=self.texts[i], metadata=self.metadata(i))
+        return document
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def select(self, filter: dict) -> np.ndarray:
+        """Linhas cujos metadados têm todos os pares de ``filter``."""
+        mask = np.ones(len(self), dtype=bool)
+        keys = [column["key"] for column in self.columns]
+        for key, value in filter.items():
+            if key not in keys:
+                if value is not None:
+                    return np.empty(0, dtype=np.int64)
+                continue
+            j = keys.index(key)
+            code = -1 if value is None else self._lookup[j].get(_value_key(value))
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.codes[:, j] == code
+        return np.flatnonzero(mask)
+
+
+def _value_key(value) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+# --- Gravação ---
+def _rows(index) -> tuple[list, list, np.ndarray]:
+    """ids, Documents e matriz de um índice plano (lidos como listas, mesmo se vierem de um snapshot)."""
+    return list(index.ids), list(index.documents), index.matrix
+
+
+def _encode_strings(strings) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _encode_metadata(documents) -> tuple[np.ndarray, list[dict]]:
+    keys: list[str] = []
+    for doc in documents:
+        keys.extend(key for key in doc.metadata if key not in keys)
+    codes = np.full((len(documents), len(keys)), -1, dtype=np.int32)
+    columns = []
+    for j, key in enumerate(keys):
+        lookup: dict[str, int] = {}
+        values = []
+        for i, doc in enumerate(documents):
+            if key not in doc.metadata:
+                continue
+            value = doc.metadata[key]
+            code = lookup.get(_value_key(value))
+            if code is None:
+                code = lookup[_value_key(value)] = len(values)
+                values.append(value)
+            codes[i, j] = code
+        columns.append({"key": key, "values": values})
+    return codes, columns
+
+
+def _layout(index) -> tuple[str, list, list, list[np.ndarray], list[dict]]:
+    """Tipo do índice e suas linhas em ordem; partições viram faixas contíguas."""
+    if isinstance(index, PartitionedVectorIndex):
+        ids, documents, matrices, partitions = [], [], [], []
+        for value, partition in index.partitions.items():
+            if type(partition) is not FlatVectorIndex:
+                raise ValueError(f"Snapshot não suporta partições do tipo {type(partition).__name__}.")
+            part_ids, part_docs, matrix = _rows(partition)
+            partitions.append({"value": value, "start": len(ids), "stop": len(ids) + len(part_ids)})
+            ids += part_ids
+            documents += part_docs
+            matrices.append(matrix)
+        return "partitioned", ids, documents, matrices, partitions
+    if isinstance(index, FlatVectorIndex):
+        ids, documents, matrix = _rows(index)
+        return "ivf" if isinstance(index, IVFVectorIndex) else "flat", ids, documents, [matrix], []
+    raise ValueError(f"Snapshot não suporta vector stores do tipo {type(index).__name__}.")
+
+
+def embedding_model_name(embedding) -> str | None:
+    """Nome do modelo de embeddings, o mesmo que chaveia o cache de :class:`CachedEmbeddings`."""
+    if embedding is None:
+        return None
+    return getattr(embedding, "model_name", None) or getattr(embedding, "model", None) or type(embedding).__name__
+
+
+def embedding_dimension(embedding) -> int | None:
+    """Dimensão declarada pelo modelo (ou pelo modelo envolvido em ``base``), se houver."""
+    while embedding is not None:
+        for attr in ("dim", "dimensions", "output_dimensionality"):
+            value = getattr(embedding, attr, None)
+            if isinstance(value, int) and value > 0:
+                return value
+        embedding = getattr(embedding, "base", None)
+    return None
+
+
+def _write(path: str, index) -> dict:
+    kind, ids, documents, matrices, partitions = _layout(index)
+    dims = {m.shape[1] for m in matrices if len(m)}
+    if len(dims) > 1:
+        raise ValueError("Partições com dimensões de embedding diferentes.")
+    dim = dims.pop() if dims else 0
+    filled = [m for m in matrices if len(m)]
+    vectors = np.concatenate(filled) if filled else np.empty((0, dim), dtype=np.float32)
+    np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(vectors, dtype=np.float32))
+    for name, strings in (("texts", [d.page_content for d in documents]), ("ids", ids)):
+        blob, offsets = _encode_strings(strings)
+        np.save(os.path.join(path, f"{name}.npy"), blob)
+        np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+    codes, columns = _encode_metadata(documents)
+    np.save(os.path.join(path, "metadata.npy"), codes)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "kind": kind,
+        "count": len(ids),
+        "dim": dim,
+        "embedding_model": embedding_model_name(index.embedding),
+        "created_at": time.time(),
+        "metadata": columns,
+        "partitions": partitions,
+        "params": {},
+    }
+    if kind == "partitioned":
+        manifest["params"] = {"partition_key": index.partition_key, "min_hits": index.min_hits}
+    elif kind == "ivf":
+        manifest["params"] = {name: getattr(index, name) for name in _IVF_PARAMS}
+        if index.auto_lists:
+            manifest["params"]["n_lists"] = None
+        manifest["trained"] = index.is_trained
+        manifest["trained_size"] = index.trained_size
+        if index.is_trained:
+            np.save(os.path.join(path, "centroids.npy"), np.ascontiguousarray(index.centroids, dtype=np.float32))
+            np.save(os.path.join(path, "assignments.npy"), np.asarray(index._assignments, dtype=np.int32))
+    with open(os.path.join(path, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+
+def save_snapshot(index, path: str) -> None:
+    """
+    Grava ``index`` (plano, particionado ou IVF) como snapshot em ``path``.
+
+    Os arquivos são escritos em um diretório temporário que substitui o
+    anterior só no final: processos que já mapearam o snapshot antigo
+    continuam lendo os arquivos antigos até recarregar.
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        manifest = _write(tmp_path, index)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    logger.info("Snapshot do índice gravado em %s (%d chunks, dim %d)", path, manifest["count"], manifest["dim"])
+
+
+# --- Leitura ---
+def snapshot_exists(path: str) -> bool:
+    return os.path.exists(os.path.join(path, MANIFEST_FILENAME))
+
+
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST_FILENAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot incompatível em {path}: formato {manifest.get('format')!r} versão {manifest.get('version')!r} "
+            f"(esperado {SNAPSHOT_FORMAT!r} versão {SNAPSHOT_VERSION})."
+        )
+    return manifest
+
+
+def check_embedding(manifest: dict, embedding, path: str = "") -> None:
+    """
+    Levanta ValueError se ``embedding`` não é o modelo que gerou o snapshot.
+
+    Vetores de outro modelo (ou de outra dimensão) têm a mesma forma de
+    arquivo, mas as buscas com eles não fazem sentido.
+    """
+    model = embedding_model_name(embedding)
+    if manifest.get("embedding_model") != model:
+        raise ValueError(
+            f"Snapshot em {path} foi gerado com o modelo de embeddings {manifest.get('embedding_model')!r}, "
+            f"não {model!r}."
+        )
+    dim = embedding_dimension(embedding)
+    if dim is not None and manifest.get("dim") and manifest["dim"] != dim:
+        raise ValueError(f"Snapshot em {path} tem embeddings de dimensão {manifest['dim']}, não {dim}.")
+
+
+def _attach(index: FlatVectorIndex, vectors, ids: StringColumn, documents: SnapshotDocuments) -> FlatVectorIndex:
+    """Aponta o índice para as colunas mapeadas (sem copiar a matriz)."""
+    index._matrix = vectors
+    index._size = len(vectors)
+    index.ids = ids
+    index.documents = documents
+    return index
+
+
+def load_snapshot(path: str, embedding, **kwargs):
+    """
+    Abre o snapshot em ``path`` com o modelo ``embedding`` (usado só nas consultas).
+
+    ``kwargs`` sobrescreve os parâmetros gravados (por exemplo ``nprobe``).
+    Levanta ValueError se o formato ou a versão não forem os esperados, ou se
+    ``embedding`` não for o modelo gravado no manifesto (nome e dimensão).
+    """
+    start = time.perf_counter()
+    manifest = read_manifest(path)
+    check_embedding(manifest, embedding, path)
+
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    vectors = array("vectors")
+    texts_blob, texts_offsets = array("texts"), array("texts_offsets")
+    ids_blob, ids_offsets = array("ids"), array("ids_offsets")
+    codes = array("metadata")
+    columns = manifest["metadata"]
+
+    def rows(start: int, stop: int):
+        documents = SnapshotDocuments(StringColumn(texts_blob, texts_offsets[start:stop + 1]), codes[start:stop], columns)
+        return vectors[start:stop], StringColumn(ids_blob, ids_offsets[start:stop + 1]), documents
+
+    kind = manifest["kind"]
+    params = {**manifest["params"], **kwargs}
+    if kind == "partitioned":
+        index = PartitionedVectorIndex(embedding, **params)
+        for partition in manifest["partitions"]:
+            part_rows = rows(partition["start"], partition["stop"])
+            index.partitions[partition["value"]] = _attach(FlatVectorIndex(embedding), *part_rows)
+        # Mapa id -> partição reconstruído só na primeira alteração
+        index._partition_of = None
+    elif kind == "ivf":
+        index = _attach(IVFVectorIndex(embedding, **params), *rows(0, manifest["count"]))
+        if manifest.get("trained"):
+            index.centroids = array("centroids")
+            index.n_lists = len(index.centroids)
+            index.trained_size = manifest.get("trained_size", manifest["count"])
+            index._assignments = array("assignments")
+            index._rebuild_lists()
+    elif kind == "flat":
+        index = _attach(FlatVectorIndex(embedding, **params), *rows(0, manifest["count"]))
+    else:
+        raise ValueError(f"Tipo de índice desconhecido no snapshot: {kind}")
+    index.index_version += 1
+    logger.info(
+        "Snapshot do índice carregado de %s (%d chunks) em %.1f ms",
+        path, manifest["count"], (time.perf_counter() - start) * 1000,
+    )
+    return index
@@ -0,0 +1,124 @@
+"""Recuperação especulativa: busca sem filtro enquanto a consulta é analisada."""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.documents import Document
+from .logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRetriever:
+    """
+    Sobrepõe a busca vetorial à análise da consulta.
+
+    ``start(question)`` dispara, em uma thread, uma busca sem filtro pela
+    pergunta original com ``k * overfetch`` resultados. Quando a análise chega,
+    ``resolve(question, parsed_query)`` filtra os resultados especulativos pela
+    seção escolhida; só se sobrarem menos de ``k`` documentos (ou se não houver
+    especulação pendente) uma nova busca filtrada é executada.
+
+    Cada busca sai de ``_pending`` ao ser consumida ou, se ninguém a resolver
+    (a análise respondeu do cache, por exemplo), ``result_ttl`` segundos depois
+    de concluída.
+    """
+
+    def __init__(self, vector_store, k: int = 4, overfetch: int = 3, max_workers: int = 4, partition_key: str = "section", result_ttl: float = 30.0):
+        if k < 1 or overfetch < 1:
+            raise ValueError("k e overfetch devem ser maiores que zero.")
+        self.vector_store = vector_store
+        self.k = k
+        self.overfetch = overfetch
+        self.partition_key = partition_key
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+        self.result_ttl = result_ttl
+        self._pending: dict[str, list[Future]] = {}
+        # (prazo, pergunta, future) das buscas concluídas, em ordem de conclusão
+        self._done: deque[tuple[float, str, Future]] = deque()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.fallbacks = 0
+
+    def start(self, question: str) -> Future:
+        """Inicia a busca especulativa de ``question`` em segundo plano."""
+        future = self._executor.submit(self.vector_store.similarity_search, question, k=self.k * self.overfetch)
+        with self._lock:
+            self._expire(time.monotonic())
+            self._pending.setdefault(question, []).append(future)
+        future.add_done_callback(lambda f: self._on_done(question, f))
+        return future
+
+    def _on_done(self, question: str, future: Future) -> None:
+        with self._lock:
+            if future.cancelled():
+                self._remove(question, future)
+            else:
+                self._done.append((time.monotonic() + self.result_ttl, question, future))
+
+    def _expire(self, now: float) -> None:
+        """Remove as buscas concluídas há mais de ``result_ttl`` e nunca resolvidas."""
+        while self._done and self._done[0][0] <= now:
+            _, question, future = self._done.popleft()
+            self._remove(question, future)
+
+    def _remove(self, question: str, future: Future) -> None:
+        futures = self._pending.get(question)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self._pending[question]
+
+    def cancel(self, question: str) -> None:
+        """Descarta a especulação pendente de ``question`` (ex.: a análise falhou)."""
+        future = self._take(question)
+        if future is not None:
+            future.cancel()
+
+    def _take(self, question: str) -> Future | None:
+        with self._lock:
+            self._expire(time.monotonic())
+            futures = self._pending.get(question)
+            if not futures:
+                return None
+            future = futures.pop(0)
+            if not futures:
+                del self._pending[question]
+            return future
+
+    def _search(self, parsed_query: dict) -> list[Document]:
+        retriever = self.vector_store.as_retriever(
+            search_kwargs={"k": self.k, "filter": {self.partition_key: parsed_query["section"]}}
+        )
+        return retriever.invoke(parsed_query["query"])
+
+    def resolve(self, question: str, parsed_query: dict) -> list[Document]:
+        """Documentos da seção ``parsed_query['section']`` para a pergunta."""
+        future = self._take(question)
+        if future is not None:
+            try:
+                candidates = future.result()
+            except Exception as exc:
+                logger.warning("Busca especulativa falhou: %s", exc)
+                candidates = []
+            section = parsed_query["section"]
+            documents = [doc for doc in candidates if doc.metadata.get(self.partition_key) == section][: self.k]
+            if len(documents) >= self.k:
+                self.reused += 1
+                return documents
+        self.fallbacks += 1
+        return self._search(parsed_query)
+
+    def stats(self) -> dict:
+        total = self.reused + self.fallbacks
+        return {
+            "reused": self.reused,
+            "fallbacks": self.fallbacks,
+            "reuse_ratio": self.reused / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,6 @@
 import streamlit as st
 import os
 import sys
-from dotenv import load_dotenv
 
 # Adicionar o diretório pai (rag_chatbot) ao sys.path para importações relativas
 # Isso é necessário quando o script é executado de dentro de um subdiretório (src)
@@ -10,9 +9,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 # Importar funções e componentes do pipeline RAG
 from src.rag_pipeline import initialize_rag_components, create_rag_graph
 from src.advanced_features import stream_rag_response # Importar a função de streaming
+from src.config import load_config
 
 # Carrega as variáveis de ambiente do arquivo .env
-load_dotenv(dotenv_path='rag_chatbot/.env')
+load_config()
 
 # --- Configuração da Página Streamlit ---
 st.set_page_config(page_title="RAG Chatbot with LangChain", layout="wide")
@@ -32,7 +32,12 @@ def setup_rag_pipeline():
             vector_store=components["vector_store"],
             llm=components["llm"],
             rag_prompt=components["rag_prompt"],
-            structured_llm=components["structured_llm"]
+            structured_llm=components["structured_llm"],
+            answer_cache=components.get("answer_cache"),
+            analysis_cache=components.get("analysis_cache"),
+            section_router=components.get("section_router"),
+            speculative_retriever=components.get("speculative_retriever"),
+            engine=components.get("engine"),
         )
         return rag_app, components # Retorna o app e os componentes
     except Exception as e:
@@ -45,6 +50,11 @@ rag_app, rag_components = setup_rag_pipeline() # Captura o app e os componentes
 llm = rag_components["llm"]
 rag_prompt = rag_components["rag_prompt"]
 vector_store = rag_components["vector_store"] # Pode ser útil para depuração ou futuras features
+answer_cache = rag_components.get("answer_cache") # Cache semântico compartilhado com o grafo
+analysis_cache = rag_components.get("analysis_cache") # Memoização da análise de consulta
+section_router = rag_components.get("section_router") # Roteador local de seção
+speculative_retriever = rag_components.get("speculative_retriever") # Busca sobreposta à análise
+engine = rag_components.get("engine") # Cadeias pré-compiladas
 
 # --- Gerenciamento do Histórico de Mensagens ---
 if "messages" not in st.session_state:
@@ -82,7 +92,7 @@ with st.sidebar:
                 try:
                     # Para usar stream_rag_response, precisamos do rag_app e da pergunta
                     # A função stream_rag_response agora recebe llm, rag_prompt e vector_store
-                    for chunk in stream_rag_response(q, rag_app, llm, rag_prompt, vector_store):
+                    for chunk in stream_rag_response(q, rag_app, llm, rag_prompt, vector_store, answer_cache, analysis_cache, section_router, speculative_retriever, engine):
                         full_response += chunk
                         message_placeholder.markdown(full_response + "▌")
                     message_placeholder.markdown(full_response)
@@ -113,7 +123,7 @@ if prompt := st.chat_input("Faça sua pergunta..."):
         try:
             # Invocar o pipeline RAG com streaming
             # A função stream_rag_response agora recebe llm, rag_prompt e vector_store
-            for chunk in stream_rag_response(prompt, rag_app, llm, rag_prompt, vector_store):
+            for chunk in stream_rag_response(prompt, rag_app, llm, rag_prompt, vector_store, answer_cache, analysis_cache, section_router, speculative_retriever, engine):
                 full_response += chunk
                 message_placeholder.markdown(full_response + "▌")
             message_placeholder.markdown(full_response)
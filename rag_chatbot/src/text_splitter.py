@@ -1,21 +1,27 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from concurrent.futures import ProcessPoolExecutor
 import logging
 from .logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-def split_documents(documents: list[Document]):
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def split_document(document: Document) -> list[Document]:
     """
-    Divide documentos em chunks usando RecursiveCharacterTextSplitter e adiciona metadados de seção.
+    Divide um único documento e marca a seção (beginning, middle, end) de cada
+    chunk pela sua posição dentro do documento.
     """
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         add_start_index=True
     )
-    chunks = text_splitter.split_documents(documents)
+    chunks = text_splitter.split_documents([document])
 
     # Adicionar metadados de seção
     total_chunks = len(chunks)
@@ -26,14 +32,34 @@ def split_documents(documents: list[Document]):
         elif i > 2 * total_chunks / 3:
             section = "end"
         chunk.metadata["section"] = section
-    
+
     return chunks
 
+
+def split_documents(documents: list[Document], max_workers: int | None = None):
+    """
+    Divide documentos em chunks usando RecursiveCharacterTextSplitter e adiciona metadados de seção.
+
+    As seções são calculadas por documento, então cada documento é independente.
+    Com ``max_workers`` > 1 os documentos são divididos em um pool de processos;
+    o resultado é concatenado na ordem de entrada e é idêntico ao modo serial.
+    """
+    documents = list(documents)
+    if not max_workers or max_workers <= 1 or len(documents) <= 1:
+        return [chunk for doc in documents for chunk in split_document(doc)]
+
+    workers = min(max_workers, len(documents))
+    # Lotes maiores reduzem o custo de serialização entre processos
+    chunksize = max(1, len(documents) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(split_document, documents, chunksize=chunksize)
+        return [chunk for chunks in results for chunk in chunks]
+
 if __name__ == "__main__":
     # Exemplo de uso (normalmente seria chamado por outro módulo)
     # Para testar, vamos criar um documento dummy
     dummy_doc = Document(page_content="Este é um texto de exemplo para testar o text splitter. Ele precisa ser longo o suficiente para ser dividido em múltiplos chunks. Vamos adicionar mais conteúdo para garantir que o chunk_size e chunk_overlap sejam efetivos. " * 20)
-    
+
     chunks = split_documents([dummy_doc])
     logger.info(f"Total de chunks criados: {len(chunks)}")
     if chunks:
@@ -1,23 +1,35 @@
 import os
-from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
+import sys
 from langchain_core.documents import Document
 from langchain_core.tools import tool
 from .advanced_features import CachedEmbeddings
+from .micro_batching import MicroBatchingEmbeddings
+from .flat_index import FlatVectorIndex, PartitionedVectorIndex
+from .ivf_index import IVFVectorIndex
+from .indexing import MANIFEST_FILENAME, bump_index_version, sync_vector_store
+from .ingest import IngestStats, ingest_documents
+from .snapshot import load_snapshot, save_snapshot, snapshot_exists
+from .config import load_config
 import logging
 from .logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv(dotenv_path='rag_chatbot/.env')
+# O SDK do Google e o Chroma (langchain_community) são importados só quando usados:
+# juntos, dominam o tempo de importação do pacote.
+def _chroma():
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma
 
 def get_embeddings_model(api_key: str = None):
     """
     Configura e retorna o modelo de embeddings do Google Generative AI.
     """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    load_config()
     if api_key is None:
         api_key = os.getenv("GOOGLE_API_KEY")
 
@@ -28,28 +40,265 @@ def get_embeddings_model(api_key: str = None):
     # O modelo de embeddings do Google é geralmente "models/embedding-001".
     return GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=api_key)
 
-def create_vector_store(documents: list[Document]):
+def _query_batch_fn(model):
+    # O Google distingue embeddings de consulta e de documento (task_type).
+    # Se o SDK nunca foi importado, ``model`` não pode ser um modelo do Google.
+    genai = sys.modules.get("langchain_google_genai")
+    if genai is not None and isinstance(model, genai.GoogleGenerativeAIEmbeddings):
+        return lambda texts: model.embed_documents(texts, task_type="retrieval_query")
+    return model.embed_documents
+
+def create_embeddings(
+    cache_path: str | None = None,
+    batch_size: int = 100,
+    max_concurrency: int = 4,
+    micro_batch_ms: float | None = None,
+    micro_batch_size: int = 32,
+    model=None,
+) -> CachedEmbeddings:
     """
-    Cria e popula um vector store em memória com os documentos fornecidos.
+    Retorna o modelo de embeddings do Google envolvido por :class:`CachedEmbeddings`.
+
+    ``model`` substitui o modelo do Google (por exemplo, um modelo fictício
+    em benchmarks e testes offline).
+
+    Com ``micro_batch_ms`` > 0 (ou EMBEDDINGS_MICRO_BATCH_MS, padrão 5 ms), as
+    consultas concorrentes que não estão no cache são agrupadas por
+    :class:`MicroBatchingEmbeddings` em uma única chamada ao modelo, com até
+    ``max_concurrency`` lotes em andamento.
     """
-    base_embeddings = get_embeddings_model()
-    embeddings = CachedEmbeddings(base_embeddings)
-    # Usando Chroma como um exemplo de vector store em memória
-    vector_store = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        # persist_directory="./chroma_db" # Para persistir em disco, se necessário
+    if cache_path is None:
+        cache_path = os.getenv("EMBEDDINGS_CACHE_PATH")
+    if micro_batch_ms is None:
+        micro_batch_ms = float(os.getenv("EMBEDDINGS_MICRO_BATCH_MS", "5"))
+    if model is None:
+        model = get_embeddings_model()
+    if micro_batch_ms > 0 and callable(getattr(model, "embed_documents", None)):
+        model = MicroBatchingEmbeddings(
+            model,
+            max_batch_size=micro_batch_size,
+            max_wait_ms=micro_batch_ms,
+            batch_fn=_query_batch_fn(model),
+            max_in_flight=max_concurrency,
+        )
+    return CachedEmbeddings(
+        model,
+        cache_path=cache_path,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
     )
+
+def _resolve_backend(backend: str | None) -> str:
+    if backend is None:
+        backend = os.getenv("VECTOR_BACKEND", "chroma")
+    if backend not in ("chroma", "flat", "ivf"):
+        raise ValueError(f"Backend de vector store desconhecido: {backend}")
+    return backend
+
+def _ivf_index_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, "ivf_index")
+
+def _open_ivf_index(persist_directory: str, embeddings, index_kwargs: dict) -> IVFVectorIndex:
+    """Carrega o índice IVF salvo em ``persist_directory`` ou cria um vazio."""
+    index_path = _ivf_index_path(persist_directory)
+    if os.path.exists(os.path.join(index_path, "vectors.npz")):
+        return IVFVectorIndex.load(index_path, embeddings, **index_kwargs)
+    return IVFVectorIndex(embeddings, **index_kwargs)
+
+def create_vector_store(
+    documents: list[Document],
+    cache_path: str | None = None,
+    batch_size: int = 100,
+    max_concurrency: int = 4,
+    persist_directory: str | None = None,
+    collection_name: str = "rag_chatbot",
+    backend: str | None = None,
+    partition_by: str | None = "section",
+    index_kwargs: dict | None = None,
+    embeddings_model=None,
+    snapshot_path: str | None = None,
+):
+    """
+    Cria e popula um vector store com os documentos fornecidos.
+
+    Se ``cache_path`` (ou a variável EMBEDDINGS_CACHE_PATH) estiver definido,
+    os embeddings são reaproveitados de um cache SQLite persistente.
+    ``batch_size`` e ``max_concurrency`` controlam os lotes enviados ao
+    modelo de embeddings durante a indexação.
+
+    Sem ``persist_directory`` (ou CHROMA_PERSIST_DIR) o índice é criado em
+    memória. Com ele, a coleção Chroma é persistida em disco e sincronizada de
+    forma incremental: apenas chunks novos ou alterados são embedados.
+
+    ``backend`` (ou VECTOR_BACKEND) escolhe entre ``"chroma"`` (padrão) e
+    ``"flat"``, um índice NumPy em processo com busca exata por matmul.
+    No backend ``"flat"`` o índice é particionado por ``partition_by``, de modo
+    que o filtro de seção escolhe a partição em vez de filtrar metadados.
+    ``"ivf"`` usa o índice aproximado :class:`IVFVectorIndex`; ``index_kwargs``
+    repassa os parâmetros de recall/latência (``n_lists``, ``nprobe``...). Com
+    ``persist_directory`` o índice IVF é salvo em disco e sincronizado de forma
+    incremental, como a coleção Chroma.
+
+    ``embeddings_model`` substitui o modelo de embeddings do Google.
+
+    Com ``snapshot_path`` (ou INDEX_SNAPSHOT_PATH), os índices ``"flat"`` e
+    ``"ivf"`` são gravados como snapshot mapeável em memória, que
+    :func:`load_vector_store_snapshot` abre nas inicializações seguintes.
+    """
+    if persist_directory is None:
+        persist_directory = os.getenv("CHROMA_PERSIST_DIR")
+    backend = _resolve_backend(backend)
+    embeddings = create_embeddings(cache_path, batch_size, max_concurrency, model=embeddings_model)
+
+    index_kwargs = index_kwargs or {}
+    if backend == "ivf" and persist_directory:
+        index_path = _ivf_index_path(persist_directory)
+        vector_store = _open_ivf_index(persist_directory, embeddings, index_kwargs)
+        # Os arquivos do índice são gravados antes do manifesto
+        sync_vector_store(
+            vector_store, documents, os.path.join(index_path, MANIFEST_FILENAME),
+            persist=lambda: vector_store.save(index_path),
+        )
+    elif backend == "ivf":
+        vector_store = IVFVectorIndex.from_documents(documents, embeddings, **index_kwargs)
+    elif backend == "flat" and partition_by:
+        vector_store = PartitionedVectorIndex.from_documents(documents, embeddings, partition_key=partition_by)
+    elif backend == "flat":
+        vector_store = FlatVectorIndex.from_documents(documents, embeddings, **index_kwargs)
+    elif persist_directory:
+        vector_store = _chroma()(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory,
+        )
+        manifest_path = os.path.join(persist_directory, MANIFEST_FILENAME)
+        sync_vector_store(vector_store, documents, manifest_path)
+    else:
+        # Usando Chroma como um exemplo de vector store em memória
+        vector_store = _chroma().from_documents(
+            documents=documents,
+            embedding=embeddings,
+        )
+    stats = embeddings.stats()
+    logger.info("Cache de embeddings: %d hits, %d misses", stats["hits"], stats["misses"])
+    save_vector_store_snapshot(vector_store, snapshot_path)
     return vector_store
 
-def add_documents_to_vector_store(vector_store: Chroma, documents: list[Document]):
+def save_vector_store_snapshot(vector_store, snapshot_path: str | None = None) -> bool:
+    """
+    Grava o índice em ``snapshot_path`` (ou INDEX_SNAPSHOT_PATH) no formato de
+    :mod:`rag_chatbot.src.snapshot`. Retorna False se não há caminho
+    configurado ou o vector store não é um índice NumPy (o Chroma persiste
+    com ``persist_directory``).
+    """
+    if snapshot_path is None:
+        snapshot_path = os.getenv("INDEX_SNAPSHOT_PATH")
+    if not snapshot_path or not isinstance(vector_store, (FlatVectorIndex, PartitionedVectorIndex)):
+        return False
+    save_snapshot(vector_store, snapshot_path)
+    return True
+
+def load_vector_store_snapshot(snapshot_path: str | None = None, backend: str | None = None, **embedding_kwargs):
+    """
+    Abre o snapshot de ``snapshot_path`` (ou INDEX_SNAPSHOT_PATH) sem reindexar
+    os documentos: a matriz e os textos são mapeados do disco, e só o modelo
+    de embeddings das consultas é criado (``embedding_kwargs`` vai para
+    :func:`create_embeddings`).
+
+    Retorna None se não há snapshot, se o backend é ``"chroma"`` ou se o
+    snapshot é de uma versão incompatível ou de outro modelo de embeddings
+    (nome ou dimensão); nesse caso o chamador reconstrói o índice, e a
+    ingestão grava um snapshot novo.
+    """
+    if snapshot_path is None:
+        snapshot_path = os.getenv("INDEX_SNAPSHOT_PATH")
+    if not snapshot_path or _resolve_backend(backend) == "chroma" or not snapshot_exists(snapshot_path):
+        return None
+    try:
+        return load_snapshot(snapshot_path, create_embeddings(**embedding_kwargs))
+    except ValueError as exc:
+        logger.warning("Snapshot do índice ignorado: %s", exc)
+        return None
+
+def create_empty_vector_store(
+    backend: str | None = None,
+    collection_name: str = "rag_chatbot",
+    partition_by: str | None = "section",
+    index_kwargs: dict | None = None,
+    persist_directory: str | None = None,
+    **embedding_kwargs,
+):
+    """
+    Cria um vector store para ser populado em lotes por
+    :func:`rag_chatbot.src.ingest.ingest_documents`.
+
+    Com ``persist_directory`` (ou CHROMA_PERSIST_DIR), o Chroma abre a coleção
+    persistida e o backend ``"ivf"`` carrega o índice salvo, como em
+    :func:`create_vector_store`; :func:`ingest_vector_store` os atualiza de
+    forma incremental. O índice ``"flat"`` é criado em memória e persistido
+    pelo snapshot (:func:`save_vector_store_snapshot`).
+    """
+    if persist_directory is None:
+        persist_directory = os.getenv("CHROMA_PERSIST_DIR")
+    backend = _resolve_backend(backend)
+    embeddings = create_embeddings(**embedding_kwargs)
+    index_kwargs = index_kwargs or {}
+    if backend == "ivf" and persist_directory:
+        return _open_ivf_index(persist_directory, embeddings, index_kwargs)
+    if backend == "ivf":
+        return IVFVectorIndex(embeddings, **index_kwargs)
+    if backend == "flat" and partition_by:
+        return PartitionedVectorIndex(embeddings, partition_key=partition_by)
+    if backend == "flat":
+        return FlatVectorIndex(embeddings, **index_kwargs)
+    if persist_directory:
+        return _chroma()(collection_name=collection_name, embedding_function=embeddings, persist_directory=persist_directory)
+    return _chroma()(collection_name=collection_name, embedding_function=embeddings)
+
+def ingest_vector_store(
+    documents,
+    backend: str | None = None,
+    collection_name: str = "rag_chatbot",
+    partition_by: str | None = "section",
+    index_kwargs: dict | None = None,
+    persist_directory: str | None = None,
+    **embedding_kwargs,
+) -> tuple[object, IngestStats]:
+    """
+    Indexa ``documents`` (um iterável, consumido em streaming) com
+    :func:`rag_chatbot.src.ingest.ingest_documents` no vector store de
+    :func:`create_empty_vector_store`.
+
+    Nos índices persistidos (Chroma ou IVF com ``persist_directory``), a
+    ingestão segue o manifesto de fingerprints: só chunks novos ou alterados
+    são embedados, os que sumiram da fonte são removidos e o índice IVF é
+    salvo antes do manifesto.
+    """
+    if persist_directory is None:
+        persist_directory = os.getenv("CHROMA_PERSIST_DIR")
+    backend = _resolve_backend(backend)
+    vector_store = create_empty_vector_store(
+        backend, collection_name, partition_by, index_kwargs, persist_directory, **embedding_kwargs
+    )
+    manifest_path = persist = None
+    if persist_directory and backend == "ivf":
+        index_path = _ivf_index_path(persist_directory)
+        manifest_path = os.path.join(index_path, MANIFEST_FILENAME)
+        persist = lambda: vector_store.save(index_path)
+    elif persist_directory and backend == "chroma":
+        manifest_path = os.path.join(persist_directory, MANIFEST_FILENAME)
+    stats = ingest_documents(documents, vector_store, manifest_path=manifest_path, persist=persist)
+    return vector_store, stats
+
+def add_documents_to_vector_store(vector_store: "Chroma | FlatVectorIndex | PartitionedVectorIndex", documents: list[Document]):
     """
     Adiciona documentos a um vector store existente.
     """
     vector_store.add_documents(documents)
-    logger.info(f"Adicionados {len(documents)} documentos ao vector store.")
+    bump_index_version(vector_store)
+    logger.info("Adicionados %d documentos ao vector store.", len(documents))
 
-vector_store: Chroma | None = None
+vector_store: "Chroma | FlatVectorIndex | PartitionedVectorIndex | None" = None
 
 
 @tool(response_format="content_and_artifact")
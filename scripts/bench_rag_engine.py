@@ -0,0 +1,77 @@
+"""
+Microbenchmark: custo de montagem das cadeias por pergunta, com e sem RagEngine.
+
+Compara o caminho antigo (``with_structured_output`` + prompts + cadeias
+montados a cada pergunta) com um :class:`RagEngine` criado uma vez. Usa um
+modelo de chat fictício, então mede apenas o overhead local, sem rede.
+
+    python scripts/bench_rag_engine.py --requests 2000
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from rag_chatbot.src.rag_engine import RagEngine, Search, build_analysis_chain, build_rag_chain
+
+RAG_TEMPLATE = """Use o seguinte contexto recuperado para responder à pergunta.
+
+Contexto: {context}
+Pergunta: {question}
+"""
+
+
+class StructuredFakeChatModel(FakeListChatModel):
+    """Modelo fictício cuja saída estruturada é um ``Search`` fixo."""
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(lambda _: {"query": "task decomposition", "section": "beginning"})
+
+
+def per_call(llm, rag_prompt, question: str) -> str:
+    # Caminho antigo: tudo montado de novo a cada pergunta
+    structured_llm = llm.with_structured_output(Search)
+    build_analysis_chain(structured_llm).invoke({"question": question})
+    return build_rag_chain(llm, rag_prompt).invoke({"context": "ctx", "question": question})
+
+
+def with_engine(engine: RagEngine, question: str) -> str:
+    engine.analysis_chain.invoke({"question": question})
+    return engine.rag_chain.invoke({"context": "ctx", "question": question})
+
+
+def measure(fn, n: int) -> list[float]:
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(f"pergunta {i}")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    llm = StructuredFakeChatModel(responses=["resposta"])
+    rag_prompt = ChatPromptTemplate.from_template(RAG_TEMPLATE)
+    engine = RagEngine(vector_store=None, llm=llm, rag_prompt=rag_prompt)
+
+    results = {
+        "por chamada": measure(lambda q: per_call(llm, rag_prompt, q), args.requests),
+        "RagEngine": measure(lambda q: with_engine(engine, q), args.requests),
+    }
+    for label, timings in results.items():
+        timings_us = sorted(t * 1e6 for t in timings)
+        p95 = timings_us[int(len(timings_us) * 0.95) - 1]
+        print(f"{label:>12}: mediana {statistics.median(timings_us):8.1f} µs  p95 {p95:8.1f} µs")
+    saved = statistics.median(results["por chamada"]) - statistics.median(results["RagEngine"])
+    print(f"Overhead de montagem removido: {saved * 1e6:.1f} µs por pergunta")
+
+
+if __name__ == "__main__":
+    main()
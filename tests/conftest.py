@@ -1,6 +1,9 @@
 import os
 import sys
+import json
 import types
+import itertools
+import collections
 import pytest
 
 @pytest.fixture(autouse=True)
@@ -68,8 +71,12 @@ def stub_libraries(monkeypatch):
     # langchain_community.vectorstores
     vector_module = types.ModuleType("langchain_community.vectorstores")
     class DummyChroma:
-        def __init__(self):
+        def __init__(self, **kwargs):
             self.documents = []
+            self.kwargs = kwargs
+        def add_documents(self, documents, ids=None):
+            self.documents.extend(documents)
+            return ids
         @classmethod
         def from_documents(cls, documents, embedding=None, **kwargs):
             obj = cls()
@@ -107,11 +114,18 @@ def stub_libraries(monkeypatch):
     class DummyPrompt:
         def __init__(self, *args, **kwargs):
             pass
+        def __or__(self, other):
+            return self
+        def __ror__(self, other):
+            return self
         def format_messages(self, **kwargs):
             return "formatted"
         @classmethod
         def from_template(cls, template):
             return cls()
+        @classmethod
+        def from_messages(cls, messages):
+            return cls()
     prompts_module.ChatPromptTemplate = DummyPrompt
     monkeypatch.setitem(sys.modules, "langchain_core.prompts", prompts_module)
 
@@ -140,29 +154,71 @@ def stub_libraries(monkeypatch):
     # langchain_core.messages
     messages_module = types.ModuleType("langchain_core.messages")
     class BaseMessage:
-        def __init__(self, content="", **kwargs):
+        def __init__(self, content="", additional_kwargs=None, **kwargs):
             self.content = content
-            self.additional_kwargs = kwargs
+            self.additional_kwargs = additional_kwargs if additional_kwargs is not None else kwargs
 
     class HumanMessage(BaseMessage):
-        pass
+        type = "human"
 
     class AIMessage(BaseMessage):
-        pass
+        type = "ai"
+
+    class SystemMessage(BaseMessage):
+        type = "system"
 
     class ToolMessage(BaseMessage):
-        def __init__(self, content="", tool_call_id=None, **kwargs):
+        type = "tool"
+
+        def __init__(self, content="", tool_call_id=None, artifact=None, **kwargs):
             super().__init__(content, **kwargs)
             self.tool_call_id = tool_call_id
+            self.artifact = artifact
 
     messages_module.BaseMessage = BaseMessage
     messages_module.HumanMessage = HumanMessage
     messages_module.AIMessage = AIMessage
     messages_module.ToolMessage = ToolMessage
+    messages_module.SystemMessage = SystemMessage
     monkeypatch.setitem(sys.modules, "langchain_core.messages", messages_module)
 
+    # langgraph.checkpoint.base
+    checkpoint_module = types.ModuleType("langgraph.checkpoint.base")
+    serializable = {cls.__name__: cls for cls in (HumanMessage, AIMessage, SystemMessage, ToolMessage, DummyDocument)}
+    class JsonSerializer:
+        """Stands in for JsonPlusSerializer: JSON with the stub classes above."""
+        def dumps_typed(self, obj):
+            return "json", json.dumps(obj, default=lambda o: {"__type__": type(o).__name__, **vars(o)}).encode()
+        def loads_typed(self, data):
+            def hook(d):
+                cls = serializable.get(d.get("__type__"))
+                if cls is None:
+                    return d
+                obj = cls.__new__(cls)
+                vars(obj).update({k: v for k, v in d.items() if k != "__type__"})
+                return obj
+            return json.loads(data[1], object_hook=hook)
+    class BaseCheckpointSaver:
+        serde = JsonSerializer()
+        def __init__(self, *, serde=None):
+            self.serde = serde or self.serde
+        def get(self, config):
+            value = self.get_tuple(config)
+            return value.checkpoint if value else None
+        def get_next_version(self, current, channel):
+            return 1 if current is None else current + 1
+    checkpoint_module.BaseCheckpointSaver = BaseCheckpointSaver
+    checkpoint_module.CheckpointTuple = collections.namedtuple(
+        "CheckpointTuple", "config checkpoint metadata parent_config pending_writes", defaults=(None, None)
+    )
+    checkpoint_module.WRITES_IDX_MAP = {"__error__": -1, "__scheduled__": -2, "__interrupt__": -3, "__resume__": -4}
+    checkpoint_module.get_checkpoint_id = lambda config: config["configurable"].get("checkpoint_id")
+    checkpoint_module.get_checkpoint_metadata = lambda config, metadata: dict(metadata)
+    monkeypatch.setitem(sys.modules, "langgraph.checkpoint.base", checkpoint_module)
+
     # langgraph.graph
     graph_module = types.ModuleType("langgraph.graph")
+    checkpoint_ids = itertools.count(1)
     class MessagesState(dict):
         pass
     class StateGraph:
@@ -175,16 +231,36 @@ def stub_libraries(monkeypatch):
             pass
         def set_entry_point(self, name):
             self.entry = name
-        def compile(self):
+        def compile(self, checkpointer=None):
             class App:
-                def __init__(self, nodes, entry):
+                def __init__(self, nodes, entry, checkpointer):
                     self.nodes = nodes
                     self.entry = entry
-                def invoke(self, state):
-                    for func in self.nodes.values():
-                        state.update(func(state))
+                    self.checkpointer = checkpointer
+                def _save(self, config, state, step):
+                    # one checkpoint per step, like Pregel (ids sort by creation)
+                    checkpoint = {"v": 1, "id": f"{next(checkpoint_ids):032d}", "channel_values": dict(state)}
+                    return self.checkpointer.put(config, checkpoint, {"source": "loop", "step": step}, {})
+                def invoke(self, state, config=None):
+                    if self.checkpointer is not None:
+                        config = {"configurable": {"checkpoint_ns": "", **config["configurable"]}}
+                        saved = self.checkpointer.get_tuple(config)
+                        if saved is not None:
+                            values = saved.checkpoint["channel_values"]
+                            state = {**values, **state, "messages": values.get("messages", []) + list(state.get("messages", []))}
+                        config = self._save(config, state, -1)
+                    for step, func in enumerate(self.nodes.values()):
+                        update = dict(func(state))
+                        if "messages" in update:
+                            # like the add_messages reducer: append only new messages
+                            current = state.get("messages", [])
+                            known = {id(m) for m in current}
+                            update["messages"] = current + [m for m in update["messages"] if id(m) not in known]
+                        state.update(update)
+                        if self.checkpointer is not None:
+                            config = self._save(config, state, step)
                     return state
-            return App(self.nodes, self.entry)
+            return App(self.nodes, self.entry, checkpointer)
     graph_module.MessagesState = MessagesState
     graph_module.StateGraph = StateGraph
     graph_module.END = "end"
@@ -198,6 +274,7 @@ def stub_libraries(monkeypatch):
         def invoke(self, state):
             return state
     prebuilt_module.ToolNode = DummyToolNode
+    prebuilt_module.tools_condition = lambda state: "tools"
     monkeypatch.setitem(sys.modules, "langgraph.prebuilt", prebuilt_module)
 
     # langchain_core.tools
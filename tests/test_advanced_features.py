@@ -0,0 +1,104 @@
+import importlib
+from types import SimpleNamespace
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 0.5]
+
+
+def test_cached_embeddings_disk_tier(tmp_path):
+    module = importlib.import_module('rag_chatbot.src.advanced_features')
+    path = str(tmp_path / 'embeddings.sqlite')
+
+    base = CountingEmbeddings()
+    first = module.CachedEmbeddings(base, cache_path=path, model_name='m')
+    assert first.embed_documents(['a', 'bb', 'a']) == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert (first.hits, first.misses) == (1, 2)
+
+    # Um novo processo (nova instância) reaproveita o cache em disco
+    base2 = CountingEmbeddings()
+    second = module.CachedEmbeddings(base2, cache_path=path, model_name='m')
+    assert second.embed_query('bb') == [2.0, 0.5]
+    assert base2.calls == 0
+    assert second.stats()['hits'] == 1
+
+    # Outro modelo não compartilha as chaves
+    third = module.CachedEmbeddings(CountingEmbeddings(), cache_path=path, model_name='other')
+    third.embed_query('bb')
+    assert third.misses == 1
+
+
+class BatchEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+def test_cached_embeddings_batches_and_deduplicates():
+    module = importlib.import_module('rag_chatbot.src.advanced_features')
+    base = BatchEmbeddings()
+    embeddings = module.CachedEmbeddings(base, batch_size=2, max_concurrency=3)
+
+    texts = ['a', 'bbb', 'a', 'cc', 'dddd', 'bbb', 'eeeee']
+    vectors = embeddings.embed_documents(texts)
+
+    assert vectors == [[float(len(t))] for t in texts]
+    assert sorted(len(b) for b in base.batches) == [1, 2, 2]
+    assert sorted(t for b in base.batches for t in b) == ['a', 'bbb', 'cc', 'dddd', 'eeeee']
+    assert (embeddings.hits, embeddings.misses) == (2, 5)
+
+    embeddings.embed_documents(['cc', 'a'])
+    assert len(base.batches) == 3
+
+
+def test_stream_rag_response_uses_answer_cache(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.advanced_features')
+    cache_module = importlib.import_module('rag_chatbot.src.semantic_cache')
+    streamed = []
+
+    class LLM:
+        def with_structured_output(self, schema):
+            return self
+
+        def stream(self, prompt):
+            streamed.append(prompt)
+            yield 'an'
+            yield 'swer'
+
+    class Chain:
+        def __or__(self, other):
+            return self
+
+        def invoke(self, value):
+            return {'query': value['question'], 'section': 'beginning'}
+
+    class Prompt:
+        def __or__(self, other):
+            return Chain()
+
+        def __ror__(self, other):
+            return self
+
+        def format_messages(self, **kwargs):
+            return 'formatted'
+
+    monkeypatch.setattr(importlib.import_module('rag_chatbot.src.rag_engine').ChatPromptTemplate, 'from_messages', lambda messages: Prompt(), raising=False)
+    store = SimpleNamespace(
+        index_version=1,
+        as_retriever=lambda **kwargs: SimpleNamespace(invoke=lambda query: []),
+    )
+    cache = cache_module.SemanticAnswerCache(SimpleNamespace(embed_query=lambda text: [1.0, 0.0]))
+
+    first = ''.join(module.stream_rag_response('q?', None, LLM(), Prompt(), store, cache))
+    second = ''.join(module.stream_rag_response('q?', None, LLM(), Prompt(), store, cache))
+    assert first == second == 'answer'
+    assert len(streamed) == 1
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,137 @@
+import asyncio
+import importlib
+import json
+
+
+class Prompt:
+    def __or__(self, other):
+        return Chain()
+
+    def __ror__(self, other):
+        return self
+
+    def format_messages(self, **kwargs):
+        return kwargs
+
+
+class Chain:
+    def __or__(self, other):
+        return self
+
+    async def ainvoke(self, value):
+        return {'query': value['question'], 'section': 'beginning'}
+
+
+class LLM:
+    def with_structured_output(self, schema):
+        return self
+
+    async def astream(self, prompt):
+        for token in ('linha 1\nlinha 2', ' fim'):
+            await asyncio.sleep(0.001)
+            yield token
+
+
+class Retriever:
+    async def ainvoke(self, query):
+        return []
+
+
+class Store:
+    def as_retriever(self, **kwargs):
+        return Retriever()
+
+
+def components():
+    return {'llm': LLM(), 'rag_prompt': Prompt(), 'vector_store': Store()}
+
+
+async def request(app, method, path, body=None, disconnect_after_start=False):
+    """Executa uma requisição ASGI e retorna (status, headers, corpo)."""
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+    sent = []
+    started = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after_start:
+            await started.wait()
+            return {'type': 'http.disconnect'}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+        if message['type'] == 'http.response.start':
+            started.set()
+
+    await app({'type': 'http', 'method': method, 'path': path}, receive, send)
+    start = sent[0]
+    body = b''.join(m.get('body', b'') for m in sent[1:])
+    return start['status'], dict(start['headers']), body.decode()
+
+
+def test_health_readiness_and_sse_chat(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.api_server')
+    features = importlib.import_module('rag_chatbot.src.advanced_features')
+    monkeypatch.setattr(importlib.import_module('rag_chatbot.src.rag_engine').ChatPromptTemplate, 'from_messages', lambda messages: Prompt(), raising=False)
+    app = module.create_app(components)
+
+    async def main():
+        assert (await request(app, 'GET', '/healthz'))[0] == 200
+        assert (await request(app, 'GET', '/readyz'))[0] == 503
+        assert (await request(app, 'POST', '/chat', {'question': 'oi'}))[0] == 503
+
+        await app.startup()
+        assert (await request(app, 'GET', '/readyz'))[0] == 200
+        assert (await request(app, 'POST', '/chat', {'question': ' '}))[0] == 400
+        assert (await request(app, 'GET', '/chat'))[0] == 405
+
+        results = await asyncio.gather(*(
+            request(app, 'POST', '/chat', {'question': f'pergunta {i}', 'session_id': f's{i % 3}'})
+            for i in range(30)
+        ))
+        return results, await request(app, 'GET', '/metrics')
+
+    results, metrics = asyncio.run(main())
+    assert metrics[0] == 200 and metrics[1][b'content-type'].startswith(b'text/plain')
+    assert 'rag_time_to_first_token_seconds_count' in metrics[2]
+    assert 'rag_stage_duration_seconds_count{stage="retrieve"}' in metrics[2]
+    status, headers, body = results[0]
+    assert status == 200
+    assert headers[b'content-type'].startswith(b'text/event-stream')
+    assert headers[b'x-session-id'] == b's0'
+    assert len(headers[b'x-request-id']) == 16
+    assert body == (
+        'event: session\ndata: s0\n\n'
+        'data: linha 1\ndata: linha 2\n\n'
+        'data:  fim\n\n'
+        'event: done\ndata: \n\n'
+    )
+    assert all(r[0] == 200 for r in results)
+    assert [r[1][b'x-session-id'] for r in results[:4]] == [b's0', b's1', b's2', b's0']
+
+
+def test_chat_stops_streaming_when_client_disconnects(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.api_server')
+    features = importlib.import_module('rag_chatbot.src.advanced_features')
+    monkeypatch.setattr(importlib.import_module('rag_chatbot.src.rag_engine').ChatPromptTemplate, 'from_messages', lambda messages: Prompt(), raising=False)
+
+    class SlowLLM(LLM):
+        async def astream(self, prompt):
+            while True:
+                await asyncio.sleep(0.01)
+                yield 'x'
+
+    app = module.create_app(lambda: dict(components(), llm=SlowLLM()))
+
+    async def main():
+        await app.startup()
+        return await asyncio.wait_for(
+            request(app, 'POST', '/chat', {'question': 'oi'}, disconnect_after_start=True), timeout=2
+        )
+
+    status, headers, body = asyncio.run(main())
+    assert status == 200
+    assert len(headers[b'x-session-id']) == 32
+    assert 'event: done' not in body
@@ -0,0 +1,125 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+
+class AsyncEmbeddings:
+    """Embeddings com API assíncrona que registram a concorrência máxima."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] if 'b' in t else [0.0, 1.0] for t in texts]
+
+    async def aembed_query(self, text):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return [1.0, 0.0] if 'b' in text else [0.0, 1.0]
+
+
+class AsyncChain:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __or__(self, other):
+        return self
+
+    async def ainvoke(self, value):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.result(value)
+
+
+class Prompt:
+    """Prompt fake que compõe com ``|`` em qualquer lado."""
+
+    def __init__(self, chain):
+        self.chain = chain
+
+    def __or__(self, other):
+        return self.chain
+
+    def __ror__(self, other):
+        return self
+
+    def format_messages(self, **kwargs):
+        return kwargs
+
+
+def make_store(embeddings):
+    flat_index = importlib.import_module('rag_chatbot.src.flat_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [
+        Document(page_content='bb', metadata={'section': 'beginning'}),
+        Document(page_content='ee', metadata={'section': 'end'}),
+    ]
+    return flat_index.FlatVectorIndex.from_documents(docs, embeddings)
+
+
+def test_async_graph_nodes(monkeypatch):
+    pipeline = importlib.import_module('rag_chatbot.src.rag_pipeline')
+    HumanMessage = importlib.import_module('langchain_core.messages').HumanMessage
+    analysis = AsyncChain(lambda value: {'query': 'b?', 'section': 'beginning'})
+    generation = AsyncChain(lambda value: f"resposta: {value['context']}")
+    monkeypatch.setattr(importlib.import_module('rag_chatbot.src.rag_engine').ChatPromptTemplate, 'from_messages', lambda messages: Prompt(analysis), raising=False)
+
+    graph = pipeline.create_async_rag_graph(make_store(AsyncEmbeddings()), None, Prompt(generation), None)
+
+    async def run(question):
+        # O App do conftest é síncrono: executa os nós assíncronos em ordem
+        state = {'messages': [HumanMessage(content=question)]}
+        for node in graph.nodes.values():
+            update = await node(state)
+            state['messages'] = state['messages'] + update['messages']
+        return state
+
+    async def main():
+        return await asyncio.gather(*(run(f'pergunta {i}') for i in range(20)))
+
+    results = asyncio.run(main())
+    assert {r['messages'][-1].content for r in results} == {'resposta: bb'}
+    assert analysis.calls == generation.calls == 20
+
+
+def test_astream_rag_response_concurrent_and_cached(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.advanced_features')
+    cache_module = importlib.import_module('rag_chatbot.src.semantic_cache')
+    embeddings = AsyncEmbeddings()
+    analysis = AsyncChain(lambda value: {'query': value['question'], 'section': 'end'})
+    monkeypatch.setattr(importlib.import_module('rag_chatbot.src.rag_engine').ChatPromptTemplate, 'from_messages', lambda messages: Prompt(analysis), raising=False)
+
+    class LLM:
+        streams = 0
+
+        def with_structured_output(self, schema):
+            return self
+
+        async def astream(self, prompt):
+            LLM.streams += 1
+            for token in ('a', 'b', 'c'):
+                await asyncio.sleep(0.001)
+                yield token
+
+    store = make_store(embeddings)
+    cache = cache_module.SemanticAnswerCache(embeddings)
+
+    async def collect(question):
+        return ''.join([t async for t in module.astream_rag_response(question, LLM(), Prompt(AsyncChain(str)), store, cache)])
+
+    async def main():
+        answers = await asyncio.gather(*(collect(f'e{i}') for i in range(50)))
+        cached = await collect('e0')
+        return answers, cached
+
+    answers, cached = asyncio.run(main())
+    assert answers == ['abc'] * 50
+    assert cached == 'abc'
+    # Todas as consultas aguardaram o embedding ao mesmo tempo em um único loop
+    assert embeddings.peak > 1
+    assert LLM.streams == 50
+    assert cache.stats()['hits'] >= 1
@@ -0,0 +1,56 @@
+import importlib
+
+
+def results(**metrics):
+    return {'metrics': {name: {'value': value, 'unit': 'ms' if better == 'lower' else 'chunks/s', 'better': better}
+                        for name, (value, better) in metrics.items()}}
+
+
+def test_compare_flags_only_regressions_beyond_threshold(tmp_path):
+    compare = importlib.import_module('benchmarks.compare')
+    baseline = results(
+        p95=(10.0, 'lower'),
+        build=(2.0, 'lower'),
+        throughput=(1000.0, 'higher'),
+        only_baseline=(1.0, 'lower'),
+    )
+    current = results(
+        p95=(11.0, 'lower'),          # +10%: dentro da tolerância
+        build=(3.0, 'lower'),         # +50%: regressão
+        throughput=(700.0, 'higher'), # -30%: regressão
+        new_metric=(5.0, 'lower'),    # sem baseline: ignorada
+    )
+    path = str(tmp_path / 'baseline.json')
+    compare.save_results(baseline, path)
+
+    comparisons = compare.compare(current, compare.load_results(path), threshold=0.2)
+    assert sorted(c.name for c in comparisons) == ['build', 'p95', 'throughput']
+    assert sorted(c.name for c in comparisons if c.regressed) == ['build', 'throughput']
+    assert 'REGRESSÃO' in compare.format_report(comparisons)
+    assert not any(c.regressed for c in compare.compare(current, baseline, threshold=0.6))
+
+
+def test_startup_report_parses_importtime_and_flags_heavy_imports(monkeypatch):
+    startup = importlib.import_module('benchmarks.startup')
+    stderr = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       100 |        100 | encodings',
+        'import time:       300 |        300 |     langgraph.graph',
+        'import time:       200 |        500 |   langgraph',
+        'import time:        50 |        550 | rag_chatbot.src.rag_pipeline',
+    ])
+    records = startup.parse_importtime(stderr)
+    assert [(r.name, r.depth) for r in records] == [
+        ('encodings', 0), ('langgraph.graph', 2), ('langgraph', 1), ('rag_chatbot.src.rag_pipeline', 0),
+    ]
+    assert startup.import_ms(records, 'rag_chatbot.src.rag_pipeline') == 0.55
+    assert startup.by_package(records)[0] == ('langgraph', 0.5)
+    assert startup.forbidden_imports(records, ['langgraph', 'streamlit']) == ['langgraph']
+
+    # Limite padrão compartilhado com compare() e opções da máquina fora do config gravado
+    compare = importlib.import_module('benchmarks.compare')
+    monkeypatch.delenv('BENCH_REGRESSION_THRESHOLD', raising=False)
+    args = startup.parse_args(['--update-baseline', '--python', '/opt/python'])
+    assert args.threshold == compare.DEFAULT_THRESHOLD
+    config = compare.recorded_config(args)
+    assert 'python' not in config and 'update_baseline' not in config and config['repeat'] == 5
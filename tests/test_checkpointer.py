@@ -0,0 +1,118 @@
+import json
+import asyncio
+import importlib
+import itertools
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+
+def make_llm(prompts):
+    msgs = importlib.import_module('langchain_core.messages')
+
+    def bind_tools(tools):
+        def invoke(messages):
+            prompts.append([m.content for m in messages])
+            return msgs.AIMessage(content='', additional_kwargs={'tool_calls': [{'id': '1', 'name': 'retrieve', 'args': {}}]})
+        return SimpleNamespace(invoke=invoke)
+
+    return SimpleNamespace(bind_tools=bind_tools, invoke=lambda messages: f'resposta {len(prompts)}')
+
+
+def test_thread_resumes_after_restart(tmp_path):
+    graph_module = importlib.import_module('rag_chatbot.src.conversational_graph')
+    checkpointer_module = importlib.import_module('rag_chatbot.src.checkpointer')
+    msgs = importlib.import_module('langchain_core.messages')
+    path = str(tmp_path / 'checkpoints.sqlite')
+    config = {'configurable': {'thread_id': 't1'}}
+    prompts = []
+
+    first = checkpointer_module.SQLiteCheckpointer(path)
+    app = graph_module.create_conversational_graph(make_llm(prompts), checkpointer=first)
+    app.invoke({'messages': [msgs.HumanMessage(content='oi')]}, config)
+    first.close()
+
+    # Outro processo/worker: só a mensagem nova é enviada
+    second = checkpointer_module.SQLiteCheckpointer(path)
+    app = graph_module.create_conversational_graph(make_llm(prompts), checkpointer=second)
+    state = app.invoke({'messages': [msgs.HumanMessage(content='e depois?')]}, config)
+    assert prompts[-1] == ['oi', 'resposta 1', 'e depois?']
+    assert [m.content for m in state['messages'] if m.type in ('human', 'ai') and m.content] == ['oi', 'resposta 1', 'e depois?', 'resposta 2']
+    assert second.get({'configurable': {'thread_id': 'outra'}}) is None
+    # keep_last=2: os checkpoints intermediários de cada passo são descartados
+    assert len(list(second.list(config))) == 2
+    second.close()
+
+
+def checkpoint(n, **values):
+    return {'v': 1, 'id': f'{n:032d}', 'channel_values': values}
+
+
+def test_compact_artifacts_writes_keep_last_and_prune(tmp_path):
+    checkpointer_module = importlib.import_module('rag_chatbot.src.checkpointer')
+    msgs = importlib.import_module('langchain_core.messages')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [Document(page_content='texto longo ' * 500, metadata={'source': 'a', 'start_index': i * 1000}) for i in range(4)]
+    text = '\n\n'.join(d.page_content for d in docs)
+    answered = msgs.ToolMessage(content=text, tool_call_id='vs_query', artifact=docs)
+    pending = msgs.ToolMessage(content=text, tool_call_id='vs_query_2', artifact=docs[:1])
+    messages = [msgs.HumanMessage(content='oi'), answered, msgs.AIMessage(content='resposta'), pending]
+
+    path = str(tmp_path / 'checkpoints.sqlite')
+    saver = checkpointer_module.SQLiteCheckpointer(path, keep_last=2)
+    config = {'configurable': {'thread_id': 't1', 'checkpoint_ns': ''}}
+    saved = saver.put(config, checkpoint(1, messages=messages[:3], summary=''), {'step': 1}, {})
+    with sqlite3.connect(path) as conn:
+        assert len(conn.execute('SELECT checkpoint FROM checkpoints').fetchone()[0]) < 500
+    restored = saver.get_tuple(config).checkpoint['channel_values']['messages'][1]
+    assert restored.tool_call_id == 'vs_query' and restored.artifact is None
+    assert json.loads(restored.content)[1] == {'source': 'a', 'start_index': 1000}
+    assert answered.artifact is docs  # o estado em memória não é alterado
+
+    # A última mensagem de tool ainda não foi respondida: fica inteira para o generate
+    saver.put(saved, checkpoint(2, messages=messages), {'step': 2}, {})
+    tail = asyncio.run(saver.aget_tuple(config)).checkpoint['channel_values']['messages'][-1]
+    assert tail.content == text and tail.artifact[0].page_content == docs[0].page_content
+
+    saver.put_writes({'configurable': {**config['configurable'], 'checkpoint_id': f'{2:032d}'}}, [('messages', 'x')], 'task')
+    assert saver.get_tuple(config).pending_writes == [('task', 'messages', 'x')]
+    saver.put(config, checkpoint(3, messages=[]), {'step': 3}, {})
+    saver.put(config, checkpoint(4, messages=[]), {'step': 4}, {})
+    assert [t.checkpoint['id'] for t in saver.list(config)] == [f'{4:032d}', f'{3:032d}']
+    saver.put({'configurable': {'thread_id': 't2'}}, checkpoint(5), {}, {})
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM writes').fetchone()[0] == 0
+
+    assert saver.prune(max_age_seconds=3600) == 0
+    assert saver.prune(max_age_seconds=-1) == 2
+    assert saver.thread_count() == 0 and saver.get_tuple(config) is None
+    saver.close()
+
+
+def test_two_connections_writing_the_same_thread(tmp_path):
+    checkpointer_module = importlib.import_module('rag_chatbot.src.checkpointer')
+    path = str(tmp_path / 'checkpoints.sqlite')
+    workers = [checkpointer_module.SQLiteCheckpointer(path, keep_last=3) for _ in range(2)]
+    config = {'configurable': {'thread_id': 't1', 'checkpoint_ns': ''}}
+    ids = itertools.count(1)
+    errors = []
+
+    def write(checkpointer):
+        try:
+            for _ in range(200):
+                checkpointer.put(config, checkpoint(next(ids)), {}, {})
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with sqlite3.connect(path) as conn:
+        kept = [row[0] for row in conn.execute("SELECT checkpoint_id FROM checkpoints WHERE thread_id = 't1' ORDER BY checkpoint_id")]
+    assert kept == [f'{n:032d}' for n in (398, 399, 400)]
+    for w in workers:
+        w.close()
@@ -0,0 +1,21 @@
+import sys
+import importlib
+
+
+def test_load_config_reads_env_file_once(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.config')
+    calls = []
+    monkeypatch.setattr(sys.modules['dotenv'], 'load_dotenv', lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(module, '_loaded', False)
+
+    assert module.load_config() is True
+    assert module.load_config() is False
+    assert calls == [{'dotenv_path': module.ENV_PATH}]
+    assert module.ENV_PATH.endswith('rag_chatbot/.env')
+
+
+def test_prompt_template_is_bundled():
+    module = importlib.import_module('rag_chatbot.src.prompt_template')
+    assert not hasattr(module, 'hub')
+    assert '{context}' in module.RAG_PROMPT_TEMPLATE and '{question}' in module.RAG_PROMPT_TEMPLATE
+    assert module.get_rag_prompt_template() is not None
@@ -0,0 +1,45 @@
+import importlib
+
+
+def make_doc(text, source='a', start=None):
+    Document = importlib.import_module('langchain_core.documents').Document
+    metadata = {'source': source}
+    if start is not None:
+        metadata['start_index'] = start
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_merges_overlapping_chunks_from_same_source():
+    module = importlib.import_module('rag_chatbot.src.context_builder')
+    text = 'abcdefghijklmnopqrstuvwxyz'
+    docs = [
+        make_doc(text[10:20], start=10),   # mais relevante
+        make_doc(text[0:14], start=0),     # sobrepõe 4 caracteres
+        make_doc('outra fonte', source='b', start=0),
+        make_doc(text[24:26], start=24),   # não encosta no intervalo anterior
+    ]
+    merged = module.merge_overlapping(docs)
+    assert [d.page_content for d in merged] == [text[0:20], 'outra fonte', text[24:26]]
+    assert merged[0].metadata['start_index'] == 0
+
+
+def test_drops_near_duplicates_and_respects_budget():
+    module = importlib.import_module('rag_chatbot.src.context_builder')
+    base = 'decomposição de tarefas divide um problema grande em passos menores e independentes'
+    docs = [
+        make_doc(base, source='x'),
+        make_doc(base + '.', source='y'),
+        make_doc('reflexão permite ao agente corrigir erros passados', source='z'),
+        make_doc('memória de longo prazo usa um banco vetorial externo ' * 10, source='w'),
+    ]
+    assert len(module.drop_near_duplicates(docs)) == 3
+
+    budget = module.estimate_tokens(base) + module.estimate_tokens(docs[2].page_content) + 1
+    packed = module.pack_documents(docs, token_budget=budget)
+    assert [d.metadata['source'] for d in packed] == ['x', 'z']
+    context = module.build_context(docs, token_budget=budget)
+    assert module.estimate_tokens(context) <= budget
+
+    # Nem o primeiro cabe: ele é truncado em vez de gerar contexto vazio
+    tiny = module.build_context(docs, token_budget=5)
+    assert tiny and module.estimate_tokens(tiny) <= 5
@@ -0,0 +1,93 @@
+import importlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+PAGES = {
+    '/a': ('<p>page a</p>', '"etag-a"'),
+    '/b': ('<p>page b</p>', '"etag-b"'),
+    '/c': ('<p>page c</p>', '"etag-c"'),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        Handler.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/sitemap.xml':
+            body = (
+                '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                + ''.join(f'<url><loc>http://{self.headers["Host"]}{p}</loc></url>' for p in PAGES)
+                + '</urlset>'
+            ).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path not in PAGES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        html, etag = PAGES[self.path]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = html.encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Handler.requests_seen = []
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_concurrent_loader_conditional_get(server, tmp_path, monkeypatch):
+    loader_module = importlib.import_module('rag_chatbot.src.document_loader')
+    Document = importlib.import_module('langchain_core.documents').Document
+    parsed = []
+
+    def fake_parse(html, url):
+        parsed.append(url)
+        return Document(page_content=html, metadata={'source': url})
+
+    monkeypatch.setattr(loader_module, 'parse_html', fake_parse)
+    urls = [f'{server}/a', f'{server}/b', f'{server}/missing', f'{server}/c']
+
+    docs = loader_module.load_documents(urls, cache_dir=str(tmp_path), max_per_host=2)
+    assert [d.page_content for d in docs] == ['<p>page a</p>', '<p>page b</p>', '<p>page c</p>']
+    assert len(parsed) == 3
+
+    # Segunda execução: páginas inalteradas voltam como 304 e não são reprocessadas
+    parsed.clear()
+    docs = loader_module.load_documents(urls, cache_dir=str(tmp_path))
+    assert [d.page_content for d in docs] == ['<p>page a</p>', '<p>page b</p>', '<p>page c</p>']
+    assert parsed == []
+    assert ('/a', '"etag-a"') in Handler.requests_seen
+
+
+def test_load_documents_from_sitemap(server, monkeypatch):
+    loader_module = importlib.import_module('rag_chatbot.src.document_loader')
+    Document = importlib.import_module('langchain_core.documents').Document
+    monkeypatch.setattr(loader_module, 'parse_html', lambda html, url: Document(page_content=html, metadata={'source': url}))
+
+    docs = loader_module.load_documents(sitemap_url=f'{server}/sitemap.xml')
+    assert [d.metadata['source'] for d in docs] == [f'{server}{p}' for p in PAGES]
@@ -0,0 +1,87 @@
+import importlib
+
+
+class VectorEmbeddings:
+    """Embeddings determinísticos: cada texto mapeia para um vetor fixo."""
+
+    VECTORS = {
+        'x': [1.0, 0.0, 0.0],
+        'y': [0.0, 1.0, 0.0],
+        'z': [0.0, 0.0, 1.0],
+        'xy': [1.0, 1.0, 0.0],
+    }
+
+    def embed_documents(self, texts):
+        return [self.VECTORS[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.VECTORS[text]
+
+
+def make_index():
+    flat_index = importlib.import_module('rag_chatbot.src.flat_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [
+        Document(page_content='x', metadata={'section': 'beginning'}),
+        Document(page_content='y', metadata={'section': 'middle'}),
+        Document(page_content='z', metadata={'section': 'end'}),
+        Document(page_content='xy', metadata={'section': 'middle'}),
+    ]
+    return flat_index.FlatVectorIndex.from_documents(docs, VectorEmbeddings(), ids=['a', 'b', 'c', 'd'])
+
+
+def test_flat_index_top_k_and_filter():
+    index = make_index()
+    assert [d.page_content for d in index.similarity_search('x', k=2)] == ['x', 'xy']
+    assert [d.page_content for d in index.similarity_search('x', k=2, filter={'section': 'middle'})] == ['xy', 'y']
+
+    retriever = index.as_retriever(search_kwargs={'k': 1, 'filter': {'section': 'end'}})
+    assert [d.page_content for d in retriever.invoke('x')] == ['z']
+
+
+def test_flat_index_batch_and_delete():
+    index = make_index()
+    results = index.batch_similarity_search(['y', 'z'], k=1)
+    assert [[d.page_content for d in r] for r in results] == [['y'], ['z']]
+
+    index.delete(ids=['d', 'a'])
+    assert len(index) == 2
+    assert index.matrix.flags['C_CONTIGUOUS']
+    assert [d.page_content for d in index.similarity_search('xy', k=5)] == ['y', 'z']
+
+
+def test_create_vector_store_flat_backend():
+    vector_module = importlib.import_module('rag_chatbot.src.vector_store')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [Document(page_content='content', metadata={'section': 'end'})]
+    store = vector_module.create_vector_store(docs, backend='flat', partition_by=None)
+    assert isinstance(store, vector_module.FlatVectorIndex)
+    assert len(store) == 1
+
+    store = vector_module.create_vector_store(docs, backend='flat')
+    assert isinstance(store, vector_module.PartitionedVectorIndex)
+    assert list(store.partitions) == ['end']
+
+
+def test_partitioned_index_prunes_and_falls_back():
+    flat_index = importlib.import_module('rag_chatbot.src.flat_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [
+        Document(page_content='x', metadata={'section': 'beginning'}),
+        Document(page_content='y', metadata={'section': 'middle'}),
+        Document(page_content='z', metadata={'section': 'end'}),
+        Document(page_content='xy', metadata={'section': 'middle'}),
+    ]
+    index = flat_index.PartitionedVectorIndex.from_documents(docs, VectorEmbeddings(), ids=['a', 'b', 'c', 'd'])
+    assert sorted(index.partitions) == ['beginning', 'end', 'middle']
+
+    # A partição "middle" tem dois documentos: nada de fallback
+    assert [d.page_content for d in index.similarity_search('x', k=2, filter={'section': 'middle'})] == ['xy', 'y']
+    # A partição "beginning" só tem um: as demais completam o resultado
+    assert [d.page_content for d in index.similarity_search('y', k=2, filter={'section': 'beginning'})] == ['x', 'y']
+    # Sem filtro, todas as partições são combinadas por pontuação
+    assert [d.page_content for d in index.similarity_search('x', k=2)] == ['x', 'xy']
+
+    index.delete(ids=['d'])
+    assert len(index) == 3
+    assert [d.page_content for d in index.similarity_search('x', k=1, filter={'section': 'middle'})] == ['y']
@@ -24,5 +24,6 @@ def test_create_vector_store():
     Document = importlib.import_module('langchain_core.documents').Document
     docs = [Document(page_content='content')]
     store = vector_module.create_vector_store(docs)
-    assert isinstance(store, vector_module.Chroma)
+    Chroma = importlib.import_module('langchain_community.vectorstores').Chroma
+    assert isinstance(store, Chroma)
     assert store.documents == docs
@@ -0,0 +1,90 @@
+import importlib
+import threading
+
+import pytest
+
+
+class FakeStore:
+    def __init__(self):
+        self.docs = {}
+        self.added = []
+
+    def add_documents(self, documents, ids=None):
+        self.added.extend(ids)
+        self.docs.update(zip(ids, documents))
+
+    def delete(self, ids=None):
+        for i in ids:
+            self.docs.pop(i, None)
+
+
+def test_sync_vector_store_is_incremental(tmp_path):
+    indexing = importlib.import_module('rag_chatbot.src.indexing')
+    Document = importlib.import_module('langchain_core.documents').Document
+    manifest = str(tmp_path / 'manifest.json')
+
+    def chunk(start, text):
+        return Document(page_content=text, metadata={'source': 'u', 'start_index': start})
+
+    store = FakeStore()
+    result = indexing.sync_vector_store(store, [chunk(0, 'a'), chunk(10, 'b'), chunk(20, 'c')], manifest)
+    assert (result.added, result.updated, result.deleted) == (3, 0, 0)
+
+    store.added.clear()
+    result = indexing.sync_vector_store(store, [chunk(0, 'a'), chunk(10, 'B')], manifest)
+    assert (result.added, result.updated, result.deleted, result.unchanged) == (0, 1, 1, 1)
+    assert len(store.added) == 1
+    assert sorted(d.page_content for d in store.docs.values()) == ['B', 'a']
+
+    result = indexing.sync_vector_store(store, [chunk(0, 'a'), chunk(10, 'B')], manifest)
+    assert not result.changed
+
+
+def test_chunks_without_start_index_keep_distinct_ids(tmp_path):
+    indexing = importlib.import_module('rag_chatbot.src.indexing')
+    Document = importlib.import_module('langchain_core.documents').Document
+    manifest = str(tmp_path / 'manifest.json')
+    chunks = [Document(page_content=text, metadata={'source': 'u'}) for text in ('a', 'b', 'c')]
+
+    assert len({indexing.chunk_id(c) for c in chunks}) == 3
+    # Com start_index, o id não depende do texto (a edição vira uma atualização)
+    edited = Document(page_content='novo', metadata={'source': 'u', 'start_index': 0})
+    assert indexing.chunk_id(edited) == indexing.chunk_id(Document(page_content='a', metadata={'source': 'u', 'start_index': 0}))
+
+    store = FakeStore()
+    result = indexing.sync_vector_store(store, chunks, manifest)
+    assert result.added == 3
+    assert sorted(d.page_content for d in store.docs.values()) == ['a', 'b', 'c']
+
+
+def test_manifest_is_written_only_after_the_index_is_persisted(tmp_path):
+    indexing = importlib.import_module('rag_chatbot.src.indexing')
+    Document = importlib.import_module('langchain_core.documents').Document
+    manifest = str(tmp_path / 'manifest.json')
+    chunks = [Document(page_content=text, metadata={'source': 'u', 'start_index': i}) for i, text in enumerate('ab')]
+
+    def crash():
+        raise OSError('disco cheio')
+
+    store = FakeStore()
+    with pytest.raises(OSError):
+        indexing.sync_vector_store(store, chunks, manifest, persist=crash)
+    # Sem manifesto, a próxima sincronização reinsere os chunks que não foram salvos
+    assert indexing.load_manifest(manifest) == {}
+    saved = []
+    result = indexing.sync_vector_store(FakeStore(), chunks, manifest, persist=lambda: saved.append(True))
+    assert result.added == 2 and saved == [True]
+    assert len(indexing.load_manifest(manifest)) == 2
+
+
+def test_concurrent_manifest_saves_do_not_share_a_temp_file(tmp_path):
+    indexing = importlib.import_module('rag_chatbot.src.indexing')
+    path = str(tmp_path / 'manifest.json')
+    manifests = [{f'id-{i}': {'hash': str(j)} for j in range(200)} for i in range(8)]
+    threads = [threading.Thread(target=indexing.save_manifest, args=(path, m)) for m in manifests]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert indexing.load_manifest(path) in manifests
+    assert [p.name for p in tmp_path.iterdir()] == ['manifest.json']
@@ -0,0 +1,106 @@
+import importlib
+import time
+
+import pytest
+
+
+class RecordingStore:
+    def __init__(self, delay=0.0):
+        self.embedding = self
+        self.delay = delay
+        self.rows = []
+
+    def embed_documents(self, texts):
+        return [[float(len(t))] for t in texts]
+
+    def add_embeddings(self, documents, embeddings, ids=None):
+        time.sleep(self.delay)
+        self.rows.extend(zip(ids, documents, embeddings))
+
+
+def make_docs(n, progress):
+    Document = importlib.import_module('langchain_core.documents').Document
+    for i in range(n):
+        progress['loaded'] += 1
+        yield Document(page_content=f'doc {i}', metadata={'source': f'u{i}', 'start_index': 0})
+
+
+def test_ingest_streams_in_bounded_batches():
+    ingest = importlib.import_module('rag_chatbot.src.ingest')
+    progress = {'loaded': 0, 'max_ahead': 0}
+    store = RecordingStore(delay=0.001)
+    original = store.add_embeddings
+
+    def tracking_add(documents, embeddings, ids=None):
+        progress['max_ahead'] = max(progress['max_ahead'], progress['loaded'] - len(store.rows))
+        original(documents, embeddings, ids=ids)
+
+    store.add_embeddings = tracking_add
+    stats = ingest.ingest_documents(make_docs(300, progress), store, batch_size=4, queue_size=2)
+
+    assert [doc.page_content for _, doc, _ in store.rows] == [f'doc {i}' for i in range(300)]
+    assert stats.load.items == stats.split.items == stats.embed.items == stats.upsert.items == 300
+    # Back-pressure: o carregamento nunca se adianta muito em relação ao upsert
+    assert progress['max_ahead'] <= 40
+
+
+def test_ingest_propagates_stage_errors():
+    ingest = importlib.import_module('rag_chatbot.src.ingest')
+
+    def failing_docs():
+        Document = importlib.import_module('langchain_core.documents').Document
+        yield Document(page_content='ok', metadata={'source': 'a'})
+        raise RuntimeError('boom')
+
+    store = RecordingStore()
+    with pytest.raises(RuntimeError, match='boom'):
+        ingest.ingest_documents(failing_docs(), store, batch_size=1)
+
+
+def test_build_vector_store_streams_into_the_persisted_collection(monkeypatch, tmp_path):
+    pipeline = importlib.import_module('rag_chatbot.src.rag_pipeline')
+    vector_store = importlib.import_module('rag_chatbot.src.vector_store')
+    opened = []
+
+    def chroma(**kwargs):
+        opened.append(kwargs)
+        return RecordingStore()
+
+    monkeypatch.setenv('CHROMA_PERSIST_DIR', str(tmp_path))
+    monkeypatch.setattr(vector_store, '_chroma', lambda: chroma)
+    monkeypatch.setattr(pipeline, 'iter_documents', lambda: make_docs(5, {'loaded': 0}))
+
+    store, stats = pipeline.build_vector_store()
+    assert opened[0]['persist_directory'] == str(tmp_path)
+    assert stats.upsert.items == 5 and len(store.rows) == 5
+    assert stats.sync.added == 5 and (tmp_path / 'index_manifest.json').exists()
+
+
+def test_streaming_ingest_into_persisted_ivf_is_incremental(tmp_path):
+    vector_store = importlib.import_module('rag_chatbot.src.vector_store')
+    fakes = importlib.import_module('rag_chatbot.src.fakes')
+    Document = importlib.import_module('langchain_core.documents').Document
+
+    def docs(texts):
+        return (Document(page_content=text, metadata={'source': 'u', 'start_index': i}) for i, text in enumerate(texts))
+
+    def ingest(texts):
+        model = fakes.FakeEmbeddings(dim=8)
+        store, stats = vector_store.ingest_vector_store(
+            docs(texts), backend='ivf', persist_directory=str(tmp_path), model=model, micro_batch_ms=0,
+        )
+        return store, stats, model
+
+    store, stats, model = ingest([f'chunk {i}' for i in range(10)])
+    assert (stats.sync.added, model.texts, len(store)) == (10, 10, 10)
+
+    # Reabre o índice salvo: só o chunk alterado é embedado, os que sumiram saem do índice
+    texts = [f'chunk {i}' for i in range(7)]
+    texts[3] = 'chunk 3 editado'
+    store, stats, model = ingest(texts)
+    assert (stats.sync.added, stats.sync.updated, stats.sync.deleted, stats.sync.unchanged) == (0, 1, 3, 6)
+    assert model.texts == 1 and len(store) == 7
+    assert sorted(doc.page_content for doc in store.documents) == sorted(texts)
+
+    store, stats, model = ingest(texts)
+    assert not stats.sync.changed and model.texts == 0 and len(store) == 7
@@ -0,0 +1,113 @@
+import importlib
+import numpy as np
+
+
+def make_data(n=2000, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    data = centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, dim))
+    queries = centers[rng.integers(0, 20, 50)] + 0.3 * rng.normal(size=(50, dim))
+    return data, queries
+
+
+def build_index(data, **kwargs):
+    ivf_module = importlib.import_module('rag_chatbot.src.ivf_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    index = ivf_module.IVFVectorIndex(embedding=None, **kwargs)
+    index.add_embeddings([Document(page_content=str(i), metadata={}) for i in range(len(data))], data)
+    return ivf_module, index
+
+
+def test_ivf_recall_knob():
+    data, queries = make_data()
+    ivf_module, index = build_index(data, n_lists=32, min_train_size=500)
+    assert index.is_trained
+
+    index.nprobe = 32
+    assert ivf_module.recall_at_k(index, queries, k=5) == 1.0
+
+    index.nprobe = 1
+    low = ivf_module.recall_at_k(index, queries, k=5)
+    index.nprobe = 8
+    high = ivf_module.recall_at_k(index, queries, k=5)
+    assert 0 < low <= high <= 1.0
+
+
+def test_ivf_incremental_insert_delete_and_persist(tmp_path):
+    data, _ = make_data()
+    ivf_module, index = build_index(data, n_lists=16, min_train_size=500)
+    Document = importlib.import_module('langchain_core.documents').Document
+
+    new_vector = np.zeros(data.shape[1])
+    new_vector[0] = 100.0
+    index.add_embeddings([Document(page_content='new', metadata={'section': 'end'})], [new_vector], ids=['new'])
+    assert index.search_by_vectors([new_vector], k=1)[0][0][0].page_content == 'new'
+
+    index.save(str(tmp_path / 'ivf'))
+    loaded = ivf_module.IVFVectorIndex.load(str(tmp_path / 'ivf'), embedding=None)
+    assert len(loaded) == len(index)
+    assert loaded.is_trained and loaded.n_lists == 16
+    hit = loaded.search_by_vectors([new_vector], k=1, filter={'section': 'end'})[0][0][0]
+    assert hit.page_content == 'new'
+
+    loaded.delete(ids=['new'])
+    assert len(loaded) == len(data)
+    assert loaded.search_by_vectors([new_vector], k=1)[0][0][0].page_content != 'new'
+
+
+def test_create_vector_store_ivf_persists_incrementally(tmp_path):
+    vector_module = importlib.import_module('rag_chatbot.src.vector_store')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [Document(page_content=f'chunk {i}', metadata={'source': 'u', 'start_index': i}) for i in range(5)]
+
+    store = vector_module.create_vector_store(docs, backend='ivf', persist_directory=str(tmp_path), index_kwargs={'nprobe': 2})
+    assert isinstance(store, vector_module.IVFVectorIndex)
+    assert len(store) == 5
+
+    reloaded = vector_module.create_vector_store(docs[:3], backend='ivf', persist_directory=str(tmp_path))
+    assert len(reloaded) == 3
+    assert reloaded.nprobe == 2
+
+
+def test_ivf_retrains_as_batched_ingest_grows():
+    data, queries = make_data(n=6000)
+    ivf_module = importlib.import_module('rag_chatbot.src.ivf_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    index = ivf_module.IVFVectorIndex(embedding=None, min_train_size=500)
+    for start in range(0, len(data), 64):
+        batch = data[start:start + 64]
+        index.add_embeddings([Document(page_content=str(start + i), metadata={}) for i in range(len(batch))], batch)
+
+    # Treinou em 512 linhas (22 listas) e retreinou ao passar de 4x esse tamanho
+    assert index.trained_size >= 4 * 512
+    assert index.n_lists == int(np.sqrt(index.trained_size)) > 22
+    assert sum(len(rows) for rows in index._lists) == len(index)
+    index.nprobe = index.n_lists
+    assert ivf_module.recall_at_k(index, queries, k=5) == 1.0
+
+
+def test_ivf_filtered_search_falls_back_to_exact_when_probes_are_short():
+    data, queries = make_data()
+    ivf_module = importlib.import_module('rag_chatbot.src.ivf_index')
+    flat_module = importlib.import_module('rag_chatbot.src.flat_index')
+    Document = importlib.import_module('langchain_core.documents').Document
+    # Seção rara: 10 linhas espalhadas entre as listas
+    sections = ['end' if i % 200 == 0 else 'middle' for i in range(len(data))]
+    docs = [Document(page_content=str(i), metadata={'section': s}) for i, s in enumerate(sections)]
+    index = ivf_module.IVFVectorIndex(embedding=None, n_lists=32, nprobe=1, min_train_size=500)
+    index.add_embeddings(docs, data)
+
+    def contents(results):
+        return [[doc.page_content for doc, _ in hits] for hits in results]
+
+    approx = index.search_by_vectors(queries, k=5, filter={'section': 'end'})
+    exact = flat_module.FlatVectorIndex.search_by_vectors(index, queries, k=5, filter={'section': 'end'})
+    assert all(len(hits) == 5 for hits in approx)
+    assert contents(approx) == contents(exact)
+    assert index.search_by_vectors(queries[:1], k=5, filter={'section': 'nenhuma'}) == [[]]
+
+    # As colunas de códigos acompanham inserções e remoções
+    index.add_embeddings([Document(page_content='novo', metadata={'section': 'novo'})], data[:1], ids=['novo'])
+    assert contents(index.search_by_vectors(data[:1], k=5, filter={'section': 'novo'})) == [['novo']]
+    index.delete(ids=['novo'])
+    assert index.search_by_vectors(data[:1], k=5, filter={'section': 'novo'}) == [[]]
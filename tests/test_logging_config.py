@@ -0,0 +1,72 @@
+import json
+import queue
+import logging
+import importlib
+from logging.handlers import QueueListener
+
+
+def test_queue_handler_formats_lazily_with_request_id_and_sampling():
+    module = importlib.import_module('rag_chatbot.src.logging_config')
+
+    class Expensive:
+        renders = 0
+
+        def __str__(self):
+            Expensive.renders += 1
+            return 'consulta'
+
+    records = queue.SimpleQueue()
+    handler = module.LazyQueueHandler(records)
+    handler.addFilter(module.RequestIdFilter())
+    handler.addFilter(module.DebugSamplingFilter(0.0))
+    logger = logging.getLogger('test.lazy_logging')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    try:
+        with module.request_context('req-1'):
+            logger.info('Consulta analisada: %s', Expensive(), extra={'stage': 'analyze'})
+            logger.debug('evento de alto volume %s', Expensive())  # descartado pela amostragem
+        logger.info('fora da requisição')
+    finally:
+        logger.removeHandler(handler)
+
+    # Nada foi formatado na thread que registrou
+    assert Expensive.renders == 0
+    first, second = records.get_nowait(), records.get_nowait()
+    assert records.empty()
+
+    formatter = module.JsonFormatter()
+    payload = json.loads(formatter.format(first))
+    assert payload['msg'] == 'Consulta analisada: consulta'
+    assert payload['request_id'] == 'req-1'
+    assert payload['stage'] == 'analyze'
+    assert payload['level'] == 'INFO'
+    assert json.loads(formatter.format(second))['request_id'] == '-'
+    assert Expensive.renders == 1
+
+
+def test_queue_listener_writes_json_lines(tmp_path):
+    module = importlib.import_module('rag_chatbot.src.logging_config')
+    path = tmp_path / 'log.jsonl'
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    file_handler.setFormatter(module.JsonFormatter())
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, file_handler)
+    listener.start()
+    handler = module.LazyQueueHandler(records)
+    handler.addFilter(module.RequestIdFilter())
+    logger = logging.getLogger('test.json_listener')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        with module.request_context() as request_id:
+            logger.warning('falha em %d de %d', 1, 3)
+    finally:
+        logger.removeHandler(handler)
+        listener.stop()
+        file_handler.close()
+
+    line = json.loads(path.read_text(encoding='utf-8'))
+    assert line['msg'] == 'falha em 1 de 3'
+    assert line['request_id'] == request_id and len(request_id) == 16
@@ -0,0 +1,83 @@
+import importlib
+from types import SimpleNamespace
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompt_tokens = []
+        self.summary_calls = 0
+
+    def invoke(self, messages):
+        if messages[0].content.startswith('Você mantém o resumo'):
+            self.summary_calls += 1
+            return f'resumo #{self.summary_calls}: ' + 'fato ' * 40
+        estimate = importlib.import_module('rag_chatbot.src.context_builder').estimate_tokens
+        self.prompt_tokens.append(sum(estimate(str(m.content)) for m in messages))
+        return 'resposta ' * 20
+
+
+def test_prompt_size_stays_flat_over_long_conversation():
+    chat_nodes = importlib.import_module('rag_chatbot.src.chat_nodes')
+    memory_module = importlib.import_module('rag_chatbot.src.memory')
+    msgs = importlib.import_module('langchain_core.messages')
+    llm = FakeLLM()
+    memory = memory_module.ConversationMemory(llm, max_turns=6, token_budget=800)
+
+    state = {'messages': [], 'summary': '', 'summarized_turns': 0}
+    for turn in range(100):
+        state['messages'].append(msgs.HumanMessage(content=f'pergunta {turn} ' + 'sobre agentes ' * 10))
+        update = chat_nodes.generate(state, llm, memory=memory)
+        state['messages'] = state['messages'] + update['messages']
+        state['summary'] = update['summary']
+        state['summarized_turns'] = update['summarized_turns']
+
+    assert len(memory_module.split_turns(state['messages'])) == 100
+    assert state['summary'].startswith('resumo #')
+    # O resumo é atualizado a cada poucos turnos, não a cada pergunta
+    assert 10 <= llm.summary_calls <= 40
+    # Tamanho do prompt limitado: os últimos turnos não custam mais que os do início
+    assert max(llm.prompt_tokens[50:]) <= max(llm.prompt_tokens[:15])
+    assert max(llm.prompt_tokens) < 800 + 400
+
+
+def test_summary_advances_when_no_tool_is_called():
+    chat_nodes = importlib.import_module('rag_chatbot.src.chat_nodes')
+    memory_module = importlib.import_module('rag_chatbot.src.memory')
+    msgs = importlib.import_module('langchain_core.messages')
+    llm = FakeLLM()
+    # Responde direto, sem tool call: o grafo vai de query_or_respond para END
+    llm.bind_tools = lambda tools: SimpleNamespace(invoke=lambda messages: msgs.AIMessage(content=llm.invoke(messages)))
+    memory = memory_module.ConversationMemory(llm, max_turns=6, token_budget=800)
+
+    state = {'messages': [], 'summary': '', 'summarized_turns': 0}
+    for turn in range(100):
+        state['messages'].append(msgs.HumanMessage(content=f'pergunta {turn} ' + 'sobre agentes ' * 10))
+        update = chat_nodes.query_or_respond(state, llm, memory)
+        state['messages'] = state['messages'] + update['messages']
+        state['summary'] = update['summary']
+        state['summarized_turns'] = update['summarized_turns']
+
+    assert len(memory_module.split_turns(state['messages'])) == 100
+    assert state['summary'].startswith('resumo #') and state['summarized_turns'] > 80
+    assert 10 <= llm.summary_calls <= 40
+    assert max(llm.prompt_tokens[50:]) <= max(llm.prompt_tokens[:15])
+    assert max(llm.prompt_tokens) < 800 + 400
+
+
+def test_window_skips_tool_messages_and_keeps_recent_turns():
+    memory_module = importlib.import_module('rag_chatbot.src.memory')
+    msgs = importlib.import_module('langchain_core.messages')
+    history = []
+    for i in range(5):
+        history += [
+            msgs.HumanMessage(content=f'q{i}'),
+            msgs.AIMessage(content='', additional_kwargs={'tool_calls': [{'id': '1'}]}),
+            msgs.ToolMessage(content='docs', tool_call_id='1'),
+            msgs.AIMessage(content=f'a{i}'),
+        ]
+
+    memory = memory_module.ConversationMemory(max_turns=3)  # sem LLM: turnos antigos descartados
+    window = memory.prepare(history)
+    assert window.summarized_turns == 4
+    assert [m.content for m in window.messages] == ['q4', 'a4']
+    assert [m.content for m in memory.window(history, 'resumo', 3)] == ['Resumo da conversa até aqui:\nresumo', 'q3', 'a3', 'q4', 'a4']
@@ -0,0 +1,72 @@
+import asyncio
+import importlib
+
+
+def test_histogram_and_cache_ratio_render_as_prometheus_text(tmp_path):
+    metrics = importlib.import_module('rag_chatbot.src.metrics')
+    registry = metrics.MetricsRegistry()
+    latency = registry.histogram('demo_seconds', 'Latência.', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, 'retrieve')
+    registry.counter('demo_total', 'Eventos.').inc(2)
+
+    class Cache:
+        hits, misses = 3, 1
+
+    cache = Cache()
+    registry.register_cache('answer', cache)
+    text = registry.render()
+
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="retrieve",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{stage="retrieve",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{stage="retrieve",le="+Inf"} 4' in text
+    assert 'demo_seconds_sum{stage="retrieve"} 3.65' in text
+    assert 'demo_seconds_count{stage="retrieve"} 4' in text
+    assert 'demo_total 2.0' in text
+    assert 'rag_cache_hit_ratio{cache="answer"} 0.75' in text
+
+    path = tmp_path / 'metrics.prom'
+    registry.dump(str(path))
+    assert path.read_text(encoding='utf-8') == text
+
+
+def test_instrument_records_sync_async_and_stream_metrics():
+    metrics = importlib.import_module('rag_chatbot.src.metrics')
+    before = {stage: metrics.STAGE_SECONDS.count(stage) for stage in ('demo_sync', 'demo_async')}
+    ttft_before = metrics.TIME_TO_FIRST_TOKEN.count()
+
+    @metrics.instrument('demo_sync')
+    def work(x):
+        return x * 2
+
+    @metrics.instrument('demo_async')
+    async def awork(x):
+        await asyncio.sleep(0)
+        return x + 1
+
+    assert work(2) == 4
+    assert asyncio.run(awork(1)) == 2
+    assert metrics.STAGE_SECONDS.count('demo_sync') == before['demo_sync'] + 1
+    assert metrics.STAGE_SECONDS.count('demo_async') == before['demo_async'] + 1
+
+    stream = metrics.StreamMetrics()
+    for token in ('uma resposta ', 'em vários ', 'pedaços'):
+        stream.token(token)
+    stream.finish()
+    assert metrics.TIME_TO_FIRST_TOKEN.count() == ttft_before + 1
+
+
+def test_metrics_enabled_follows_env_loaded_after_import(monkeypatch):
+    metrics = importlib.import_module('rag_chatbot.src.metrics')
+    before = metrics.STAGE_SECONDS.count('demo_disabled')
+    # Simula o .env carregado por load_config depois da importação do módulo
+    monkeypatch.setenv('METRICS_ENABLED', 'false')
+    with metrics.timed_stage('demo_disabled'):
+        pass
+    assert metrics.STAGE_SECONDS.count('demo_disabled') == before
+
+    monkeypatch.setenv('METRICS_ENABLED', 'true')
+    with metrics.timed_stage('demo_disabled'):
+        pass
+    assert metrics.STAGE_SECONDS.count('demo_disabled') == before + 1
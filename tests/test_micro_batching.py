@@ -0,0 +1,72 @@
+import time
+import asyncio
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def test_concurrent_queries_share_batches():
+    module = importlib.import_module('rag_chatbot.src.micro_batching')
+    fakes = importlib.import_module('rag_chatbot.src.fakes')
+    base = fakes.FakeEmbeddings(dim=8, latency=0.02)
+    batcher = module.MicroBatchingEmbeddings(base, max_batch_size=16, max_wait_ms=20)
+
+    questions = [f'pergunta {i % 24}' for i in range(48)]
+    with ThreadPoolExecutor(max_workers=48) as executor:
+        vectors = list(executor.map(batcher.embed_query, questions))
+
+    reference = fakes.FakeEmbeddings(dim=8)
+    assert vectors == [reference.embed_query(q) for q in questions]
+    assert base.calls < len(questions) / 4
+    assert batcher.stats()['requests'] == 48
+    assert all(len(v) == 8 for v in vectors)
+    batcher.close()
+
+
+def test_async_queries_are_batched_and_errors_propagate():
+    module = importlib.import_module('rag_chatbot.src.micro_batching')
+    fakes = importlib.import_module('rag_chatbot.src.fakes')
+    base = fakes.FakeEmbeddings(dim=4, latency=0.01)
+    batcher = module.MicroBatchingEmbeddings(base, max_batch_size=64, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.aembed_query(f'q{i}') for i in range(40)))
+
+    assert len(asyncio.run(main())) == 40
+    assert base.calls <= 3
+
+    def failing(texts):
+        raise RuntimeError('quota')
+
+    broken = module.MicroBatchingEmbeddings(base, batch_fn=failing)
+    with pytest.raises(RuntimeError, match='quota'):
+        broken.embed_query('x')
+    batcher.close()
+    broken.close()
+
+
+def test_batches_overlap_up_to_max_in_flight():
+    module = importlib.import_module('rag_chatbot.src.micro_batching')
+    lock = threading.Lock()
+    active = {'now': 0, 'peak': 0}
+
+    def slow_batch(texts):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.05)
+        with lock:
+            active['now'] -= 1
+        return [[float(len(t))] for t in texts]
+
+    batcher = module.MicroBatchingEmbeddings(None, max_batch_size=4, max_wait_ms=1, batch_fn=slow_batch, max_in_flight=3)
+    with ThreadPoolExecutor(max_workers=24) as executor:
+        vectors = list(executor.map(batcher.embed_query, [f'q{i}' for i in range(24)]))
+
+    assert vectors == [[float(len(f'q{i}'))] for i in range(24)]
+    # O coletor não espera o lote anterior voltar, mas respeita o limite
+    assert active['peak'] == 3
+    assert batcher.stats()['requests'] == 24
+    batcher.close()
@@ -0,0 +1,73 @@
+import os
+import importlib
+import threading
+from types import SimpleNamespace
+
+
+def test_normalize_question():
+    module = importlib.import_module('rag_chatbot.src.query_cache')
+    assert module.normalize_question('  O que é  Decomposição de Tarefas?? ') == 'o que e decomposicao de tarefas'
+
+
+def test_query_cache_exact_normalized_and_persisted(tmp_path):
+    module = importlib.import_module('rag_chatbot.src.query_cache')
+    analyze_question = importlib.import_module('rag_chatbot.src.section_router').analyze_question
+    path = str(tmp_path / 'queries.json')
+    calls = []
+    chain = SimpleNamespace(invoke=lambda value: calls.append(value) or {'query': 'task decomposition', 'section': 'beginning'})
+
+    cache = module.QueryAnalysisCache(path=path)
+    first = analyze_question('What is Task Decomposition?', chain, cache)
+    assert analyze_question('What is Task Decomposition?', chain, cache) == first
+    assert analyze_question('what is task decomposition', chain, cache) == first
+    assert len(calls) == 1
+    assert cache.stats()['exact_hits'] == 1
+    assert cache.stats()['normalized_hits'] == 1
+
+    cache.close()
+    reloaded = module.QueryAnalysisCache(path=path)
+    assert reloaded.get('WHAT IS TASK DECOMPOSITION!') == first
+
+
+def test_query_cache_lru_and_ttl(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.query_cache')
+    now = [0.0]
+    monkeypatch.setattr(module.time, 'time', lambda: now[0])
+
+    cache = module.QueryAnalysisCache(max_entries=2, ttl_seconds=5)
+    cache.put('a', {'query': 'a', 'section': 'end'})
+    cache.put('b', {'query': 'b', 'section': 'end'})
+    cache.get('a')
+    cache.put('c', {'query': 'c', 'section': 'end'})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+
+    now[0] = 10
+    assert cache.get('c') is None
+
+
+def test_query_cache_concurrent_puts_and_flushes(tmp_path):
+    module = importlib.import_module('rag_chatbot.src.query_cache')
+    path = str(tmp_path / 'queries.json')
+    cache = module.QueryAnalysisCache(max_entries=10000, path=path, flush_interval=0.001)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(200):
+                cache.put(f'pergunta {n} {i}', {'query': 'q', 'section': 'end'})
+                if i % 20 == 0:
+                    cache.save()
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cache.close()
+
+    assert errors == []
+    assert len(module.QueryAnalysisCache(max_entries=10000, path=path, flush_interval=0)) == 1600
+    assert os.listdir(tmp_path) == ['queries.json']
@@ -0,0 +1,49 @@
+import importlib
+from types import SimpleNamespace
+
+
+def test_engine_builds_chains_once_and_streams(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.rag_engine')
+    built = []
+
+    class Chain:
+        def __or__(self, other):
+            return self
+
+        def invoke(self, value):
+            return {'query': value['question'], 'section': 'end'}
+
+    class Prompt:
+        def __or__(self, other):
+            return Chain()
+
+        def __ror__(self, other):
+            return self
+
+        def format_messages(self, **kwargs):
+            return kwargs
+
+    class LLM:
+        structured = 0
+
+        def with_structured_output(self, schema):
+            LLM.structured += 1
+            return self
+
+        def stream(self, prompt):
+            yield prompt['context']
+
+    def from_messages(messages):
+        built.append(messages)
+        return Prompt()
+
+    monkeypatch.setattr(module.ChatPromptTemplate, 'from_messages', from_messages, raising=False)
+    doc = SimpleNamespace(page_content='fim do texto', metadata={'section': 'end'})
+    store = SimpleNamespace(as_retriever=lambda search_kwargs: SimpleNamespace(invoke=lambda query: [doc]))
+    engine = module.RagEngine(store, LLM(), Prompt())
+
+    answers = [''.join(engine.stream(f'pergunta {i}')) for i in range(5)]
+    assert answers == ['fim do texto'] * 5
+    assert ''.join(engine.stream('  ')) == 'Pergunta vazia.'
+    assert LLM.structured == 1
+    assert len(built) == 1
@@ -0,0 +1,66 @@
+import importlib
+from types import SimpleNamespace
+
+
+class SectionEmbeddings:
+    """Embeddings determinísticos: cada texto mapeia para um vetor fixo."""
+
+    VECTORS = {
+        'intro a': [1.0, 0.0, 0.0],
+        'intro b': [2.0, 0.0, 0.0],
+        'corpo': [0.0, 1.0, 0.0],
+        'fim': [0.0, 0.0, 1.0],
+        'pergunta sobre o corpo': [0.1, 0.95, 0.0],
+        'pergunta ambigua': [1.0, 1.0, 1.0],
+    }
+
+    def embed_documents(self, texts):
+        return [self.VECTORS[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.VECTORS[text]
+
+
+def make_router(**kwargs):
+    flat_index = importlib.import_module('rag_chatbot.src.flat_index')
+    router = importlib.import_module('rag_chatbot.src.section_router')
+    Document = importlib.import_module('langchain_core.documents').Document
+    docs = [
+        Document(page_content='intro a', metadata={'section': 'beginning'}),
+        Document(page_content='intro b', metadata={'section': 'beginning'}),
+        Document(page_content='corpo', metadata={'section': 'middle'}),
+        Document(page_content='fim', metadata={'section': 'end'}),
+    ]
+    index = flat_index.PartitionedVectorIndex.from_documents(docs, SectionEmbeddings())
+    return router.SectionRouter.from_vector_store(index, **kwargs)
+
+
+def test_keyword_routing():
+    router = importlib.import_module('rag_chatbot.src.section_router').SectionRouter()
+    assert router.route('Quais são as conclusões sobre a decomposição?').section == 'end'
+    assert router.route('Fale sobre os métodos de decomposição.').section == 'middle'
+    assert router.route('What is Task Decomposition?').section == 'beginning'
+    # Mais de uma seção casou: sem decisão por palavras-chave
+    assert router.route('Resumo da introdução').section is None
+
+
+def test_centroid_routing_and_fallback_to_llm():
+    module = importlib.import_module('rag_chatbot.src.section_router')
+    router = make_router()
+    assert sorted(router.sections) == ['beginning', 'end', 'middle']
+
+    decision = router.route('pergunta sobre o corpo')
+    assert (decision.section, decision.source) == ('middle', 'centroid')
+    assert decision.confidence >= router.min_confidence
+
+    calls = []
+    chain = SimpleNamespace(invoke=lambda value: calls.append(value) or {'query': 'x', 'section': 'end'})
+    assert module.analyze_question('pergunta sobre o corpo', chain, section_router=router) == {
+        'query': 'pergunta sobre o corpo', 'section': 'middle',
+    }
+    assert calls == []
+
+    # Vetor equidistante dos centróides: baixa confiança, usa o LLM
+    assert router.route('pergunta ambigua').confidence < router.min_confidence
+    assert module.analyze_question('pergunta ambigua', chain, section_router=router)['section'] == 'end'
+    assert len(calls) == 1
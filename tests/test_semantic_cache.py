@@ -0,0 +1,103 @@
+import importlib
+from types import SimpleNamespace
+
+
+class KeywordEmbeddings:
+    """Embeddings de brinquedo: perguntas com a mesma palavra-chave ficam próximas."""
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [
+            1.0 if 'task' in text else 0.0,
+            1.0 if 'memory' in text else 0.0,
+            0.1 if text.endswith('?') else 0.0,
+        ]
+
+
+def make_cache(**kwargs):
+    module = importlib.import_module('rag_chatbot.src.semantic_cache')
+    return module.SemanticAnswerCache(KeywordEmbeddings(), **kwargs)
+
+
+def test_semantic_cache_threshold_and_versions():
+    cache = make_cache(threshold=0.9)
+    cache.store('What is task decomposition?', 'answer', ['doc'], index_version=1)
+
+    hit = cache.lookup('task decomposition', index_version=1)
+    assert hit.answer == 'answer' and hit.sources == ['doc']
+    assert cache.lookup('What about memory?', index_version=1) is None
+
+    # Uma nova versão do índice invalida as respostas anteriores
+    assert cache.lookup('What is task decomposition?', index_version=2) is None
+    assert len(cache) == 0
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3, 'size': 0}
+
+
+def test_semantic_cache_ttl_and_lru(monkeypatch):
+    module = importlib.import_module('rag_chatbot.src.semantic_cache')
+    now = [1000.0]
+    monkeypatch.setattr(module.time, 'time', lambda: now[0])
+
+    cache = make_cache(ttl_seconds=10, max_entries=1)
+    cache.store('task?', 'a')
+    now[0] += 11
+    assert cache.lookup('task?') is None
+
+    cache.store('task?', 'a')
+    cache.store('memory?', 'b')
+    assert len(cache) == 1
+    assert cache.lookup('task?') is None
+    assert cache.lookup('memory?').answer == 'b'
+
+
+def test_create_rag_graph_uses_answer_cache(monkeypatch):
+    pipeline = importlib.import_module('rag_chatbot.src.rag_pipeline')
+    msgs = importlib.import_module('langchain_core.messages')
+    calls = []
+
+    def dummy_analyze(state, structured_llm=None):
+        calls.append(state['messages'][-1].content)
+        return {'messages': state['messages'] + [msgs.AIMessage(content='')]}
+
+    def dummy_retrieve(state, vector_store=None):
+        tool = msgs.ToolMessage(content='', tool_call_id='1', additional_kwargs={'documents': ['ctx']})
+        return {'messages': state['messages'] + [tool]}
+
+    def dummy_generate(state, llm=None, rag_prompt=None):
+        return {'messages': state['messages'] + [msgs.AIMessage(content='ans')]}
+
+    monkeypatch.setattr(pipeline, 'analyze_query', dummy_analyze)
+    monkeypatch.setattr(pipeline, 'retrieve', dummy_retrieve)
+    monkeypatch.setattr(pipeline, 'generate', dummy_generate)
+
+    store = SimpleNamespace(index_version=3)
+    app = pipeline.create_rag_graph(store, None, None, None, answer_cache=make_cache())
+    first = app.invoke({'messages': [msgs.HumanMessage(content='What is task decomposition?')]})
+    second = app.invoke({'messages': [msgs.HumanMessage(content='what is TASK decomposition?')]})
+
+    assert calls == ['What is task decomposition?']
+    assert second['messages'][-1].content == first['messages'][-1].content == 'ans'
+    assert type(second['messages'][-2]).__name__ == 'ToolMessage'
+
+
+def test_index_version_advances_on_every_write_path(tmp_path):
+    semantic_cache = importlib.import_module('rag_chatbot.src.semantic_cache')
+    vector_store = importlib.import_module('rag_chatbot.src.vector_store')
+    indexing = importlib.import_module('rag_chatbot.src.indexing')
+    ingest = importlib.import_module('rag_chatbot.src.ingest')
+    Document = importlib.import_module('langchain_core.documents').Document
+    Chroma = importlib.import_module('langchain_community.vectorstores').Chroma
+    store = Chroma()
+    store.delete = lambda ids=None: None
+    docs = [Document(page_content=t, metadata={'source': 'u', 'start_index': i}) for i, t in enumerate('abc')]
+    manifest = str(tmp_path / 'manifest.json')
+
+    assert semantic_cache.get_index_version(store) == 0
+    vector_store.add_documents_to_vector_store(store, docs[:1])
+    assert semantic_cache.get_index_version(store) == 1
+    indexing.sync_vector_store(store, docs, manifest)
+    assert semantic_cache.get_index_version(store) == 2
+    indexing.sync_vector_store(store, docs, manifest)  # nada mudou
+    assert semantic_cache.get_index_version(store) == 2
+    ingest.ingest_documents(iter(docs), store, batch_size=2, splitter=lambda batch: batch)
+    assert semantic_cache.get_index_version(store) == 4
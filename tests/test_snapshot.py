@@ -0,0 +1,85 @@
+import json
+import importlib
+import numpy as np
+
+
+def make_docs(n=120):
+    Document = importlib.import_module('langchain_core.documents').Document
+    sections = ['beginning', 'middle', 'end']
+    return [
+        Document(page_content=f'chunk {i} – texto ç', metadata={'source': f'doc-{i // 40}', 'section': sections[i % 3], 'start_index': i * 10})
+        for i in range(n)
+    ]
+
+
+def hits(index, queries, **kwargs):
+    return [[(doc.page_content, doc.metadata, round(score, 5)) for doc, score in result]
+            for result in index.search_by_vectors(queries, k=5, **kwargs)]
+
+
+def test_partitioned_snapshot_is_mmapped_lazy_and_copy_on_write(tmp_path):
+    flat = importlib.import_module('rag_chatbot.src.flat_index')
+    snapshot = importlib.import_module('rag_chatbot.src.snapshot')
+    embeddings = importlib.import_module('rag_chatbot.src.fakes').FakeEmbeddings(dim=16)
+    docs = make_docs()
+    index = flat.PartitionedVectorIndex.from_documents(docs, embeddings, ids=[f'id-{i}' for i in range(len(docs))])
+    path = str(tmp_path / 'snapshot')
+    snapshot.save_snapshot(index, path)
+
+    loaded = snapshot.load_snapshot(path, embeddings)
+    queries = [embeddings.embed_query(q) for q in ('chunk 3', 'chunk 77', 'outra consulta')]
+    partition = loaded.partitions['middle']
+    assert isinstance(partition.matrix, np.memmap)
+    assert len(loaded) == len(docs) and not partition.documents._cache
+    assert hits(loaded, queries) == hits(index, queries)
+    assert hits(loaded, queries, filter={'section': 'end', 'source': 'doc-1'}) == hits(index, queries, filter={'section': 'end', 'source': 'doc-1'})
+    assert hits(loaded, queries, filter={'section': 'end', 'source': 'nenhuma'}) == [[], [], []]
+    # Só os Documents retornados foram criados
+    assert 0 < len(partition.documents._cache) < len(partition)
+
+    # Alterações copiam para a memória e não tocam os arquivos do snapshot
+    loaded.delete(ids=['id-1', 'id-4'])
+    loaded.add_documents(make_docs(3)[:1], ids=['novo'])
+    assert len(loaded) == len(docs) - 1
+    assert len(snapshot.load_snapshot(path, embeddings)) == len(docs)
+
+
+def test_ivf_snapshot_roundtrip_and_version_check(tmp_path):
+    ivf = importlib.import_module('rag_chatbot.src.ivf_index')
+    snapshot = importlib.import_module('rag_chatbot.src.snapshot')
+    vector_store = importlib.import_module('rag_chatbot.src.vector_store')
+    embeddings = importlib.import_module('rag_chatbot.src.fakes').FakeEmbeddings(dim=16)
+    index = ivf.IVFVectorIndex.from_documents(make_docs(300), embeddings, n_lists=8, nprobe=3, min_train_size=100)
+    path = str(tmp_path / 'ivf')
+    assert vector_store.save_vector_store_snapshot(index, path)
+
+    loaded = snapshot.load_snapshot(path, embeddings)
+    queries = [embeddings.embed_query(q) for q in ('chunk 10', 'chunk 250')]
+    assert loaded.is_trained and loaded.nprobe == 3
+    assert hits(loaded, queries) == hits(index, queries)
+    assert snapshot.load_snapshot(path, embeddings, nprobe=8).nprobe == 8
+
+    manifest_path = tmp_path / 'ivf' / snapshot.MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    manifest_path.write_text(json.dumps({**manifest, 'version': snapshot.SNAPSHOT_VERSION + 1}), encoding='utf-8')
+    assert vector_store.load_vector_store_snapshot(path, backend='ivf', model=embeddings, micro_batch_ms=0) is None
+    assert vector_store.load_vector_store_snapshot(str(tmp_path / 'ausente'), backend='ivf') is None
+
+
+def test_snapshot_rejects_another_embedding_model(tmp_path):
+    flat = importlib.import_module('rag_chatbot.src.flat_index')
+    snapshot = importlib.import_module('rag_chatbot.src.snapshot')
+    vector_store = importlib.import_module('rag_chatbot.src.vector_store')
+    fakes = importlib.import_module('rag_chatbot.src.fakes')
+    index = flat.FlatVectorIndex.from_documents(make_docs(10), fakes.FakeEmbeddings(dim=16))
+    path = str(tmp_path / 'flat')
+    snapshot.save_snapshot(index, path)
+    manifest = snapshot.read_manifest(path)
+    assert (manifest['embedding_model'], manifest['dim']) == ('FakeEmbeddings', 16)
+
+    class OtherEmbeddings(fakes.FakeEmbeddings):
+        pass
+
+    assert vector_store.load_vector_store_snapshot(path, backend='flat', model=fakes.FakeEmbeddings(dim=16), micro_batch_ms=0) is not None
+    assert vector_store.load_vector_store_snapshot(path, backend='flat', model=fakes.FakeEmbeddings(dim=8), micro_batch_ms=0) is None
+    assert vector_store.load_vector_store_snapshot(path, backend='flat', model=OtherEmbeddings(dim=16), micro_batch_ms=0) is None
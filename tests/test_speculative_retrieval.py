@@ -0,0 +1,84 @@
+import importlib
+import threading
+
+
+class FakeStore:
+    """Store mínimo: registra as buscas e devolve documentos com seção."""
+
+    def __init__(self, sections):
+        Document = importlib.import_module('langchain_core.documents').Document
+        self.docs = [Document(page_content=f'doc{i}', metadata={'section': s}) for i, s in enumerate(sections)]
+        self.unfiltered = []
+        self.filtered = []
+        self.release = threading.Event()
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        self.release.wait(timeout=5)
+        self.unfiltered.append((query, k))
+        return self.docs[:k]
+
+    def as_retriever(self, search_kwargs=None):
+        store = self
+
+        class Retriever:
+            def invoke(self, query):
+                section = search_kwargs['filter']['section']
+                store.filtered.append((query, section))
+                return [d for d in store.docs if d.metadata['section'] == section][: search_kwargs['k']]
+
+        return Retriever()
+
+
+def test_speculative_results_are_filtered_by_section():
+    module = importlib.import_module('rag_chatbot.src.speculative_retrieval')
+    store = FakeStore(['middle', 'end', 'middle', 'middle', 'beginning', 'middle'])
+    retriever = module.SpeculativeRetriever(store, k=2, overfetch=3)
+
+    retriever.start('pergunta')
+    # A busca roda enquanto a "análise" acontece na thread principal
+    store.release.set()
+    documents = retriever.resolve('pergunta', {'query': 'consulta reescrita', 'section': 'middle'})
+
+    assert [d.page_content for d in documents] == ['doc0', 'doc2']
+    assert store.unfiltered == [('pergunta', 6)]
+    assert store.filtered == []
+    assert retriever.stats()['reused'] == 1
+    retriever.close()
+
+
+def test_falls_back_to_filtered_search_when_too_few_remain():
+    module = importlib.import_module('rag_chatbot.src.speculative_retrieval')
+    store = FakeStore(['middle', 'middle', 'middle', 'end', 'end', 'end', 'end'])
+    store.release.set()
+    retriever = module.SpeculativeRetriever(store, k=2, overfetch=2)
+
+    retriever.start('pergunta')
+    documents = retriever.resolve('pergunta', {'query': 'consulta', 'section': 'end'})
+    assert [d.page_content for d in documents] == ['doc3', 'doc4']
+    assert store.filtered == [('consulta', 'end')]
+
+    # Sem especulação pendente: busca filtrada direta
+    retriever.resolve('outra', {'query': 'outra', 'section': 'middle'})
+    assert retriever.stats() == {'reused': 0, 'fallbacks': 2, 'reuse_ratio': 0.0}
+    retriever.close()
+
+
+def test_unresolved_speculations_expire_after_completion():
+    module = importlib.import_module('rag_chatbot.src.speculative_retrieval')
+    store = FakeStore(['middle'] * 4)
+    store.release.set()
+    retriever = module.SpeculativeRetriever(store, k=2, overfetch=2, result_ttl=0.0)
+
+    # A análise respondeu sem recuperar: ninguém resolve nem cancela as buscas
+    for i in range(50):
+        retriever.start(f'pergunta {i}').result()
+    retriever.start('última').result()
+    retriever.cancel('inexistente')
+    assert retriever._pending == {} and not retriever._done
+
+    # Com prazo, a busca concluída continua disponível para o resolve
+    retriever.result_ttl = 60.0
+    retriever.start('pergunta').result()
+    assert retriever.resolve('pergunta', {'query': 'consulta', 'section': 'middle'})
+    assert retriever.stats()['reused'] == 1 and retriever._pending == {}
+    retriever.close()
@@ -0,0 +1,41 @@
+import importlib
+
+
+class PicklableDocument:
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class PipeSplitter:
+    """Divide o texto em '|' para gerar vários chunks por documento."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def split_documents(self, docs):
+        return [
+            PicklableDocument(part, dict(doc.metadata, start_index=i))
+            for doc in docs
+            for i, part in enumerate(doc.page_content.split('|'))
+        ]
+
+
+def test_parallel_split_matches_serial(monkeypatch):
+    text_module = importlib.import_module('rag_chatbot.src.text_splitter')
+    monkeypatch.setattr(text_module, 'RecursiveCharacterTextSplitter', PipeSplitter)
+    docs = [
+        PicklableDocument('|'.join(f'd{d}c{c}' for c in range(d + 1)), {'source': f'doc{d}'})
+        for d in range(12)
+    ]
+
+    serial = text_module.split_documents(docs)
+    parallel = text_module.split_documents(docs, max_workers=3)
+
+    def key(chunks):
+        return [(c.page_content, c.metadata) for c in chunks]
+
+    assert key(parallel) == key(serial)
+    # Seções calculadas por documento: cada documento com 3+ chunks tem início, meio e fim
+    sections = [c.metadata['section'] for c in serial if c.metadata['source'] == 'doc5']
+    assert sections == ['beginning', 'beginning', 'middle', 'middle', 'middle', 'end']